@@ -1,37 +1,744 @@
-from typing import Dict, List, Set
+import fnmatch
+import heapq
+import os
+import re
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from array import array
+from types import MappingProxyType
+from typing import Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+from scipy import sparse
+
+from .graph import GroupGraph
+from .membership import Membership, StringTable
+from .nickname import DEFAULT_THRESHOLD, cluster_nicknames
+from .sketch import LSH_BANDS, compute_minhash, rank_candidate_pairs, stack_signatures
+
+# 每个字节中 1 的个数；numpy 2.0 以上直接使用 np.bitwise_count
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+# 排行的计分方式："count" 按群数 / 共同成员数，"inverse_size" 按群人数的倒数加权（小群的共同成员更有意义）
+RANK_WEIGHTINGS = ("count", "inverse_size")
+
+
+class MembershipMatrix:
+    """成员 × 群的位压缩矩阵
+
+    bits[成员 ID] 是该成员所在群的位图，每个群占一位，一个字节存 8 个群。
+    矩阵按列存储（同一字节列的成员连续存放），构建时每个群只需一次
+    向量化的按位或。矩阵只构建一次，之后成员所在群数和 min_groups 筛选
+    都是整行运算，成员所在的群由按成员排序的 (成员, 群) 关系数组切片得到。
+    """
+
+    def __init__(self, membership: Membership):
+        self.membership = membership
+        self.group_count = len(membership)
+        # 成员 ID 也可能不来自驻留表（例如直接传入整数），按最大 ID 确定行数
+        self.member_count = max([len(membership.members)] + [ids[-1] + 1 for ids in membership.group_members if ids])
+        self.group_sizes = np.array([len(ids) for ids in membership.group_members], dtype=np.int64)
+
+        columns = np.zeros(((self.group_count + 7) // 8, self.member_count), dtype=np.uint8)
+        for group_id, member_ids in enumerate(membership.group_members):
+            columns[group_id >> 3, np.frombuffer(member_ids, dtype=np.uint32)] |= np.uint8(0x80 >> (group_id & 7))
+        self.bits = columns.T
+        self._group_counts = None
+        self._pairs = None
+
+    def pairs(self) -> Tuple[np.ndarray, np.ndarray]:
+        """所有 (成员 ID, 群 ID) 关系，按群排列"""
+        if self._pairs is None:
+            self._pairs = membership_pairs(self.membership)
+        return self._pairs
+
+    def to_sparse(self, group_ids: Optional[Sequence[int]] = None) -> sparse.csc_matrix:
+        """成员 × 群的稀疏 0/1 矩阵
+
+        Args:
+            group_ids: 只保留这些群（列的顺序与之一致），默认全部
+        """
+        pair_members, pair_groups = self.pairs()
+        if group_ids is None:
+            columns = pair_groups
+            column_count = self.group_count
+        else:
+            column_of = np.full(self.group_count, -1, dtype=np.int32)
+            column_of[np.asarray(group_ids, dtype=np.int64)] = np.arange(len(group_ids), dtype=np.int32)
+            columns = column_of[pair_groups]
+            keep = columns >= 0
+            pair_members, columns = pair_members[keep], columns[keep]
+            column_count = len(group_ids)
+        data = np.ones(len(columns), dtype=np.int32)
+        return sparse.csc_matrix((data, (pair_members, columns)), shape=(self.member_count, column_count))
+
+    def group_counts(self) -> np.ndarray:
+        """每个成员所在的群数（按行统计 1 的个数）"""
+        if self._group_counts is None:
+            columns = self.bits.T
+            if hasattr(np, "bitwise_count"):
+                self._group_counts = np.bitwise_count(columns).sum(axis=0, dtype=np.int32)
+            else:
+                counts = np.zeros(self.member_count, dtype=np.int32)
+                for column in columns:
+                    counts += POPCOUNT[column]
+                self._group_counts = counts
+        return self._group_counts
+
+    def members_in_at_least(self, min_groups: int) -> np.ndarray:
+        """出现在至少 min_groups 个群中的成员 ID（升序）"""
+        return np.flatnonzero(self.group_counts() >= min_groups)
+
+    def groups_of(self, member_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """成员所在的群，CSR 形式
+
+        Args:
+            member_ids: 升序的成员 ID，通常来自 members_in_at_least
+
+        Returns:
+            (indptr, group_ids)：第 i 个成员所在的群为 group_ids[indptr[i]:indptr[i + 1]]，升序
+        """
+        member_ids = np.asarray(member_ids, dtype=np.int64)
+        selected = np.zeros(self.member_count, dtype=bool)
+        selected[member_ids] = True
+        pair_members, pair_groups = self.pairs()
+        keep = selected[pair_members]
+        pair_members, pair_groups = pair_members[keep], pair_groups[keep]
+        # 稳定排序保证同一成员的群 ID 仍按升序排列
+        group_ids = pair_groups[np.argsort(pair_members, kind="stable")]
+        indptr = np.zeros(len(member_ids) + 1, dtype=np.int64)
+        np.cumsum(self.group_counts()[member_ids], out=indptr[1:])
+        return indptr, group_ids
+
+
+def membership_pairs(membership: Membership) -> Tuple[np.ndarray, np.ndarray]:
+    """所有 (成员 ID, 群 ID) 关系，按群排列
+
+    Returns:
+        (pair_members, pair_groups)：uint32 成员 ID 和 int32 群 ID
+    """
+    pair_members = np.concatenate(
+        [np.frombuffer(ids, dtype=np.uint32) for ids in membership.group_members]
+        or [np.zeros(0, dtype=np.uint32)]
+    )
+    sizes = [len(ids) for ids in membership.group_members]
+    pair_groups = np.repeat(np.arange(len(sizes), dtype=np.int32), sizes)
+    return pair_members, pair_groups
+
+
+def _analyze_shard(pair_members: np.ndarray, pair_groups: np.ndarray,
+                   min_groups: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    统计一个分片中成员所在的群数，并取出重复成员（在子进程中运行）
+
+    同一成员的所有关系都在同一个分片中，分片内的结果就是该成员的最终结果。
+
+    Returns:
+        (member_ids, indptr, group_ids)：升序的成员 ID 及其所在群的 CSR 形式
+    """
+    # 稳定排序保证同一成员的群 ID 仍按升序排列
+    order = np.argsort(pair_members, kind="stable")
+    pair_members, pair_groups = pair_members[order], pair_groups[order]
+    member_ids, starts, counts = np.unique(pair_members, return_index=True, return_counts=True)
+    keep = counts >= min_groups
+    member_ids, starts, counts = member_ids[keep], starts[keep], counts[keep]
+
+    indptr = np.zeros(len(member_ids) + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    # 每个成员的关系在排序后连续存放，按 (起点 + 偏移) 一次取出
+    offsets = np.arange(indptr[-1], dtype=np.int64) - np.repeat(indptr[:-1], counts)
+    group_ids = pair_groups[np.repeat(starts, counts) + offsets]
+    return member_ids, indptr, group_ids
+
+
+def find_common_members_parallel(membership: Membership, min_groups: int = 2,
+                                 workers: Optional[int] = None) -> Dict[int, List[int]]:
+    """
+    多进程分片找出出现在多个群中的成员
+
+    (成员, 群) 关系按成员 ID 的哈希分成 workers 个分片，同一成员的关系
+    都落在同一个分片中，各进程独立统计分片内成员所在的群数并筛选，
+    主进程只需拼接结果，不需要再合并计数。适用于几十万条以上的成员关系；
+    数据量小时进程启动和传输数据的开销大于节省的时间。
+
+    在 Windows 上子进程以 spawn 方式启动，调用方的入口脚本必须有
+    if __name__ == "__main__" 保护。
+
+    Args:
+        membership: 群成员关系
+        min_groups: 最少出现在几个群中
+        workers: 进程数，默认为 CPU 核数；为 1 时在当前进程中计算
+
+    Returns:
+        {成员 ID: [群 ID]}，按成员 ID 升序
+    """
+    workers = max(1, workers or os.cpu_count() or 1)
+    pair_members, pair_groups = membership_pairs(membership)
+    # 成员 ID 是连续分配的整数，乘法哈希后取模即可使各分片大小均匀
+    shard_of = ((pair_members.astype(np.uint64) * np.uint64(2654435761)) & np.uint64(0xFFFFFFFF)) % np.uint64(workers)
+    order = np.argsort(shard_of, kind="stable")
+    bounds = np.searchsorted(shard_of[order], np.arange(workers + 1, dtype=np.uint64)).tolist()
+    shards = [order[bounds[i]:bounds[i + 1]] for i in range(workers)]
+    tasks = [(pair_members[shard], pair_groups[shard], min_groups) for shard in shards]
+
+    if workers == 1:
+        results = [_analyze_shard(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_analyze_shard, *zip(*tasks)))
+
+    member_groups = {}
+    for member_ids, indptr, group_ids in results:
+        bounds = indptr.tolist()
+        group_ids = group_ids.tolist()
+        for i, member_id in enumerate(member_ids.tolist()):
+            member_groups[member_id] = group_ids[bounds[i]:bounds[i + 1]]
+    return {member_id: member_groups[member_id] for member_id in sorted(member_groups)}
+
+
+def find_common_members(membership: Membership, min_groups: int = 2, engine: str = "matrix",
+                        workers: Optional[int] = None) -> Dict[int, List[int]]:
+    """
+    找出出现在多个群中的成员
+    
+    Args:
+        membership: 群成员关系
+        min_groups: 最少出现在几个群中
+        engine: "matrix" 使用位压缩矩阵，"python" 使用逐条统计，"process" 使用多进程分片
+        workers: "process" 引擎的进程数，默认为 CPU 核数
+        
+    Returns:
+        {成员 ID: [群 ID]}
+    """
+    if engine == "python":
+        return count_member_groups(membership, min_groups)
+    if engine == "process":
+        return find_common_members_parallel(membership, min_groups, workers)
+    matrix = MembershipMatrix(membership)
+    member_ids = matrix.members_in_at_least(min_groups)
+    indptr, group_ids = matrix.groups_of(member_ids)
+    bounds = indptr.tolist()
+    group_ids = group_ids.tolist()
+    return {
+        member_id: group_ids[bounds[i]:bounds[i + 1]]
+        for i, member_id in enumerate(member_ids.tolist())
+    }
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    分数最高的 k 个下标，按分数从高到低、同分按下标从小到大排列
+
+    用 np.partition 找出第 k 大的分数，只对不低于它的少量元素排序，
+    不需要对全部分数排序。
+    """
+    count = len(scores)
+    if k <= 0 or not count:
+        return np.zeros(0, dtype=np.int64)
+    if k < count:
+        kth = np.partition(scores, count - k)[count - k]
+        above = np.flatnonzero(scores > kth)
+        tied = np.flatnonzero(scores == kth)[:k - len(above)]
+        candidates = np.concatenate([above, tied])
+    else:
+        candidates = np.arange(count)
+    return candidates[np.lexsort((candidates, -scores[candidates]))]
+
+
+def member_scores(membership: Membership, weighting: str = "count") -> np.ndarray:
+    """
+    每个成员 ID 的排行分数
+
+    Args:
+        weighting: "count" 为所在群数；"inverse_size" 为所在各群人数倒数之和
+
+    Returns:
+        按成员 ID 下标的分数数组
+    """
+    if weighting not in RANK_WEIGHTINGS:
+        raise ValueError(f"未知的计分方式: {weighting}")
+    pair_members, pair_groups = membership_pairs(membership)
+    member_count = max(len(membership.members), int(pair_members.max()) + 1 if len(pair_members) else 0)
+    if weighting == "count":
+        return np.bincount(pair_members, minlength=member_count).astype(np.float64)
+    sizes = np.array([len(ids) for ids in membership.group_members], dtype=np.float64)
+    return np.bincount(pair_members, weights=1.0 / sizes[pair_groups], minlength=member_count)
+
+
+def top_members(membership: Membership, k: int = 100, weighting: str = "count") -> List[Tuple[int, float]]:
+    """
+    所在群最多（或加权分数最高）的 k 个成员
+
+    Returns:
+        [(成员 ID, 分数)]，按分数从高到低排列
+    """
+    scores = member_scores(membership, weighting)
+    scores[scores <= 0] = -np.inf
+    top = [i for i in top_k_indices(scores, k).tolist() if scores[i] > -np.inf]
+    return [(member_id, float(scores[member_id])) for member_id in top]
+
+
+def top_group_pairs(membership: Membership, k: int = 100, weighting: str = "count") -> List[Dict]:
+    """
+    共同成员最多（或加权分数最高）的 k 对群
+
+    稀疏矩阵乘积只产生有共同成员的群对，在这些群对上做部分选择，
+    不需要构建和排序完整的 群 × 群 矩阵。
+
+    Args:
+        weighting: "count" 为共同成员数；"inverse_size" 为共同成员数乘以两个群人数倒数的平均值，
+            即共同成员在两个群中所占比例的平均
+
+    Returns:
+        与 GroupOverlap.top_pairs 格式相同的群对列表，另含 score，按分数从高到低排列
+    """
+    if weighting not in RANK_WEIGHTINGS:
+        raise ValueError(f"未知的计分方式: {weighting}")
+    pair_members, pair_groups = membership_pairs(membership)
+    if not len(pair_members):
+        return []
+    matrix = sparse.csc_matrix(
+        (np.ones(len(pair_members), dtype=np.int32), (pair_members, pair_groups)),
+        shape=(int(pair_members.max()) + 1, len(membership))
+    )
+    # 经 CSR 转换后按 (群A, 群B) 排列，同分的群对顺序固定
+    shared = sparse.triu(matrix.T @ matrix, k=1).tocsr().tocoo()
+    sizes = np.array([len(ids) for ids in membership.group_members], dtype=np.int64)
+    rows, cols, counts = shared.row, shared.col, shared.data.astype(np.int64)
+    if weighting == "count":
+        scores = counts.astype(np.float64)
+    else:
+        scores = counts * (1.0 / sizes[rows] + 1.0 / sizes[cols]) / 2
+
+    group_names = membership.groups.strings
+    pairs = []
+    for i in top_k_indices(scores, k).tolist():
+        size_a, size_b, count = int(sizes[rows[i]]), int(sizes[cols[i]]), int(counts[i])
+        pairs.append({
+            "group_a": group_names[rows[i]],
+            "group_b": group_names[cols[i]],
+            "size_a": size_a,
+            "size_b": size_b,
+            "shared": count,
+            "jaccard": count / (size_a + size_b - count),
+            "score": float(scores[i])
+        })
+    return pairs
+
+
+class GroupOverlap:
+    """群两两之间的重叠情况
+
+    Attributes:
+        groups: 群名，顺序与矩阵的行列一致
+        sizes: 每个群的成员数
+        intersections: 共同成员数矩阵，对角线为群成员数
+        jaccard: Jaccard 相似度矩阵（交集 / 并集）
+    """
+
+    def __init__(self, groups: List[str], intersections: np.ndarray):
+        self.groups = groups
+        self.intersections = intersections
+        self.sizes = intersections.diagonal().copy()
+        unions = self.sizes[:, None] + self.sizes[None, :] - intersections
+        self.jaccard = np.divide(
+            intersections, unions, out=np.zeros(intersections.shape, dtype=np.float64), where=unions > 0
+        )
+
+    def top_pairs(self, min_shared: int = 1, limit: Optional[int] = None) -> List[Dict]:
+        """按 Jaccard 从高到低列出有共同成员的群对
+
+        Args:
+            min_shared: 至少有几个共同成员
+            limit: 最多返回多少对，默认全部
+        """
+        rows, cols = np.nonzero(np.triu(self.intersections >= min_shared, k=1))
+        order = np.lexsort((-self.intersections[rows, cols], -self.jaccard[rows, cols]))[:limit]
+        return [
+            {
+                "group_a": self.groups[rows[i]],
+                "group_b": self.groups[cols[i]],
+                "size_a": int(self.sizes[rows[i]]),
+                "size_b": int(self.sizes[cols[i]]),
+                "shared": int(self.intersections[rows[i], cols[i]]),
+                "jaccard": float(self.jaccard[rows[i], cols[i]])
+            }
+            for i in order
+        ]
+
+    def pair_count(self, min_shared: int = 1) -> int:
+        """至少有 min_shared 个共同成员的群对数"""
+        return int(np.count_nonzero(np.triu(self.intersections >= min_shared, k=1)))
+
+    def __len__(self) -> int:
+        return len(self.groups)
+
+
+def compute_group_overlap(membership: Membership, group_names: Optional[Sequence[str]] = None) -> GroupOverlap:
+    """
+    计算群两两之间的共同成员数和 Jaccard 相似度
+    
+    用稀疏矩阵乘积 M.T @ M 一次得到所有群对的交集大小，
+    开销与 Σ(每个成员所在群数²) 成正比，不需要逐对比较成员集合。
+    
+    Args:
+        membership: 群成员关系
+        group_names: 参与计算的群，默认全部
+        
+    Returns:
+        GroupOverlap
+    """
+    if group_names is None:
+        group_names = membership.group_names()
+    group_ids = [membership.groups.get_id(name) for name in group_names]
+    group_names = [name for name, group_id in zip(group_names, group_ids) if group_id is not None]
+    group_ids = [group_id for group_id in group_ids if group_id is not None]
+    if not group_ids:
+        return GroupOverlap([], np.zeros((0, 0), dtype=np.int64))
+
+    matrix = MembershipMatrix(membership).to_sparse(group_ids)
+    intersections = (matrix.T @ matrix).toarray().astype(np.int64)
+    return GroupOverlap(group_names, intersections)
+
+
+def build_group_graph(membership: Membership, group_names: Optional[Sequence[str]] = None,
+                      min_shared: int = 1) -> GroupGraph:
+    """
+    构建群共同成员图，并计算连通分量和社区
+
+    邻接矩阵同样由稀疏矩阵乘积 M.T @ M 得到，只保留非零的群对，
+    一千个群的图在几百毫秒内即可重新计算。
+
+    Args:
+        membership: 群成员关系
+        group_names: 参与计算的群，默认全部
+        min_shared: 共同成员少于此数的群对不连边，用于去掉偶然的弱关联
+
+    Returns:
+        GroupGraph
+    """
+    if group_names is None:
+        group_names = membership.group_names()
+    group_ids = [membership.groups.get_id(name) for name in group_names]
+    group_names = [name for name, group_id in zip(group_names, group_ids) if group_id is not None]
+    group_ids = [group_id for group_id in group_ids if group_id is not None]
+    if not group_ids:
+        return GroupGraph([], np.zeros(0, dtype=np.int64), sparse.csr_matrix((0, 0), dtype=np.int64))
+
+    matrix = MembershipMatrix(membership).to_sparse(group_ids)
+    shared = (matrix.T @ matrix).tocsr().astype(np.int64)
+    sizes = shared.diagonal().copy()
+    shared.setdiag(0)
+    shared.data[shared.data < min_shared] = 0
+    shared.eliminate_zeros()
+    return GroupGraph(group_names, sizes, shared)
+
+
+def approximate_group_overlap(sketches: Dict[str, np.ndarray], load_members: Callable[[str], Sequence[int]],
+                              top_k: int = 100, candidates: Optional[int] = None,
+                              bands: int = LSH_BANDS) -> List[Dict]:
+    """
+    用 MinHash 签名近似找出重叠最多的群对
+    
+    先用 LSH 从签名中找出候选群对并按估计的 Jaccard 排序，只对排在前面的
+    候选读取成员精确计算交集，其余群的成员不需要读取。
+    
+    Args:
+        sketches: {群名: MinHash 签名}，通常来自缓存
+        load_members: 根据群名读取成员 ID（升序）的函数
+        top_k: 返回的群对数
+        candidates: 精确计算的候选群对数，默认为 top_k 的 2 倍
+        bands: LSH 分段数
+        
+    Returns:
+        与 GroupOverlap.top_pairs 格式相同的群对列表，另含 estimated_jaccard，
+        按精确的 Jaccard 从高到低排序
+    """
+    names, signatures = stack_signatures(sketches)
+    ranked = rank_candidate_pairs(names, signatures, bands)[:candidates or top_k * 2]
+
+    loaded: Dict[str, np.ndarray] = {}
+
+    def members(name: str) -> np.ndarray:
+        if name not in loaded:
+            loaded[name] = np.asarray(load_members(name) or [], dtype=np.uint32)
+        return loaded[name]
+
+    pairs = []
+    for estimate, group_a, group_b in ranked:
+        a, b = members(group_a), members(group_b)
+        shared = len(np.intersect1d(a, b, assume_unique=True))
+        union = len(a) + len(b) - shared
+        pairs.append({
+            "group_a": group_a,
+            "group_b": group_b,
+            "size_a": len(a),
+            "size_b": len(b),
+            "shared": shared,
+            "jaccard": shared / union if union else 0.0,
+            "estimated_jaccard": estimate
+        })
+    pairs.sort(key=lambda pair: (-pair["jaccard"], -pair["shared"]))
+    return pairs[:top_k]
+
+
+def merge_similar_members(membership: Membership,
+                          threshold: float = DEFAULT_THRESHOLD) -> Tuple[Membership, Dict[str, List[str]]]:
+    """
+    把昵称相近的成员合并为同一个人
+    
+    Args:
+        membership: 群成员关系
+        threshold: 昵称相似度阈值
+        
+    Returns:
+        (合并后的群成员关系, {代表昵称: [合并进来的原昵称]})。
+        代表昵称取该类中所在群最多的原昵称；只包含合并了多个昵称的类
+    """
+    counts = Counter()
+    for member_ids in membership.group_members:
+        counts.update(member_ids)
+    member_ids = sorted(counts)
+    names = membership.members.lookup(member_ids)
+    labels = cluster_nicknames(names, threshold)
+
+    clusters: Dict[int, List[int]] = {}
+    for member_id, label in zip(member_ids, labels):
+        clusters.setdefault(label, []).append(member_id)
+    canonical = StringTable()
+    canonical_of: Dict[int, int] = {}
+    aliases: Dict[str, List[str]] = {}
+    for cluster in clusters.values():
+        representative = max(cluster, key=lambda m: (counts[m], -len(membership.members[m])))
+        canonical_id = canonical.intern(membership.members[representative])
+        for member_id in cluster:
+            canonical_of[member_id] = canonical_id
+        if len(cluster) > 1:
+            aliases[membership.members[representative]] = sorted(membership.members.lookup(cluster))
+
+    merged = Membership(canonical)
+    for group_name, group_ids in zip(membership.group_names(), membership.group_members):
+        merged.set_group(group_name, {canonical_of[m] for m in group_ids})
+    return merged, aliases
+
 
 class GroupAnalyzer:
-    def __init__(self):
-        self.groups_data: Dict[str, List[str]] = {}
+    def __init__(self, engine: str = "matrix", workers: Optional[int] = None):
+        """
+        Args:
+            engine: 分析引擎，"matrix"（位压缩矩阵，默认）、"python" 或 "process"（多进程分片）
+            workers: "process" 引擎的进程数，默认为 CPU 核数
+        """
+        self.engine = engine
+        self.workers = workers
+        self.membership = Membership()
+        self.min_groups = 2
         self.common_members: Dict[str, Set[str]] = {}
+        self.group_overlap: Optional[GroupOverlap] = None
+        self.group_graph: Optional[GroupGraph] = None
+        # 模糊匹配时合并的昵称 {代表昵称: [原昵称]}
+        self.aliases: Dict[str, List[str]] = {}
 
-    def analyze_common_members(self, groups: Dict[str, List[str]], min_groups: int = 2):
+    def analyze_common_members(self, groups: Union[Membership, Dict[str, List[str]]], min_groups: int = 2,
+                               fuzzy: bool = False, threshold: float = DEFAULT_THRESHOLD):
         """
         分析多个群的共同成员
         
         Args:
-            groups: 群组数据，格式为 {群名: [成员列表]}
+            groups: 群成员关系 Membership，或 {群名: [成员列表]}
             min_groups: 最少出现在几个群中
+            fuzzy: 模糊匹配昵称，把只在表情、全角半角、空白、备注后缀上有差别
+                或足够相似的昵称视为同一个人，合并的昵称记录在 self.aliases
+            threshold: 模糊匹配的相似度阈值
         """
-        self.groups_data = groups
-        member_groups: Dict[str, Set[str]] = {}
-
-        # 统计每个成员在哪些群中
-        for group_name, members in groups.items():
-            for member in members:
-                if member not in member_groups:
-                    member_groups[member] = set()
-                member_groups[member].add(group_name)
+        if not isinstance(groups, Membership):
+            groups = Membership.from_dict(groups)
+        self.aliases = {}
+        if fuzzy:
+            groups, self.aliases = merge_similar_members(groups, threshold)
+        self.membership = groups
+        self.min_groups = min_groups
+        member_groups = find_common_members(groups, min_groups, self.engine, self.workers)
 
-        # 筛选出现在多个群的成员
+        # 只在输出时把 ID 转回昵称和群名
+        member_names = groups.members.strings
+        group_names = groups.groups.strings
         self.common_members = {
-            member: groups 
-            for member, groups in member_groups.items() 
-            if len(groups) >= min_groups
+            member_names[member_id]: {group_names[g] for g in group_ids}
+            for member_id, group_ids in member_groups.items()
         }
 
         return self.common_members
 
+    def group_count_histogram(self) -> List[int]:
+        """上一次分析中所在群数的分布，第 n 项为恰好在 n 个群中的成员数"""
+        counts = member_scores(self.membership).astype(np.int64)
+        histogram = np.bincount(counts, minlength=1)
+        histogram[:1] = 0
+        return histogram.tolist()
+
+    def filter_common_members(self, min_groups: int) -> Dict[str, Set[str]]:
+        """
+        不重新分析，从上一次的结果中取出至少在 min_groups 个群中的成员
+        
+        Args:
+            min_groups: 新的阈值，不能低于分析时使用的 min_groups
+        """
+        if min_groups < self.min_groups:
+            raise ValueError(f"阈值不能低于分析时的 {self.min_groups}，请重新分析")
+        return {member: groups for member, groups in self.common_members.items() if len(groups) >= min_groups}
+
+    def analyze_group_overlap(self, groups: Union[Membership, Dict[str, Sequence[str]], None] = None,
+                              selected_groups: Optional[Sequence[str]] = None) -> GroupOverlap:
+        """
+        计算选中群两两之间的共同成员数和 Jaccard 相似度
+        
+        Args:
+            groups: 群成员关系，默认使用上一次分析的数据
+            selected_groups: 参与计算的群名，默认全部
+            
+        Returns:
+            GroupOverlap，其中 intersections 和 jaccard 为 群 × 群 的矩阵
+        """
+        if groups is not None:
+            if not isinstance(groups, Membership):
+                groups = Membership.from_dict(groups)
+            self.membership = groups
+        self.group_overlap = compute_group_overlap(self.membership, selected_groups)
+        return self.group_overlap
+
+    def analyze_group_graph(self, groups: Union[Membership, Dict[str, Sequence[str]], None] = None,
+                            selected_groups: Optional[Sequence[str]] = None, min_shared: int = 1) -> GroupGraph:
+        """
+        构建群共同成员图，找出共享受众的群簇
+        
+        Args:
+            groups: 群成员关系，默认使用上一次分析的数据
+            selected_groups: 参与计算的群名，默认全部
+            min_shared: 共同成员少于此数的群对不连边
+            
+        Returns:
+            GroupGraph，含连通分量 components 和社区 communities
+        """
+        if groups is not None:
+            if not isinstance(groups, Membership):
+                groups = Membership.from_dict(groups)
+            self.membership = groups
+        self.group_graph = build_group_graph(self.membership, selected_groups, min_shared)
+        return self.group_graph
+
+    def analyze_approximate_overlap(self, sketches: Optional[Dict[str, np.ndarray]] = None,
+                                    load_members: Optional[Callable[[str], Sequence[int]]] = None,
+                                    top_k: int = 100) -> List[Dict]:
+        """
+        近似模式：只用 MinHash 签名挑选候选群对，精确计算排在前面的候选
+        
+        适用于几千个群、精确计算所有群对开销过大的情况。
+        
+        Args:
+            sketches: {群名: MinHash 签名}，默认根据上一次分析的数据计算
+            load_members: 根据群名读取成员 ID 的函数，默认使用上一次分析的数据
+            top_k: 返回的群对数
+            
+        Returns:
+            重叠最多的群对，格式同 GroupOverlap.top_pairs，另含 estimated_jaccard
+        """
+        if sketches is None:
+            member_names = self.membership.members.strings
+            sketches = {
+                name: compute_minhash(member_names[m] for m in self.membership.members_of(name))
+                for name in self.membership.group_names()
+            }
+        if load_members is None:
+            load_members = self.membership.members_of
+        return approximate_group_overlap(sketches, load_members, top_k)
+
+    def top_members(self, k: int = 100, weighting: str = "count") -> List[Dict]:
+        """
+        上一次分析中所在群最多（或加权分数最高）的 k 个成员
+        
+        Args:
+            k: 返回的成员数
+            weighting: 计分方式，见 RANK_WEIGHTINGS
+            
+        Returns:
+            [{"member", "group_count", "score", "groups"}]，按分数从高到低排列
+        """
+        ranked = top_members(self.membership, k, weighting)
+        if not ranked:
+            return []
+        member_ids = np.array(sorted(member_id for member_id, _ in ranked), dtype=np.int64)
+        pair_members, pair_groups = membership_pairs(self.membership)
+        keep = np.isin(pair_members, member_ids)
+        groups_of: Dict[int, List[str]] = {}
+        group_names = self.membership.groups.strings
+        for member_id, group_id in zip(pair_members[keep].tolist(), pair_groups[keep].tolist()):
+            groups_of.setdefault(member_id, []).append(group_names[group_id])
+
+        member_names = self.membership.members.strings
+        return [
+            {
+                "member": member_names[member_id],
+                "group_count": len(groups_of[member_id]),
+                "score": score,
+                "groups": groups_of[member_id]
+            }
+            for member_id, score in ranked
+        ]
+
+    def top_group_pairs(self, k: int = 100, weighting: str = "count") -> List[Dict]:
+        """
+        上一次分析中共同成员最多（或加权分数最高）的 k 对群
+        
+        Args:
+            k: 返回的群对数
+            weighting: 计分方式，见 RANK_WEIGHTINGS
+        """
+        return top_group_pairs(self.membership, k, weighting)
+
+    def export_group_overlap(self, filepath: str):
+        """
+        导出群两两重叠情况到文件
+        
+        Args:
+            filepath: 导出文件路径
+        """
+        if not self.group_overlap:
+            return False
+
+        try:
+            with open(filepath, 'w', encoding='utf-8') as f:
+                f.write("群聊A,群聊B,群聊A人数,群聊B人数,共同成员,Jaccard\n")
+                for pair in self.group_overlap.top_pairs():
+                    f.write(f"{pair['group_a']},{pair['group_b']},{pair['size_a']},{pair['size_b']},"
+                            f"{pair['shared']},{pair['jaccard']:.4f}\n")
+            return True
+        except Exception as e:
+            print(f"导出失败: {e}")
+            return False
+
+    def export_group_graph(self, filepath: str):
+        """
+        导出群共同成员图中每个群所属的连通分量和社区
+        
+        Args:
+            filepath: 导出文件路径
+        """
+        if not self.group_graph:
+            return False
+
+        graph = self.group_graph
+        try:
+            with open(filepath, 'w', encoding='utf-8') as f:
+                f.write("群聊,人数,连通分量,社区,相连群数,与其他群共同成员合计\n")
+                rows = zip(graph.groups, graph.sizes.tolist(), graph.components.tolist(),
+                           graph.communities.tolist(), graph.degrees().tolist(), graph.strengths().tolist())
+                for group, size, component, community, degree, strength in rows:
+                    f.write(f"{group},{size},{component},{community},{degree},{int(strength)}\n")
+            return True
+        except Exception as e:
+            print(f"导出失败: {e}")
+            return False
+
     def export_results(self, filepath: str):
         """
         导出分析结果到文件
@@ -50,4 +757,558 @@ class GroupAnalyzer:
             return True
         except Exception as e:
             print(f"导出失败: {e}")
-            return False 
\ No newline at end of file
+            return False
+
+
+class IncrementalAnalyzer:
+    """增量维护的重复成员分析
+
+    记录每个成员所在的群。某个群的成员变化时只按新加入和退出的成员更新
+    计数和 common_members，开销与变化的人数成正比，不需要重新统计全部
+    群成员关系。common_members 的格式与 GroupAnalyzer 相同。
+    """
+
+    def __init__(self, members: Optional[StringTable] = None, min_groups: int = 2):
+        """
+        Args:
+            members: 成员昵称驻留表，应与传入的成员 ID 来源一致
+            min_groups: 最少出现在几个群中才算重复成员
+        """
+        self.members = members if members is not None else StringTable()
+        self.min_groups = min_groups
+        self.groups: Dict[str, array] = {}
+        self.member_groups: Dict[int, Set[str]] = {}
+        self.common_members: Dict[str, Set[str]] = {}
+        # 所在群数的分布 {群数: 成员数}，随成员变化增量维护
+        self.count_histogram: Counter = Counter()
+
+    def histogram(self) -> List[int]:
+        """所在群数的分布，第 n 项为恰好在 n 个群中的成员数"""
+        counts = [n for n, members in self.count_histogram.items() if members]
+        histogram = [0] * (max(counts, default=0) + 1)
+        for n in counts:
+            histogram[n] = self.count_histogram[n]
+        return histogram
+
+    def set_min_groups(self, min_groups: int) -> Set[str]:
+        """
+        修改重复成员的阈值
+        
+        每个成员所在的群已经记录，只需把所在群数介于新旧阈值之间的成员
+        加入或移出 common_members，不需要重新分析。
+        
+        Returns:
+            有变化的成员昵称
+        """
+        low, high = sorted((self.min_groups, min_groups))
+        self.min_groups = min_groups
+        changed = set()
+        if low == high:
+            return changed
+        for member_id, groups in self.member_groups.items():
+            if low <= len(groups) < high:
+                name = self.members[member_id]
+                if len(groups) >= min_groups:
+                    self.common_members[name] = groups
+                else:
+                    del self.common_members[name]
+                changed.add(name)
+        return changed
+
+    def top_members(self, k: int = 100, weighting: str = "count") -> List[Tuple[str, List[str], float]]:
+        """
+        当前所在群最多（或加权分数最高）的 k 个重复成员
+        
+        用堆做部分选择，开销为 O(n log k)，不需要对全部重复成员排序。
+        
+        Args:
+            k: 返回的成员数
+            weighting: 计分方式，见 RANK_WEIGHTINGS
+            
+        Returns:
+            [(成员昵称, [所在群], 分数)]，按分数从高到低排列，同分时先发现的在前
+        """
+        if weighting not in RANK_WEIGHTINGS:
+            raise ValueError(f"未知的计分方式: {weighting}")
+        if weighting == "count":
+            def score(groups):
+                return len(groups)
+        else:
+            inverse_sizes = {name: 1.0 / len(ids) for name, ids in self.groups.items() if ids}
+
+            def score(groups):
+                return sum(inverse_sizes.get(name, 0.0) for name in groups)
+
+        scored = ((score(groups), member) for member, groups in self.common_members.items())
+        top = heapq.nlargest(k, scored, key=lambda item: item[0])
+        return [(member, sorted(self.common_members[member]), value) for value, member in top]
+
+    def apply_delta(self, group_name: str, joined: Iterable[int], left: Iterable[int]) -> Set[str]:
+        """
+        应用一个群的成员变化
+        
+        Args:
+            group_name: 群名
+            joined: 新加入的成员 ID
+            left: 退出的成员 ID
+            
+        Returns:
+            common_members 中有变化（新增、删除或所在群变化）的成员昵称
+        """
+        changed = []
+        histogram = self.count_histogram
+        for member_id in joined:
+            groups = self.member_groups.setdefault(member_id, set())
+            if groups:
+                histogram[len(groups)] -= 1
+            groups.add(group_name)
+            histogram[len(groups)] += 1
+            changed.append(member_id)
+        for member_id in left:
+            groups = self.member_groups.get(member_id)
+            if groups is None:
+                continue
+            histogram[len(groups)] -= 1
+            groups.discard(group_name)
+            if groups:
+                histogram[len(groups)] += 1
+            else:
+                del self.member_groups[member_id]
+            changed.append(member_id)
+
+        changed_names = set()
+        for member_id in changed:
+            name = self.members[member_id]
+            groups = self.member_groups.get(member_id)
+            if groups is not None and len(groups) >= self.min_groups:
+                self.common_members[name] = groups
+                changed_names.add(name)
+            elif self.common_members.pop(name, None) is not None:
+                changed_names.add(name)
+        return changed_names
+
+    def set_group(self, group_name: str, member_ids: Sequence[int]) -> Set[str]:
+        """用一个群最新的成员 ID 更新结果，返回有变化的成员昵称"""
+        if not isinstance(member_ids, array):
+            member_ids = array('I', sorted(set(member_ids)))
+        old_ids = self.groups.get(group_name)
+        self.groups[group_name] = member_ids
+        if old_ids is None:
+            return self.apply_delta(group_name, member_ids, ())
+        if old_ids == member_ids:
+            return set()
+        joined, left = diff_member_sets(old_ids, member_ids)
+        return self.apply_delta(group_name, joined, left)
+
+    def remove_group(self, group_name: str) -> Set[str]:
+        """移除一个群，返回有变化的成员昵称"""
+        old_ids = self.groups.pop(group_name, None)
+        if old_ids is None:
+            return set()
+        return self.apply_delta(group_name, (), old_ids)
+
+    def retain_groups(self, group_names: Iterable[str]) -> Set[str]:
+        """只保留指定的群，返回有变化的成员昵称"""
+        keep = set(group_names)
+        changed = set()
+        for group_name in [name for name in self.groups if name not in keep]:
+            changed |= self.remove_group(group_name)
+        return changed
+
+    def update(self, membership: Membership) -> Set[str]:
+        """
+        把结果更新为 membership 中的群
+        
+        未出现在 membership 中的群会被移除，成员未变化的群不产生任何开销。
+        
+        Returns:
+            有变化的成员昵称
+        """
+        changed = self.retain_groups(membership.group_names())
+        for group_id, group_name in enumerate(membership.group_names()):
+            changed |= self.set_group(group_name, membership.group_members[group_id])
+        return changed
+
+
+class AnalysisResult(NamedTuple):
+    """分析状态的一次更新，创建后不再修改，可以直接交给界面线程
+
+    rows 只包含本次有变化的成员，界面按它原地更新表格即可，不需要
+    重新读取全部结果。
+    """
+    rows: Mapping[str, Optional[Tuple[str, ...]]]  # 成员昵称 -> 所在群（升序），None 表示已不是重复成员
+    histogram: Tuple[int, ...]  # 第 n 项为恰好在 n 个群中的成员数
+    min_groups: int
+    common_count: int  # 当前的重复成员数
+    group_count: int  # 已分析的群数
+
+
+class AnalysisEngine:
+    """界面和核心共用的重复成员分析
+
+    IncrementalAnalyzer 只在一个专用的后台线程中读写，所有操作都排队
+    提交到该线程并立即返回 Future，按提交顺序执行。界面线程不会被分析
+    阻塞，也不会读到正在修改的状态，只接收 AnalysisResult。
+    """
+
+    def __init__(self, members: Optional[StringTable] = None, min_groups: int = 2):
+        """
+        Args:
+            members: 成员昵称驻留表，应与传入的成员 ID 来源一致
+            min_groups: 最少出现在几个群中才算重复成员
+        """
+        self._analyzer = IncrementalAnalyzer(members, min_groups)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="analysis")
+
+    def _submit(self, func: Callable[[], Set[str]]) -> "Future[AnalysisResult]":
+        return self._executor.submit(lambda: self._result(func()))
+
+    def _result(self, changed: Set[str]) -> AnalysisResult:
+        analyzer = self._analyzer
+        rows = {}
+        for member in changed:
+            groups = analyzer.common_members.get(member)
+            rows[member] = tuple(sorted(groups)) if groups is not None else None
+        return AnalysisResult(
+            rows=MappingProxyType(rows),
+            histogram=tuple(analyzer.histogram()),
+            min_groups=analyzer.min_groups,
+            common_count=len(analyzer.common_members),
+            group_count=len(analyzer.groups)
+        )
+
+    def current(self) -> "Future[AnalysisResult]":
+        """当前状态（rows 为空）"""
+        return self._submit(set)
+
+    def all_rows(self) -> "Future[AnalysisResult]":
+        """当前状态，rows 包含全部重复成员，用于重建表格"""
+        return self._submit(lambda: set(self._analyzer.common_members))
+
+    def set_group(self, group_name: str, member_ids: Sequence[int]) -> "Future[AnalysisResult]":
+        """用一个群最新的成员 ID 更新结果"""
+        return self._submit(lambda: self._analyzer.set_group(group_name, member_ids))
+
+    def retain_groups(self, group_names: Iterable[str]) -> "Future[AnalysisResult]":
+        """只保留指定的群"""
+        group_names = list(group_names)
+        return self._submit(lambda: self._analyzer.retain_groups(group_names))
+
+    def update(self, membership: Membership) -> "Future[AnalysisResult]":
+        """把结果更新为 membership 中的群"""
+        return self._submit(lambda: self._analyzer.update(membership))
+
+    def set_min_groups(self, min_groups: int) -> "Future[AnalysisResult]":
+        """修改重复成员的阈值"""
+        return self._submit(lambda: self._analyzer.set_min_groups(min_groups))
+
+    def top_members(self, k: int = 100, weighting: str = "count") -> "Future[List[Tuple[str, List[str], float]]]":
+        """所在群最多（或加权分数最高）的 k 个重复成员，见 IncrementalAnalyzer.top_members"""
+        return self._executor.submit(self._analyzer.top_members, k, weighting)
+
+    def shutdown(self):
+        """不再接受新的操作，已提交的操作执行完后退出后台线程"""
+        self._executor.shutdown(wait=False)
+
+
+# 查询表达式的词法：引号括起的群名、运算符、数字或不含运算符的群名
+QUERY_TOKEN_PATTERN = re.compile(
+    r'\s*(?:(?P<string>"[^"]*"|\'[^\']*\'|“[^”]*”)|(?P<op>[&|^\-(),])|(?P<word>[^\s&|^\-(),"\'“”]+))'
+)
+# 按成员出现次数筛选的函数，第一个参数为次数
+QUERY_COUNT_FUNCTIONS = ("exactly", "atleast", "atmost")
+QUERY_FUNCTIONS = ("any", "all") + QUERY_COUNT_FUNCTIONS
+
+
+class MembershipQuery:
+    """基于位集合的群成员集合运算
+
+    每个群的成员预先转换成一个 Python 整数位集合（第 i 位表示成员 ID i），
+    交、并、差、对称差都是整数按位运算，几百个群的查询也能即时返回。
+
+    表达式语法::
+
+        "群A" & "群B" - 群C       交集、差集；群名含空格或运算符时加引号
+        A | B、A ^ B             并集、对称差
+        any(A, B)、all(A, B)     在任一群中 / 在所有群中
+        exactly(1, A, B, C)      恰好在其中 1 个群中
+        atleast(2, ...)、atmost(1, ...)
+        "家长群*"                 通配符匹配多个群，作为函数参数时展开为多个群
+
+    运算符优先级从高到低为 - & ^ |，与 Python 的集合运算一致。
+    """
+
+    def __init__(self, membership: Membership):
+        self.membership = membership
+        member_count = max([len(membership.members)] + [ids[-1] + 1 for ids in membership.group_members if ids])
+        self.bitsets: List[int] = []
+        mask = np.zeros(member_count, dtype=bool)
+        for member_ids in membership.group_members:
+            ids = np.frombuffer(member_ids, dtype=np.uint32)
+            mask[ids] = True
+            self.bitsets.append(int.from_bytes(np.packbits(mask, bitorder="little").tobytes(), "little"))
+            mask[ids] = False
+        self.universe = 0
+        for bits in self.bitsets:
+            self.universe |= bits
+
+    def resolve(self, pattern: str) -> List[int]:
+        """群名或通配符对应的群 ID"""
+        group_id = self.membership.groups.get_id(pattern)
+        if group_id is not None:
+            return [group_id]
+        if any(c in pattern for c in "*?["):
+            group_ids = [
+                group_id for group_id, name in enumerate(self.membership.group_names())
+                if fnmatch.fnmatchcase(name, pattern)
+            ]
+            if group_ids:
+                return group_ids
+        raise ValueError(f"未找到群聊: {pattern}")
+
+    def evaluate(self, expression: str) -> Tuple[int, List[int]]:
+        """
+        计算查询表达式
+        
+        Returns:
+            (结果位集合, 表达式中引用到的群 ID)
+        """
+        parser = _QueryParser(self, expression)
+        return parser.parse(), sorted(parser.referenced)
+
+    def query(self, expression: str) -> List[int]:
+        """返回满足表达式的成员 ID（升序）"""
+        return self.to_ids(self.evaluate(expression)[0])
+
+    def query_names(self, expression: str) -> List[str]:
+        """返回满足表达式的成员昵称"""
+        return self.membership.members.lookup(self.query(expression))
+
+    def groups_of(self, member_id: int, group_ids: Optional[Iterable[int]] = None) -> List[str]:
+        """成员所在的群名，可限定在 group_ids 范围内"""
+        if group_ids is None:
+            group_ids = range(len(self.bitsets))
+        group_names = self.membership.groups.strings
+        return [group_names[g] for g in group_ids if self.bitsets[g] >> member_id & 1]
+
+    @staticmethod
+    def to_ids(bits: int) -> List[int]:
+        """位集合转成员 ID"""
+        if not bits:
+            return []
+        data = np.frombuffer(bits.to_bytes((bits.bit_length() + 7) // 8, "little"), dtype=np.uint8)
+        return np.flatnonzero(np.unpackbits(data, bitorder="little")).tolist()
+
+    def count_equal(self, operands: List[int], count: int) -> int:
+        """恰好出现在 count 个操作数中的成员
+
+        把每个操作数逐位相加到二进制计数器中（planes[i] 为计数的第 i 位），
+        开销与操作数个数 × log(操作数个数) 次整数运算成正比。
+        """
+        planes: List[int] = []
+        for bits in operands:
+            carry = bits
+            for i, plane in enumerate(planes):
+                planes[i], carry = plane ^ carry, plane & carry
+                if not carry:
+                    break
+            if carry:
+                planes.append(carry)
+        if count >= 1 << len(planes):
+            return 0
+        result = self.universe
+        for i, plane in enumerate(planes):
+            result &= plane if count >> i & 1 else ~plane
+        return result
+
+
+class _QueryParser:
+    """MembershipQuery 表达式的递归下降解析器，边解析边求值"""
+
+    def __init__(self, query: MembershipQuery, expression: str):
+        self.query = query
+        self.expression = expression
+        self.tokens: List[Tuple[str, str]] = []
+        self.position = 0
+        self.referenced: Set[int] = set()
+
+        position = 0
+        expression = expression.rstrip()
+        while position < len(expression):
+            match = QUERY_TOKEN_PATTERN.match(expression, position)
+            if not match or match.end() == position:
+                raise ValueError(f"无法识别的查询表达式: {expression[position:]}")
+            kind = match.lastgroup
+            value = match.group(kind)
+            if kind == "string":
+                value = value[1:-1]
+            self.tokens.append((kind, value))
+            position = match.end()
+
+    def peek(self) -> Optional[Tuple[str, str]]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def take(self, op: Optional[str] = None) -> Tuple[str, str]:
+        token = self.peek()
+        if token is None:
+            raise ValueError("查询表达式不完整")
+        if op is not None and token != ("op", op):
+            raise ValueError(f"查询表达式缺少 '{op}'，位置在 '{token[1]}'")
+        self.position += 1
+        return token
+
+    def parse(self) -> int:
+        if not self.tokens:
+            raise ValueError("查询表达式为空")
+        result = self._union(self.parse_union())
+        if self.peek() is not None:
+            raise ValueError(f"查询表达式多余的内容: '{self.peek()[1]}'")
+        return result
+
+    @staticmethod
+    def _union(operands: List[int]) -> int:
+        result = 0
+        for bits in operands:
+            result |= bits
+        return result
+
+    def _binary(self, parse_operand, op: str, combine) -> List[int]:
+        operands = parse_operand()
+        if self.peek() != ("op", op):
+            return operands
+        result = self._union(operands)
+        while self.peek() == ("op", op):
+            self.take()
+            result = combine(result, self._union(parse_operand()))
+        return [result]
+
+    # 每一级返回操作数列表：通配符匹配到的多个群在作为函数参数时保持展开
+    def parse_union(self) -> List[int]:
+        return self._binary(self.parse_xor, "|", lambda a, b: a | b)
+
+    def parse_xor(self) -> List[int]:
+        return self._binary(self.parse_and, "^", lambda a, b: a ^ b)
+
+    def parse_and(self) -> List[int]:
+        return self._binary(self.parse_difference, "&", lambda a, b: a & b)
+
+    def parse_difference(self) -> List[int]:
+        return self._binary(self.parse_atom, "-", lambda a, b: a & ~b)
+
+    def parse_atom(self) -> List[int]:
+        kind, value = self.take()
+        if kind == "op":
+            if value != "(":
+                raise ValueError(f"查询表达式中意外的 '{value}'")
+            operands = self.parse_union()
+            self.take(")")
+            return operands
+        if kind == "word" and value.lower() in QUERY_FUNCTIONS and self.peek() == ("op", "("):
+            return [self.parse_function(value.lower())]
+        group_ids = self.query.resolve(value)
+        self.referenced.update(group_ids)
+        return [self.query.bitsets[g] for g in group_ids]
+
+    def parse_function(self, name: str) -> int:
+        self.take("(")
+        count = None
+        if name in QUERY_COUNT_FUNCTIONS:
+            kind, value = self.take()
+            if kind != "word" or not value.isdigit():
+                raise ValueError(f"{name}() 的第一个参数应为次数")
+            count = int(value)
+            self.take(",")
+        operands = self.parse_union()
+        while self.peek() == ("op", ","):
+            self.take()
+            operands = operands + self.parse_union()
+        self.take(")")
+
+        if name == "any":
+            return self._union(operands)
+        if name == "all":
+            result = self.query.universe
+            for bits in operands:
+                result &= bits
+            return result
+        if name == "exactly":
+            return self.query.count_equal(operands, count)
+        if name == "atmost":
+            return self._union(self.query.count_equal(operands, n) for n in range(count + 1))
+        # atleast：排除出现次数少于 count 的成员
+        fewer = self._union(self.query.count_equal(operands, n) for n in range(count))
+        return self.query.universe & ~fewer
+
+
+def count_member_groups(membership: Membership, min_groups: int = 2) -> Dict[int, List[int]]:
+    """
+    统计每个成员所在的群
+    
+    Args:
+        membership: 群成员关系
+        min_groups: 最少出现在几个群中
+        
+    Returns:
+        {成员 ID: [群 ID]}，只包含出现在至少 min_groups 个群的成员
+    """
+    counts = Counter()
+    for member_ids in membership.group_members:
+        counts.update(member_ids)
+    member_groups = {member_id: [] for member_id, count in counts.items() if count >= min_groups}
+    for group_id, member_ids in enumerate(membership.group_members):
+        for member_id in member_ids:
+            group_ids = member_groups.get(member_id)
+            if group_ids is not None:
+                group_ids.append(group_id)
+    return member_groups
+
+
+def diff_member_sets(old: Sequence[int], new: Sequence[int]) -> Tuple[List[int], List[int]]:
+    """
+    比较同一个群前后两次的成员
+    
+    Args:
+        old: 旧成员 ID
+        new: 新成员 ID
+        
+    Returns:
+        (新加入的成员 ID, 退出的成员 ID)
+    """
+    old_set = set(old)
+    new_set = set(new)
+    return sorted(new_set - old_set), sorted(old_set - new_set)
+
+
+def diff_snapshots(old_groups: Dict[str, int], new_groups: Dict[str, int],
+                   load_set: Callable[[int], Sequence[int]]) -> Dict[str, Dict[str, List[int]]]:
+    """
+    比较两个快照中每个群的成员变化
+    
+    Args:
+        old_groups: 旧快照 {群标识: 成员集合 ID}
+        new_groups: 新快照 {群标识: 成员集合 ID}
+        load_set: 根据成员集合 ID 读取成员 ID 的函数
+        
+    Returns:
+        {群标识: {"joined": [成员 ID], "left": [成员 ID]}}，只包含有变化的群
+    """
+    loaded: Dict[int, Sequence[int]] = {}
+
+    def members_of(set_id):
+        if set_id is None:
+            return ()
+        if set_id not in loaded:
+            loaded[set_id] = load_set(set_id)
+        return loaded[set_id]
+
+    changes = {}
+    for group_name in list(old_groups) + [g for g in new_groups if g not in old_groups]:
+        old_set_id = old_groups.get(group_name)
+        new_set_id = new_groups.get(group_name)
+        # 两个快照共用同一份成员集合时群没有变化，不需要读取成员
+        if old_set_id == new_set_id:
+            continue
+        joined, left = diff_member_sets(members_of(old_set_id), members_of(new_set_id))
+        if joined or left:
+            changes[group_name] = {"joined": joined, "left": left}
+    return changes
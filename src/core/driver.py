@@ -0,0 +1,295 @@
+import functools
+from collections import Counter
+from typing import Any, List, NamedTuple, Optional
+
+# UI 自动化控件类型（UIA ControlTypeId）
+BUTTON = 50000
+EDIT = 50004
+LIST_ITEM = 50007
+LIST = 50008
+TEXT = 50020
+WINDOW = 50032
+PANE = 50033
+
+
+class Rect(NamedTuple):
+    """屏幕坐标中的矩形，方法与 uiautomation 的 Rect 一致"""
+    left: int
+    top: int
+    right: int
+    bottom: int
+
+    def width(self) -> int:
+        return self.right - self.left
+
+    def height(self) -> int:
+        return self.bottom - self.top
+
+    def xcenter(self) -> int:
+        return self.left + self.width() // 2
+
+    def ycenter(self) -> int:
+        return self.top + self.height() // 2
+
+    def contains(self, x: int, y: int) -> bool:
+        return self.left <= x < self.right and self.top <= y < self.bottom
+
+    def is_empty(self) -> bool:
+        return self.right <= self.left or self.bottom <= self.top
+
+    def intersects(self, other: "Rect") -> bool:
+        return (self.left < other.right and other.left < self.right and
+                self.top < other.bottom and other.top < self.bottom)
+
+
+def counted(method):
+    """统计驱动方法的调用次数，对真实的微信每次调用都是一次跨进程往返"""
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self.calls[name] += 1
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+class SnapshotElement:
+    """一次性读入进程内的控件，属性和子控件不再需要跨进程读取"""
+
+    __slots__ = ("control_type", "name", "rect", "children")
+
+    def __init__(self, control_type: int, name: str, rect: Rect):
+        self.control_type = control_type
+        self.name = name
+        self.rect = rect
+        self.children: List["SnapshotElement"] = []
+
+    def __repr__(self) -> str:
+        return f"SnapshotElement({self.control_type}, {self.name!r})"
+
+
+class UIDriver:
+    """界面自动化驱动
+
+    WeChatController 只通过这里的方法查找窗口、读取控件属性和模拟鼠标键盘。
+    控件是驱动自己的对象，控制器不访问它们的属性，只把它们交回给驱动。
+    WindowsDriver 操作真实的微信，FakeDriver 在内存中模拟微信界面。
+
+    Attributes:
+        calls: 每个方法的调用次数，用于评估跨进程往返的次数
+    """
+
+    def __init__(self):
+        self.calls = Counter()
+
+    def call_count(self) -> int:
+        return sum(self.calls.values())
+
+    # ---- 窗口 ----
+
+    def find_main_window(self) -> Optional[Any]:
+        """查找微信主窗口，找不到时返回 None"""
+        raise NotImplementedError
+
+    def find_window(self, name: str) -> Optional[Any]:
+        """按标题查找顶层窗口，找不到时返回 None"""
+        raise NotImplementedError
+
+    def is_window(self, window: Any) -> bool:
+        """窗口是否仍然存在"""
+        raise NotImplementedError
+
+    def is_minimized(self, window: Any) -> bool:
+        raise NotImplementedError
+
+    def restore_window(self, window: Any):
+        raise NotImplementedError
+
+    def move_window(self, window: Any, rect: Rect):
+        raise NotImplementedError
+
+    def set_foreground(self, window: Any):
+        raise NotImplementedError
+
+    def force_foreground(self, window: Any):
+        """set_foreground 不起作用时使用的更强硬的激活方式"""
+        self.set_foreground(window)
+
+    def is_foreground(self, window: Any) -> bool:
+        raise NotImplementedError
+
+    def close_windows(self, title: str, exclude_titles=()) -> int:
+        """
+        关闭标题包含 title 的顶层窗口（微信主窗口除外）
+
+        Returns:
+            关闭的窗口数
+        """
+        raise NotImplementedError
+
+    # ---- 鼠标和键盘 ----
+
+    def click(self, x: int, y: int):
+        raise NotImplementedError
+
+    def move_to(self, x: int, y: int):
+        raise NotImplementedError
+
+    def scroll(self, amount: int):
+        """在鼠标当前位置滚动滚轮，负数向下"""
+        raise NotImplementedError
+
+    def hotkey(self, *keys: str):
+        raise NotImplementedError
+
+    def press(self, key: str):
+        raise NotImplementedError
+
+    def get_clipboard(self) -> str:
+        raise NotImplementedError
+
+    def set_clipboard(self, text: str):
+        raise NotImplementedError
+
+    def click_element(self, element: Any):
+        self.click(*self._center(element))
+
+    def send_keys(self, element: Any, keys: str):
+        raise NotImplementedError
+
+    def _center(self, element: Any):
+        rect = self.get_rect(element)
+        return rect.xcenter(), rect.ycenter()
+
+    # ---- 控件 ----
+
+    def find(self, root: Any, control_type: Optional[int] = None, name: Optional[str] = None,
+             class_name: Optional[str] = None, depth: Optional[int] = None) -> Optional[Any]:
+        """
+        在 root 的子树中查找第一个符合条件的控件
+
+        Args:
+            root: 开始查找的控件（不包括它自己）
+            control_type: 控件类型，见本模块的常量
+            name: 控件名称
+            class_name: 控件类名
+            depth: 最大查找深度，默认不限
+
+        Returns:
+            找到的控件，找不到时返回 None（立即返回，不等待）
+        """
+        raise NotImplementedError
+
+    def get_children(self, element: Any) -> List[Any]:
+        raise NotImplementedError
+
+    def get_name(self, element: Any) -> str:
+        raise NotImplementedError
+
+    def get_control_type(self, element: Any) -> int:
+        raise NotImplementedError
+
+    def get_class_name(self, element: Any) -> str:
+        raise NotImplementedError
+
+    def get_rect(self, element: Any) -> Rect:
+        raise NotImplementedError
+
+    def has_focus(self, element: Any) -> bool:
+        raise NotImplementedError
+
+    def get_value(self, element: Any) -> str:
+        """编辑框中的文字"""
+        raise NotImplementedError
+
+    def is_offscreen(self, element: Any) -> bool:
+        raise NotImplementedError
+
+    def get_scroll_percent(self, element: Any) -> Optional[float]:
+        """
+        列表垂直滚动的位置（0 到 100）
+
+        Returns:
+            不能滚动时返回 100；控件不支持滚动模式时返回 None
+        """
+        return None
+
+    def debug_element(self, element: Any, description: str = "") -> bool:
+        """
+        调试时显示控件信息
+
+        Returns:
+            用户选择退出调试时返回 False
+        """
+        rect = self.get_rect(element)
+        print(f"\n=== 调试UI元素 {description} ===")
+        print(f"类型: {self.get_control_type(element)}")
+        print(f"名称: {self.get_name(element)}")
+        print(f"类名: {self.get_class_name(element)}")
+        print(f"位置: 左={rect.left}, 上={rect.top}, 右={rect.right}, 下={rect.bottom}")
+        for i, child in enumerate(self.get_children(element), 1):
+            print(f"{i}. 类型={self.get_control_type(child)}, 名称={self.get_name(child)}")
+        return True
+
+    def snapshot(self, root: Any) -> SnapshotElement:
+        """
+        读取 root 整棵子树的控件类型、名称和位置，之后在进程内读取
+
+        基类逐个控件读取，WindowsDriver 用 UIA 缓存请求一次往返取回整棵子树。
+        """
+        node = SnapshotElement(self.get_control_type(root), self.get_name(root) or "", self.get_rect(root))
+        node.children = [self.snapshot(child) for child in self.get_children(root)]
+        return node
+
+    def close(self):
+        """释放驱动占用的资源"""
+
+
+class SnapshotDriver(UIDriver):
+    """读取 SnapshotElement 的驱动，只支持读取控件，所有读取都在进程内完成"""
+
+    def find(self, root: SnapshotElement, control_type: Optional[int] = None, name: Optional[str] = None,
+             class_name: Optional[str] = None, depth: Optional[int] = None) -> Optional[SnapshotElement]:
+        level = [root]
+        current_depth = 0
+        while level and (depth is None or current_depth < depth):
+            current_depth += 1
+            next_level = []
+            for element in level:
+                for child in element.children:
+                    if ((control_type is None or child.control_type == control_type)
+                            and (name is None or child.name == name)
+                            and class_name is None):
+                        return child
+                    next_level.append(child)
+            level = next_level
+        return None
+
+    def get_children(self, element: SnapshotElement) -> List[SnapshotElement]:
+        return element.children
+
+    def get_name(self, element: SnapshotElement) -> str:
+        return element.name
+
+    def get_control_type(self, element: SnapshotElement) -> int:
+        return element.control_type
+
+    def get_class_name(self, element: SnapshotElement) -> str:
+        return ""
+
+    def get_rect(self, element: SnapshotElement) -> Rect:
+        return element.rect
+
+    def is_offscreen(self, element: SnapshotElement) -> bool:
+        return False
+
+    def snapshot(self, root: SnapshotElement) -> SnapshotElement:
+        return root
+
+
+SNAPSHOT_DRIVER = SnapshotDriver()
+
+
+def driver_for(element: Any, driver: UIDriver) -> UIDriver:
+    """读取 element 用的驱动：已经读入进程的控件不再经过 driver"""
+    return SNAPSHOT_DRIVER if isinstance(element, SnapshotElement) else driver
@@ -0,0 +1,627 @@
+import heapq
+import itertools
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .driver import BUTTON, EDIT, LIST, LIST_ITEM, PANE, TEXT, WINDOW, Rect, SnapshotElement, UIDriver, counted
+
+# 各种界面变化的默认延迟（秒）
+DEFAULT_LATENCIES = {
+    "call": 0.0,      # 每次读取控件属性、子控件或查找控件（跨进程调用）
+    "page": 0.02,     # 切换聊天/通讯录页面
+    "window": 0.1,    # 通讯录管理窗口打开
+    "tab": 0.05,      # 通讯录管理中切换到群聊标签
+    "search": 0.05,   # 输入群名后出现搜索结果
+    "panel": 0.1,     # 聊天信息面板打开
+    "members": 0.1,   # 点击查看更多后显示全部成员
+    "scroll": 0.02,   # 滚动后列表内容更新
+}
+# 滚轮每单位滚动的像素数，scroll(-700) 滚动 350 像素
+SCROLL_PIXELS = 0.5
+# 聊天信息面板展开前显示的成员数
+PREVIEW_MEMBERS = 16
+# 会话列表显示的会话数
+MAX_SESSIONS = 10
+
+SURNAMES = "王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾肖田董袁潘于蒋蔡余杜叶程苏魏吕丁任沈"
+GIVEN = "伟芳娜秀英敏静丽强磊军洋勇艳杰娟涛明超霞平刚华玉兰萍红玲芬丹凤燕梅琳雪飞鹏辉建国志"
+TOPICS = ["读书会", "家长", "跑步", "摄影", "同学", "业主", "技术交流", "旅行", "羽毛球", "美食"]
+PHRASES = ["好的", "收到", "谢谢大家", "明天几点集合？", "哈哈哈", "👍", "已转账", "晚上好", "辛苦了"]
+
+
+def synthetic_account(group_count: int, min_members: int = 3, max_members: int = 500,
+                      member_pool: int = 20000, seed: int = 0) -> Dict[str, List[str]]:
+    """
+    生成模拟的微信账号
+
+    群大小偏向小群（大多数群只有几十人），成员从同一个昵称池中抽取，
+    不同的群之间有共同成员。
+
+    Returns:
+        {群名: [成员昵称]}，群名互不相同
+    """
+    rng = random.Random(seed)
+    pool = [f"{rng.choice(SURNAMES)}{rng.choice(GIVEN)}{i}" for i in range(member_pool)]
+    groups = {}
+    for i in range(group_count):
+        size = min_members + int((max_members - min_members) * rng.random() ** 3)
+        groups[f"{TOPICS[i % len(TOPICS)]}{i + 1}群"] = rng.sample(pool, min(size, member_pool))
+    return groups
+
+
+class FakeElement:
+    """
+    模拟的控件
+
+    窗口的 rect 是屏幕坐标，其他控件的 rect 相对于所在窗口的左上角。
+    children 可以是列表，也可以是每次调用时按界面状态生成子控件的函数。
+    """
+
+    __slots__ = ("control_type", "name", "rect", "window", "on_click", "class_name", "value",
+                 "scroller", "_children")
+
+    def __init__(self, control_type: int, name: str = "", rect: Rect = Rect(0, 0, 0, 0),
+                 window: Optional["FakeElement"] = None, children=(),
+                 on_click: Optional[Callable[[], None]] = None, class_name: str = ""):
+        self.control_type = control_type
+        self.name = name
+        self.rect = rect
+        self.window = window
+        self.on_click = on_click
+        self.class_name = class_name
+        self.value = ""
+        self.scroller: Optional["VirtualList"] = None
+        self._children = children
+
+    def children(self) -> Sequence["FakeElement"]:
+        return self._children() if callable(self._children) else self._children
+
+    def __repr__(self) -> str:
+        return f"FakeElement({self.control_type}, {self.name!r})"
+
+
+class VirtualList:
+    """
+    虚拟化列表：只有显示区域内的项作为子控件存在，滚动后子控件随之变化
+
+    Args:
+        element: 列表控件
+        items: 返回全部项的函数
+        make_item: 根据 (项, 相对窗口的位置) 生成子控件
+        item_height: 每行的高度
+        columns: 每行的项数
+    """
+
+    def __init__(self, element: FakeElement, items: Callable[[], Sequence],
+                 make_item: Callable[[Any, Rect], FakeElement], item_height: int, columns: int = 1):
+        self.element = element
+        self.items = items
+        self.make_item = make_item
+        self.item_height = item_height
+        self.columns = columns
+        self.offset = 0
+        element.scroller = self
+        element._children = self.visible
+
+    def max_offset(self) -> int:
+        rows = -(-len(self.items()) // self.columns)
+        return max(0, rows * self.item_height - self.element.rect.height())
+
+    def scroll_by(self, pixels: float):
+        self.offset = int(min(max(self.offset + pixels, 0), self.max_offset()))
+
+    def percent(self) -> float:
+        max_offset = self.max_offset()
+        return 100.0 if max_offset == 0 else self.offset * 100.0 / max_offset
+
+    def visible(self) -> List[FakeElement]:
+        items = self.items()
+        rect, height = self.element.rect, self.item_height
+        width = rect.width() // self.columns
+        first_row = self.offset // height
+        last_row = (self.offset + rect.height() - 1) // height
+        children = []
+        for index in range(first_row * self.columns, min((last_row + 1) * self.columns, len(items))):
+            row, column = divmod(index, self.columns)
+            top = rect.top + row * height - self.offset
+            left = rect.left + column * width
+            children.append(self.make_item(items[index], Rect(left, top, left + width, top + height)))
+        return children
+
+
+class FakeDriver(UIDriver):
+    """
+    在内存中模拟微信界面的驱动
+
+    模拟主窗口（侧边栏、搜索框和搜索结果、聊天记录、聊天信息面板和可滚动的
+    虚拟化成员列表）和通讯录管理窗口（群聊标签和虚拟化的群聊列表），
+    控件布局与 WeChatController 使用的坐标一致。点击、输入和滚动引起的界面
+    变化按 latencies 中的延迟生效，用于在没有微信客户端的环境中端到端地
+    测试和评估抓取逻辑。
+
+    Args:
+        groups: 模拟账号的群 {群名: [成员昵称]}，见 synthetic_account
+        latencies: 覆盖 DEFAULT_LATENCIES 中的延迟
+        chat_messages: 打开群聊时显示的聊天记录条数
+    """
+
+    def __init__(self, groups: Dict[str, List[str]], latencies: Optional[Dict[str, float]] = None,
+                 chat_messages: int = 50):
+        super().__init__()
+        self.groups = groups
+        self.titles = list(groups)
+        self.latencies = dict(DEFAULT_LATENCIES)
+        self.latencies.update(latencies or {})
+        self.chat_messages = chat_messages
+        # find 在微信进程内检查过的控件数，虽然只是一次往返，遍历的开销也与之成正比
+        self.find_visits = 0
+
+        self._events = []
+        self._sequence = itertools.count()
+        self.mouse = (0, 0)
+        self.clipboard = ""
+        self.focus: Optional[FakeElement] = None
+        self.foreground: Optional[FakeElement] = None
+        self.minimized = False
+        self._select_all = False
+
+        # 主窗口状态
+        self.page = "chat"
+        self.chat: Optional[str] = None
+        self.panel: Optional[str] = None  # None / "preview" / "expanded"
+        self.panel_chat: Optional[str] = None  # 聊天信息面板所属的聊天
+        self.search_query = ""
+        self.manage_window: Optional[FakeElement] = None
+        self.manage_tab = "all"
+
+        self.main = FakeElement(WINDOW, "微信", Rect(100, 50, 1100, 750), children=self._main_children,
+                                class_name="WeChatMainWndForPC")
+        self._build_main()
+
+    # ---- 模拟的界面 ----
+
+    def _build_main(self):
+        main = self.main
+        self.sidebar = FakeElement(PANE, "导航", Rect(0, 0, 60, 700), main, [
+            FakeElement(BUTTON, "聊天", Rect(10, 70, 50, 110), main,
+                        on_click=lambda: self._schedule("page", self._set_page, "chat")),
+            FakeElement(BUTTON, "通讯录", Rect(10, 120, 50, 160), main,
+                        on_click=lambda: self._schedule("page", self._set_page, "contacts")),
+        ])
+        self.search_box = FakeElement(EDIT, "搜索", Rect(70, 20, 250, 45), main, on_click=self._focus_search)
+        # 打开过的聊天排在会话列表最前面
+        self.session_titles = ["文件传输助手", "订阅号", "服务通知"]
+        self.sessions = FakeElement(LIST, "会话", Rect(60, 60, 300, 700), main, lambda: [
+            self._session_item(title, Rect(60, 60 + 60 * i, 300, 120 + 60 * i))
+            for i, title in enumerate(self.session_titles[:MAX_SESSIONS])
+        ])
+        self.search_results = FakeElement(LIST, "搜索结果", Rect(60, 50, 300, 700), main,
+                                          self._search_result_items)
+        self.contacts = FakeElement(PANE, "通讯录", Rect(60, 60, 300, 700), main, [
+            FakeElement(BUTTON, "通讯录管理", Rect(60, 85, 300, 115), main,
+                        on_click=lambda: self._schedule("window", self._open_manage_window)),
+            FakeElement(TEXT, "新的朋友", Rect(70, 130, 290, 160), main),
+        ])
+        self.chat_pane = FakeElement(PANE, "", Rect(300, 0, 1000, 700), main, self._chat_children)
+        self.messages: List[FakeElement] = []
+        self.info_button = FakeElement(BUTTON, "聊天信息", Rect(950, 20, 990, 55), main,
+                                       on_click=lambda: self._schedule("panel", self._set_panel, "preview", self.chat))
+        self.member_list = FakeElement(LIST, "聊天成员", Rect(700, 130, 1000, 640), main)
+        VirtualList(self.member_list, self._panel_members, self._member_item, item_height=70, columns=4)
+        self.view_more = FakeElement(BUTTON, "查看更多", Rect(760, 600, 940, 630), main,
+                                     on_click=lambda: self._schedule("members", self._set_panel, "expanded",
+                                                                     self.panel_chat))
+        self.info_panel = FakeElement(PANE, "", Rect(700, 60, 1000, 700), main, self._panel_children)
+
+    def _main_children(self) -> List[FakeElement]:
+        children = [self.sidebar, self.search_box]
+        if self.page == "contacts":
+            children.append(self.contacts)
+        else:
+            children.append(self.sessions)
+            if self.chat:
+                children.append(self.chat_pane)
+        if self.panel:
+            children.append(self.info_panel)
+        if self.search_query:
+            children.append(self.search_results)
+        return children
+
+    def _session_item(self, title: str, rect: Rect) -> FakeElement:
+        return FakeElement(LIST_ITEM, title, rect, self.main, [FakeElement(TEXT, title, rect, self.main)],
+                           on_click=lambda: self._select_session(title))
+
+    def _search_result_items(self) -> List[FakeElement]:
+        query = self.search_query
+        # 完全相同的群名排在最前面
+        matches = [query] if query in self.groups else []
+        matches += [title for title in self.titles if query in title and title != query][:4]
+        items = [FakeElement(TEXT, "群聊", Rect(60, 60, 300, 90), self.main)]
+        for i, title in enumerate(matches):
+            items.append(self._session_item(title, Rect(60, 120 + 50 * i, 300, 170 + 50 * i)))
+        return items
+
+    def _chat_children(self) -> List[FakeElement]:
+        return [
+            FakeElement(TEXT, self.chat or "", Rect(320, 15, 700, 50), self.main),
+            FakeElement(LIST, "消息", Rect(300, 60, 1000, 560), self.main, self.messages),
+            FakeElement(EDIT, "输入", Rect(300, 580, 1000, 700), self.main),
+            self.info_button,
+        ]
+
+    def _panel_children(self) -> List[FakeElement]:
+        main = self.main
+        children = [
+            FakeElement(TEXT, "群聊名称", Rect(720, 70, 980, 90), main),
+            FakeElement(EDIT, self.panel_chat or "", Rect(720, 90, 980, 120), main),
+            self.member_list,
+        ]
+        if self.panel == "preview":
+            children.append(self.view_more)
+        children += [
+            FakeElement(TEXT, "群公告", Rect(720, 645, 850, 665), main),
+            FakeElement(TEXT, "备注", Rect(850, 645, 980, 665), main),
+            FakeElement(BUTTON, "清空聊天记录", Rect(720, 670, 980, 695), main),
+        ]
+        return children
+
+    def _panel_members(self) -> List[str]:
+        members = self.groups.get(self.panel_chat, [])
+        return members if self.panel == "expanded" else members[:PREVIEW_MEMBERS]
+
+    def _member_item(self, member: str, rect: Rect) -> FakeElement:
+        avatar = Rect(rect.left + 15, rect.top + 5, rect.right - 15, rect.bottom - 25)
+        return FakeElement(LIST_ITEM, member, rect, self.main, [
+            FakeElement(BUTTON, member, avatar, self.main),
+            FakeElement(TEXT, member, Rect(rect.left, rect.bottom - 20, rect.right, rect.bottom), self.main),
+        ])
+
+    def _build_manage_window(self) -> FakeElement:
+        window = FakeElement(WINDOW, "通讯录管理", Rect(200, 100, 900, 640), class_name="ContactManagerWindow")
+        group_list = FakeElement(LIST, "", Rect(0, 230, 200, 700), window)
+        VirtualList(group_list, self._manage_items, self._manage_item, item_height=40)
+        window._children = [
+            FakeElement(PANE, "标签", Rect(0, 140, 200, 220), window, [
+                FakeElement(BUTTON, "全部", Rect(20, 150, 180, 180), window),
+                FakeElement(BUTTON, "群聊", Rect(20, 185, 180, 215), window,
+                            on_click=lambda: self._schedule("tab", self._set_manage_tab, "groups")),
+            ]),
+            group_list,
+        ]
+        self.group_list = group_list
+        return window
+
+    def _manage_items(self) -> Sequence[str]:
+        if self.manage_tab == "groups":
+            return self.titles
+        # “全部”标签下显示联系人，没有成员数
+        return [member for title in self.titles[:5] for member in self.groups[title][:10]]
+
+    def _manage_item(self, name: str, rect: Rect) -> FakeElement:
+        window = self.manage_window
+        children = [FakeElement(TEXT, name, Rect(rect.left + 50, rect.top, rect.right - 50, rect.bottom), window)]
+        if self.manage_tab == "groups":
+            count = f"({len(self.groups[name])})"
+            children.append(FakeElement(TEXT, count, Rect(rect.right - 50, rect.top, rect.right, rect.bottom), window))
+        return FakeElement(LIST_ITEM, name, rect, window, children)
+
+    # ---- 界面状态变化 ----
+
+    def _schedule(self, kind: str, action: Callable, *args):
+        """kind 对应的延迟之后执行 action"""
+        delay = self.latencies.get(kind, 0.0)
+        if delay <= 0:
+            action(*args)
+        else:
+            heapq.heappush(self._events, (time.monotonic() + delay, next(self._sequence), action, args))
+
+    def _advance(self):
+        """执行已到时间的界面变化"""
+        now = time.monotonic()
+        while self._events and self._events[0][0] <= now:
+            _, _, action, args = heapq.heappop(self._events)
+            action(*args)
+
+    def _call(self, round_trips: int = 1):
+        """读取控件的调用，每次跨进程往返耗时 latencies["call"]"""
+        self._advance()
+        latency = self.latencies["call"]
+        if latency > 0:
+            time.sleep(latency * round_trips)
+
+    def _set_page(self, page: str):
+        self.page = page
+        self.panel = None
+
+    def _focus_search(self):
+        self.focus = self.search_box
+        self.panel = None
+
+    def _set_search(self, text: str):
+        self.search_box.value = text
+        if not text:
+            self.search_query = ""
+        else:
+            self._schedule("search", setattr, self, "search_query", text)
+
+    def _select_session(self, title: str):
+        # 搜索结果立即收起，聊天内容稍后才切换
+        self.focus = None
+        self.search_box.value = ""
+        self.search_query = ""
+        self._schedule("page", self._open_chat, title)
+
+    def _open_chat(self, title: str):
+        self.page = "chat"
+        self.chat = title
+        self.panel = None
+        if title in self.session_titles:
+            self.session_titles.remove(title)
+        self.session_titles.insert(0, title)
+        members = self.groups.get(title) or ["我"]
+        rng = random.Random(title)
+        self.messages = []
+        for i in range(self.chat_messages):
+            top = 60 + 45 * i
+            sender = rng.choice(members)
+            self.messages.append(FakeElement(LIST_ITEM, "", Rect(300, top, 700, top + 45), self.main, [
+                FakeElement(TEXT, sender, Rect(310, top, 450, top + 20), self.main),
+                FakeElement(TEXT, rng.choice(PHRASES), Rect(310, top + 20, 690, top + 45), self.main),
+            ]))
+
+    def _set_panel(self, state: Optional[str], chat: Optional[str]):
+        # 面板显示点击按钮时打开的聊天的信息，即使聊天已经切换
+        if chat:
+            self.panel = state
+            self.panel_chat = chat
+            self.member_list.scroller.offset = 0
+
+    def _open_manage_window(self):
+        if self.manage_window is None:
+            self.manage_tab = "all"
+            self.manage_window = self._build_manage_window()
+            self.foreground = self.manage_window
+
+    def _set_manage_tab(self, tab: str):
+        self.manage_tab = tab
+        self.group_list.scroller.offset = 0
+
+    def _close_manage_window(self):
+        self.manage_window = None
+        self.foreground = self.main
+
+    # ---- 坐标 ----
+
+    def _screen_rect(self, element: FakeElement) -> Rect:
+        if element.window is None:
+            return element.rect
+        origin = element.window.rect
+        rect = element.rect
+        return Rect(rect.left + origin.left, rect.top + origin.top, rect.right + origin.left, rect.bottom + origin.top)
+
+    def _window_at(self, x: int, y: int) -> Optional[FakeElement]:
+        for window in (self.manage_window, self.main):
+            if window is not None and window.rect.contains(x, y):
+                return window
+        return None
+
+    def _element_at(self, element: FakeElement, x: int, y: int,
+                    accept: Callable[[FakeElement], bool]) -> Optional[FakeElement]:
+        """(x, y) 处最上层的满足 accept 的控件，后面的子控件显示在上层"""
+        if not self._screen_rect(element).contains(x, y):
+            return None
+        for child in reversed(element.children()):
+            found = self._element_at(child, x, y, accept)
+            if found is not None:
+                return found
+        return element if accept(element) else None
+
+    def _is_open(self, window: Optional[FakeElement]) -> bool:
+        return window is self.main or (window is not None and window is self.manage_window)
+
+    def _alive(self, element: FakeElement) -> bool:
+        # 驱动内部的检查，不计入调用次数
+        return self._is_open(element.window or element)
+
+    # ---- 窗口 ----
+
+    @counted
+    def find_main_window(self) -> Optional[FakeElement]:
+        self._call()
+        return self.main
+
+    @counted
+    def find_window(self, name: str) -> Optional[FakeElement]:
+        self._call()
+        for window in (self.main, self.manage_window):
+            if window is not None and window.name == name:
+                return window
+        return None
+
+    @counted
+    def is_window(self, window: FakeElement) -> bool:
+        return self._is_open(window)
+
+    @counted
+    def is_minimized(self, window: FakeElement) -> bool:
+        return window is self.main and self.minimized
+
+    @counted
+    def restore_window(self, window: FakeElement):
+        if window is self.main:
+            self.minimized = False
+
+    @counted
+    def move_window(self, window: FakeElement, rect: Rect):
+        window.rect = Rect(*rect)
+
+    @counted
+    def set_foreground(self, window: FakeElement):
+        self.foreground = window
+
+    @counted
+    def is_foreground(self, window: FakeElement) -> bool:
+        return self.foreground is window
+
+    @counted
+    def close_windows(self, title: str, exclude_titles=()) -> int:
+        window = self.manage_window
+        if window is None or title not in window.name or any(t in window.name for t in exclude_titles):
+            return 0
+        self._close_manage_window()
+        return 1
+
+    # ---- 鼠标和键盘 ----
+
+    @counted
+    def click(self, x: int, y: int):
+        self._advance()
+        self.mouse = (x, y)
+        window = self._window_at(x, y)
+        if window is None:
+            return
+        self.foreground = window
+        target = self._element_at(window, x, y, lambda element: element.on_click is not None)
+        if target is not None:
+            if target is not self.search_box:
+                self.focus = None
+            target.on_click()
+
+    @counted
+    def move_to(self, x: int, y: int):
+        self.mouse = (x, y)
+
+    @counted
+    def scroll(self, amount: int):
+        self._advance()
+        window = self._window_at(*self.mouse)
+        if window is None:
+            return
+        target = self._element_at(window, *self.mouse, lambda element: element.scroller is not None)
+        if target is not None:
+            self._schedule("scroll", target.scroller.scroll_by, -amount * SCROLL_PIXELS)
+
+    @counted
+    def hotkey(self, *keys: str):
+        self._advance()
+        if self.focus is not self.search_box:
+            return
+        if keys == ("ctrl", "a"):
+            self._select_all = True
+        elif keys == ("ctrl", "v"):
+            text = self.clipboard if self._select_all else self.search_box.value + self.clipboard
+            self._select_all = False
+            self._set_search(text)
+
+    @counted
+    def press(self, key: str):
+        self._advance()
+        if self.focus is self.search_box and key == "backspace":
+            text = "" if self._select_all else self.search_box.value[:-1]
+            self._select_all = False
+            self._set_search(text)
+
+    @counted
+    def get_clipboard(self) -> str:
+        return self.clipboard
+
+    @counted
+    def set_clipboard(self, text: str):
+        self.clipboard = text
+
+    @counted
+    def send_keys(self, element: FakeElement, keys: str):
+        self._advance()
+        if keys != "{ESC}":
+            return
+        if element is self.manage_window:
+            self._close_manage_window()
+        elif element is self.main:
+            self.panel = None
+
+    # ---- 控件 ----
+
+    @counted
+    def find(self, root: FakeElement, control_type: Optional[int] = None, name: Optional[str] = None,
+             class_name: Optional[str] = None, depth: Optional[int] = None) -> Optional[FakeElement]:
+        self._call()
+        if not self._alive(root):
+            return None
+        level = [root]
+        current_depth = 0
+        while level and (depth is None or current_depth < depth):
+            current_depth += 1
+            next_level = []
+            for element in level:
+                for child in element.children():
+                    self.find_visits += 1
+                    if ((control_type is None or child.control_type == control_type)
+                            and (name is None or child.name == name)
+                            and (class_name is None or child.class_name == class_name)):
+                        return child
+                    next_level.append(child)
+            level = next_level
+        return None
+
+    @counted
+    def get_children(self, element: FakeElement) -> List[FakeElement]:
+        self._advance()
+        children = list(element.children()) if self._alive(element) else []
+        # 与 UIA 的 GetChildren 一样，每个子控件都是一次往返
+        self.calls["get_children"] += len(children)
+        self._call(1 + len(children))
+        return children
+
+    @counted
+    def get_name(self, element: FakeElement) -> str:
+        self._call()
+        return element.name
+
+    @counted
+    def get_control_type(self, element: FakeElement) -> int:
+        self._call()
+        return element.control_type
+
+    @counted
+    def get_class_name(self, element: FakeElement) -> str:
+        self._call()
+        return element.class_name
+
+    @counted
+    def get_rect(self, element: FakeElement) -> Rect:
+        self._call()
+        return self._screen_rect(element)
+
+    @counted
+    def has_focus(self, element: FakeElement) -> bool:
+        self._call()
+        return self.focus is element
+
+    @counted
+    def get_value(self, element: FakeElement) -> str:
+        self._call()
+        return element.value
+
+    @counted
+    def is_offscreen(self, element: FakeElement) -> bool:
+        self._call()
+        return not self._alive(element)
+
+    @counted
+    def get_scroll_percent(self, element: FakeElement) -> Optional[float]:
+        self._call()
+        return element.scroller.percent() if element.scroller else None
+
+    @counted
+    def snapshot(self, root: FakeElement) -> SnapshotElement:
+        """一次调用读回整棵子树，模拟 UIA 缓存请求"""
+        self._call()
+        if not self._alive(root):
+            return SnapshotElement(root.control_type, root.name, self._screen_rect(root))
+        return self._snapshot(root)
+
+    def _snapshot(self, element: FakeElement) -> SnapshotElement:
+        node = SnapshotElement(element.control_type, element.name, self._screen_rect(element))
+        node.children = [self._snapshot(child) for child in element.children()]
+        return node
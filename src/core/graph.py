@@ -0,0 +1,124 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse import csgraph
+
+# 标签传播的最大轮数，通常几轮之内就不再变化
+MAX_PROPAGATION_ROUNDS = 30
+
+
+def connected_components(adjacency: sparse.csr_matrix) -> np.ndarray:
+    """
+    无向图的连通分量
+
+    Returns:
+        每个节点所属分量的编号，按分量中最小的节点下标从 0 开始编号
+    """
+    _, labels = csgraph.connected_components(adjacency, directed=False)
+    return _renumber(labels)
+
+
+def label_propagation(adjacency: sparse.csr_matrix, max_rounds: int = MAX_PROPAGATION_ROUNDS,
+                      seed: int = 0) -> np.ndarray:
+    """
+    加权标签传播社区发现
+
+    每个节点初始为独立的社区，之后按随机顺序逐个把节点的标签改为邻居中
+    边权之和最大的标签（与当前标签并列时保持不变），直到一轮中没有节点
+    改变标签。固定随机种子，同样的输入总是得到同样的结果。
+
+    Args:
+        adjacency: 对称的加权邻接矩阵，不含自环
+        max_rounds: 最大轮数
+        seed: 节点访问顺序的随机种子
+
+    Returns:
+        每个节点所属社区的编号，按社区中最小的节点下标从 0 开始编号
+    """
+    node_count = adjacency.shape[0]
+    labels = np.arange(node_count)
+    indptr, indices, weights = adjacency.indptr, adjacency.indices, adjacency.data.astype(np.float64)
+    rng = np.random.RandomState(seed)
+    for _ in range(max_rounds):
+        changed = False
+        for node in rng.permutation(node_count):
+            start, end = indptr[node], indptr[node + 1]
+            if start == end:
+                continue
+            neighbor_labels = labels[indices[start:end]]
+            candidates, inverse = np.unique(neighbor_labels, return_inverse=True)
+            scores = np.bincount(inverse.ravel(), weights=weights[start:end])
+            best = scores.max()
+            current = np.searchsorted(candidates, labels[node])
+            if current < len(candidates) and candidates[current] == labels[node] and scores[current] == best:
+                continue
+            labels[node] = candidates[np.argmax(scores)]
+            changed = True
+        if not changed:
+            break
+    return _renumber(labels)
+
+
+def _renumber(labels: np.ndarray) -> np.ndarray:
+    """把任意标签改为按首次出现顺序从 0 开始的连续编号"""
+    _, first, inverse = np.unique(labels, return_index=True, return_inverse=True)
+    rank = np.empty(len(first), dtype=np.int64)
+    rank[np.argsort(first, kind="stable")] = np.arange(len(first))
+    return rank[inverse.ravel()]
+
+
+class GroupGraph:
+    """群共同成员图
+
+    每个群是一个节点，两个群有共同成员时连一条边，边权为共同成员数。
+
+    Attributes:
+        groups: 群名，顺序与邻接矩阵的行列一致
+        sizes: 每个群的成员数
+        adjacency: 对称的稀疏邻接矩阵（CSR），不含自环
+        components: 每个群所属的连通分量编号
+        communities: 每个群所属的社区编号（标签传播）
+    """
+
+    def __init__(self, groups: List[str], sizes: np.ndarray, adjacency: sparse.csr_matrix):
+        self.groups = groups
+        self.sizes = sizes
+        self.adjacency = adjacency
+        self.components = connected_components(adjacency)
+        self.communities = label_propagation(adjacency)
+
+    @property
+    def edge_count(self) -> int:
+        return self.adjacency.nnz // 2
+
+    def degrees(self) -> np.ndarray:
+        """每个群相连的群数"""
+        return np.diff(self.adjacency.indptr)
+
+    def strengths(self) -> np.ndarray:
+        """每个群与其他群共同成员数之和"""
+        return np.asarray(self.adjacency.sum(axis=1)).ravel()
+
+    def edges(self, limit: Optional[int] = None) -> List[Tuple[str, str, int]]:
+        """按共同成员数从多到少列出边 [(群A, 群B, 共同成员数)]"""
+        upper = sparse.triu(self.adjacency, k=1).tocoo()
+        order = np.argsort(-upper.data, kind="stable")[:limit]
+        return [(self.groups[upper.row[i]], self.groups[upper.col[i]], int(upper.data[i])) for i in order]
+
+    def clusters(self, labels: Optional[np.ndarray] = None) -> List[List[str]]:
+        """
+        按编号分组的群名，群数多的在前
+
+        Args:
+            labels: components 或 communities，默认为 communities
+        """
+        if labels is None:
+            labels = self.communities
+        clusters: Dict[int, List[str]] = {}
+        for group, label in zip(self.groups, labels.tolist()):
+            clusters.setdefault(label, []).append(group)
+        return sorted(clusters.values(), key=len, reverse=True)
+
+    def __len__(self) -> int:
+        return len(self.groups)
@@ -0,0 +1,140 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+# 同名群的标识后缀，例如 "家长群#2"
+ORDINAL_SEPARATOR = "#"
+# 旧版缓存使用 "群名(成员数)" 作为群标识
+LEGACY_KEY_PATTERN = re.compile(r"^(.*)\((\d+)\)$")
+
+
+def make_group_key(title: str, ordinal: int = 1) -> str:
+    """根据群名和同名序号生成稳定的群标识"""
+    if ordinal <= 1:
+        return title
+    return f"{title}{ORDINAL_SEPARATOR}{ordinal}"
+
+
+def format_group_label(group: Dict) -> str:
+    """界面上显示的群名：群名(成员数)，同名群附带序号"""
+    key = group["name"]
+    title = group.get("title") or key
+    suffix = key[len(title):] if key.startswith(title) else ""
+    return f"{title}{suffix}({group.get('member_count', '0')})"
+
+
+def _count(value) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def assign_group_keys(scanned: List[Tuple[str, str]], previous: List[Dict]) -> List[Dict]:
+    """为扫描到的群分配稳定标识
+
+    标识只取决于群名，成员数作为属性保存，因此有人进群或退群时标识不变。
+    同名的多个群按成员数与上次缓存中最接近的群沿用其标识，剩下的依次分配
+    "群名#2"、"群名#3" 等序号。
+
+    Args:
+        scanned: 扫描结果 [(群名, 成员数)]
+        previous: 缓存中的群列表，元素包含 name（标识）、title、member_count
+
+    Returns:
+        [{"name": 标识, "title": 群名, "member_count": 成员数}]，顺序与 scanned 一致
+    """
+    previous_by_title: Dict[str, List[Dict]] = {}
+    for group in previous:
+        title = group.get("title") or group["name"]
+        previous_by_title.setdefault(title, []).append(group)
+
+    scanned_by_title: Dict[str, List[int]] = {}
+    for index, (title, _) in enumerate(scanned):
+        scanned_by_title.setdefault(title, []).append(index)
+
+    keys: List[Optional[str]] = [None] * len(scanned)
+    # 已分配的标识在所有群名之间共享：群名本身可能带有 "#序号"，
+    # 例如 "A#2" 既可能是群 "A#2"，也可能是第二个 "A" 群
+    used_keys = set()
+    for title, indexes in scanned_by_title.items():
+        candidates = previous_by_title.get(title, [])
+        # 按成员数差值从小到大贪心匹配上次的标识
+        pairs = sorted(
+            (abs(_count(scanned[i][1]) - _count(group["member_count"])), i, group["name"])
+            for i in indexes for group in candidates
+        )
+        for _, i, key in pairs:
+            if keys[i] is None and key not in used_keys:
+                keys[i] = key
+                used_keys.add(key)
+
+    # 群名本身优先留给同名的群，再为其余的群分配序号
+    for title, indexes in scanned_by_title.items():
+        unassigned = [i for i in indexes if keys[i] is None]
+        if unassigned and title not in used_keys:
+            keys[unassigned[0]] = title
+            used_keys.add(title)
+
+    for title, indexes in scanned_by_title.items():
+        ordinal = 2
+        for i in indexes:
+            if keys[i] is not None:
+                continue
+            while make_group_key(title, ordinal) in used_keys:
+                ordinal += 1
+            keys[i] = make_group_key(title, ordinal)
+            used_keys.add(keys[i])
+
+    return [
+        {"name": key, "title": title, "member_count": member_count}
+        for key, (title, member_count) in zip(keys, scanned)
+    ]
+
+
+def rekey_legacy_groups(groups: List[Dict]) -> Dict[str, Dict]:
+    """把旧版 "群名(成员数)" 标识换成稳定标识
+
+    Args:
+        groups: 缓存中的群列表，元素包含 name、member_count
+
+    Returns:
+        {旧标识: {"name": 新标识, "title": 群名}}，只包含需要改名的群
+    """
+    scanned = []
+    legacy_names = []
+    kept = []
+    for group in groups:
+        match = LEGACY_KEY_PATTERN.match(group["name"])
+        if match and match.group(2) == str(group.get("member_count")):
+            scanned.append((match.group(1).strip(), group.get("member_count")))
+            legacy_names.append(group["name"])
+        else:
+            kept.append(group)
+
+    assigned = assign_group_keys(scanned, [])
+    # 已经是稳定标识的群保留原标识，新分配的标识不能与之冲突
+    taken = {group["name"] for group in kept}
+    mapping = {}
+    for old_name, group in zip(legacy_names, assigned):
+        key = group["name"]
+        ordinal = 2
+        while key in taken:
+            key = make_group_key(group["title"], ordinal)
+            ordinal += 1
+        taken.add(key)
+        mapping[old_name] = {"name": key, "title": group["title"]}
+    return mapping
+
+
+def legacy_cache_groups(cache_data) -> Dict[str, Dict]:
+    """旧版 wechat_groups_cache.json 中的群聊 {群名(成员数): 群信息}
+
+    启动时保存的缓存是 {"last_update": ..., "groups": {...}}，而旧版抓取成员后
+    直接保存了 groups 这一层，文件顶层就是群聊。两种格式都接受。
+    """
+    if not isinstance(cache_data, dict):
+        return {}
+    groups = cache_data.get("groups")
+    if not isinstance(groups, dict):
+        groups = cache_data
+    return {name: info for name, info in groups.items() if isinstance(info, dict)}
@@ -0,0 +1,517 @@
+import base64
+import bisect
+import json
+import os
+import threading
+from datetime import datetime
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from .groups import legacy_cache_groups, rekey_legacy_groups
+from .membership import StringTable
+from .sketch import compute_minhash, minhash_from_bytes, minhash_to_bytes
+
+SNAPSHOT_VERSION = 2
+
+
+def _dumps(record) -> bytes:
+    """紧凑的单行 JSON"""
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class JournalStore:
+    """日志式群成员缓存
+
+    每抓取一个群只向日志文件追加一条记录，写入开销只与该群人数有关；
+    日志体积超过快照体积时合并进快照文件，合并开销均摊到每条记录上仍与
+    记录大小成正比。接口与 MembershipStore 保持一致。
+
+    快照和日志都采用“索引在前”的格式：快照第一行是索引（群名、成员数、
+    更新时间以及成员数据的偏移和长度），日志每条记录也是一行索引后跟成员
+    数据。启动时只读索引，成员列表在分析某个群时才按偏移读取。
+    """
+
+    SNAPSHOT_NAME = "groups_snapshot.json"
+    JOURNAL_NAME = "groups_journal.jsonl"
+    INDEX_NAME = "member_index.json"
+
+    def __init__(self, cache_dir: str, min_compact_bytes: int = 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.snapshot_file = os.path.join(cache_dir, self.SNAPSHOT_NAME)
+        self.journal_file = os.path.join(cache_dir, self.JOURNAL_NAME)
+        self.index_file = os.path.join(cache_dir, self.INDEX_NAME)
+        self.min_compact_bytes = min_compact_bytes
+        self._lock = threading.RLock()
+        self.last_update = None
+        # 每个群的索引信息；成员数据尚未读入时用 source 记录其位置
+        self.groups: Dict[str, Dict] = {}
+        self.journal_records = 0
+        self.journal_bytes = 0
+        self.snapshot_bytes = 0
+        self.snapshot_body_start = 0
+        # 每次合并生成的快照标识，成员索引文件与之一致时才可直接使用
+        self.snapshot_generation = None
+        # 成员 -> 群的倒排索引，第一次查询时才加载
+        self._member_index: Optional[Dict[str, set]] = None
+        self._index_names: Optional[List[str]] = None
+        # 成员 ID 只在本次运行内有效，日志和快照中保存的是昵称
+        self.member_table = StringTable()
+
+        self._load_snapshot()
+        self._replay_journal()
+        self.journal = open(self.journal_file, 'ab')
+        self._upgrade_legacy_keys()
+
+    def _upgrade_legacy_keys(self):
+        """旧缓存以 "群名(成员数)" 为群标识，改为稳定标识后立即合并成快照"""
+        if all("title" in group for group in self.groups.values()):
+            return
+        with self._lock:
+            mapping = rekey_legacy_groups([
+                {"name": name, "member_count": group.get("member_count")} for name, group in self.groups.items()
+            ])
+            groups = {}
+            for name, group in self.groups.items():
+                new = mapping.get(name, {"name": name, "title": group.get("title") or name})
+                group["title"] = new["title"]
+                groups[new["name"]] = group
+            self.groups = groups
+            self.compact()
+
+    def _load_snapshot(self):
+        """只读取快照的索引行"""
+        if not os.path.exists(self.snapshot_file):
+            return
+        try:
+            with open(self.snapshot_file, 'rb') as f:
+                header = json.loads(f.readline())
+                self.snapshot_body_start = f.tell()
+            self.snapshot_bytes = os.path.getsize(self.snapshot_file)
+            self.last_update = header.get("last_update")
+            self.snapshot_generation = header.get("generation")
+            self.groups = header.get("groups", {})
+            if header.get("version") != SNAPSHOT_VERSION:
+                # 旧格式快照整体就是一行 JSON，成员已经在内存中
+                return
+            for group in self.groups.values():
+                if "length" in group:
+                    group["source"] = ("snapshot", group.pop("offset"), group.pop("length"))
+        except Exception as e:
+            print(f"读取缓存快照失败: {e}")
+
+    def _replay_journal(self):
+        """重放日志索引，跳过成员数据"""
+        if not os.path.exists(self.journal_file):
+            return
+        file_size = os.path.getsize(self.journal_file)
+        valid_bytes = 0
+        with open(self.journal_file, 'rb') as f:
+            while True:
+                line = f.readline()
+                if not line:
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # 最后一条记录可能因异常退出而不完整
+                    print("跳过不完整的日志记录")
+                    break
+                if "length" in record:
+                    offset = f.tell()
+                    if offset + record["length"] + 1 > file_size:
+                        print("跳过不完整的日志记录")
+                        break
+                    f.seek(record["length"] + 1, os.SEEK_CUR)
+                    record["source"] = ("journal", offset, record["length"])
+                self._apply(record)
+                self.journal_records += 1
+                valid_bytes = f.tell()
+        if valid_bytes < file_size:
+            # 截掉不完整的尾部，保证后续追加的偏移正确
+            with open(self.journal_file, 'r+b') as f:
+                f.truncate(valid_bytes)
+        self.journal_bytes = valid_bytes
+        print(f"已重放 {self.journal_records} 条缓存日志")
+
+    def _apply(self, record: Dict):
+        """把一条日志记录应用到内存索引"""
+        if record["op"] == "groups":
+            old_groups = self.groups
+            self.groups = {}
+            for entry in record["groups"]:
+                name, member_count = entry[0], entry[1]
+                group = old_groups.get(name, {})
+                group["title"] = entry[2] if len(entry) > 2 else name
+                group["member_count"] = member_count
+                group["last_update"] = record["last_update"]
+                self.groups[name] = group
+            self.last_update = record["last_update"]
+        elif record["op"] == "members":
+            group = self.groups.setdefault(
+                record["name"], {"title": record["name"], "last_update": record["updated_at"]}
+            )
+            if record.get("member_count") is not None:
+                group["member_count"] = record["member_count"]
+            group["last_update"] = record["updated_at"]
+            group["members_update"] = record["updated_at"]
+            group["scraped_count"] = record.get("member_count")
+            if "minhash" in record:
+                group["minhash"] = record["minhash"]
+            if "members" in record:
+                group["members"] = record["members"]
+                group.pop("source", None)
+            else:
+                group["source"] = record["source"]
+                group.pop("members", None)
+
+    def _read_members(self, group: Dict) -> List[str]:
+        """按索引中的偏移读取一个群的成员"""
+        if "members" not in group:
+            kind, offset, length = group["source"]
+            if kind == "snapshot":
+                path, offset = self.snapshot_file, self.snapshot_body_start + offset
+            else:
+                path = self.journal_file
+                self.journal.flush()
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                group["members"] = json.loads(f.read(length))
+        return group["members"]
+
+    def _append(self, record: Dict, members: Optional[List[str]] = None):
+        if members is None:
+            data = _dumps(record) + b"\n"
+        else:
+            payload = _dumps(members)
+            record["length"] = len(payload)
+            header = _dumps(record) + b"\n"
+            record["source"] = ("journal", self.journal_bytes + len(header), len(payload))
+            data = header + payload + b"\n"
+        self.journal.write(data)
+        self.journal.flush()
+        self._apply(record)
+        if members is not None:
+            self.groups[record["name"]]["members"] = members
+        self.journal_records += 1
+        self.journal_bytes += len(data)
+        if self.journal_bytes > max(self.snapshot_bytes, self.min_compact_bytes):
+            self.compact()
+
+    def compact(self):
+        """把日志合并进快照，然后清空日志"""
+        with self._lock:
+            index = {}
+            chunks = []
+            body_size = 0
+            # 合并时每个群的成员都要读一遍，顺便重建成员索引
+            member_index: Dict[str, set] = {}
+            for name, group in self.groups.items():
+                entry = {k: v for k, v in group.items() if k not in ("members", "source")}
+                if "members" in group or "source" in group:
+                    members = self._read_members(group)
+                    if group.get("members_update"):
+                        for member in members:
+                            member_index.setdefault(member, set()).add(name)
+                    payload = _dumps(members) + b"\n"
+                    entry["offset"] = body_size
+                    entry["length"] = len(payload) - 1
+                    chunks.append(payload)
+                    body_size += len(payload)
+                index[name] = entry
+            generation = datetime.now().isoformat()
+            header = _dumps({
+                "version": SNAPSHOT_VERSION, "generation": generation,
+                "last_update": self.last_update, "groups": index
+            }) + b"\n"
+
+            tmp_file = self.snapshot_file + ".tmp"
+            with open(tmp_file, 'wb') as f:
+                f.write(header)
+                f.writelines(chunks)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.snapshot_file)
+            self.snapshot_generation = generation
+            self.snapshot_bytes = len(header) + body_size
+            self.snapshot_body_start = len(header)
+            for name, entry in index.items():
+                if "offset" in entry:
+                    # 成员已在快照中，不再留在内存里，需要时按偏移重新读取
+                    self.groups[name]["source"] = ("snapshot", entry["offset"], entry["length"])
+                    self.groups[name].pop("members", None)
+            # 快照落盘后才截断日志；中途退出时重放日志也是幂等的
+            self.journal.close()
+            self.journal = open(self.journal_file, 'wb')
+            self.journal_records = 0
+            self.journal_bytes = 0
+            self._member_index = member_index
+            self._index_names = None
+            self._save_member_index(member_index)
+            print(f"缓存日志已合并到快照: {len(self.groups)} 个群聊")
+
+    def _build_member_index(self, group_names: Iterable[str], index: Optional[Dict[str, set]] = None) -> Dict[str, set]:
+        """把指定群的成员加入倒排索引"""
+        index = {} if index is None else index
+        for name in group_names:
+            group = self.groups[name]
+            if group.get("members_update") and ("members" in group or "source" in group):
+                for member in self._read_members(group):
+                    index.setdefault(member, set()).add(name)
+        self._member_index = index
+        self._index_names = None
+        return index
+
+    def _save_member_index(self, index: Dict[str, set]):
+        """把倒排索引写入文件，与当前快照的标识对应"""
+        tmp_file = self.index_file + ".tmp"
+        try:
+            with open(tmp_file, 'wb') as f:
+                f.write(_dumps({
+                    "generation": self.snapshot_generation,
+                    "members": {member: sorted(groups) for member, groups in index.items()}
+                }))
+            os.replace(tmp_file, self.index_file)
+        except Exception as e:
+            print(f"保存成员索引失败: {e}")
+
+    @property
+    def member_index(self) -> Dict[str, set]:
+        """成员 -> 群标识的倒排索引
+
+        索引文件在合并快照时写入，只反映快照中的数据；之后日志中更新过的群
+        从索引中移除并按日志中的成员重新加入。文件缺失或与快照不一致时从
+        全部群重建。
+        """
+        with self._lock:
+            if self._member_index is not None:
+                return self._member_index
+            index = None
+            if self.snapshot_generation and os.path.exists(self.index_file):
+                try:
+                    with open(self.index_file, 'rb') as f:
+                        data = json.load(f)
+                    if data.get("generation") == self.snapshot_generation:
+                        index = {member: set(groups) for member, groups in data["members"].items()}
+                except Exception as e:
+                    print(f"读取成员索引失败: {e}")
+            if index is None:
+                return self._build_member_index(self.groups)
+
+            # 快照之后在日志中更新过成员的群
+            dirty = {
+                name for name, group in self.groups.items()
+                if (group.get("source") or ("journal",))[0] == "journal" and group.get("members_update")
+            }
+            if dirty:
+                for member in list(index):
+                    groups = index[member]
+                    groups -= dirty
+                    if not groups:
+                        del index[member]
+            return self._build_member_index(dirty, index)
+
+    def find_member_groups(self, member_name: str) -> List[str]:
+        """查询成员所在的群标识"""
+        with self._lock:
+            groups = self.member_index.get(member_name, ())
+            return sorted(name for name in groups if name in self.groups)
+
+    def search_members(self, prefix: str, limit: int = 20) -> List[Dict]:
+        """
+        按昵称前缀查找成员及其所在的群
+        
+        Returns:
+            [{"name": 昵称, "groups": [群标识]}]，按昵称排序
+        """
+        if not prefix:
+            return []
+        with self._lock:
+            index = self.member_index
+            if self._index_names is None:
+                self._index_names = sorted(index)
+            names = self._index_names
+            results = []
+            position = bisect.bisect_left(names, prefix)
+            while position < len(names) and len(results) < limit and names[position].startswith(prefix):
+                member = names[position]
+                groups = sorted(name for name in index.get(member, ()) if name in self.groups)
+                if groups:
+                    results.append({"name": member, "groups": groups})
+                position += 1
+            return results
+
+    def get_meta(self, key: str) -> Optional[str]:
+        """读取元数据"""
+        if key == "last_update":
+            return self.last_update
+        return None
+
+    def get_last_update(self) -> Optional[str]:
+        """获取群聊列表的最后更新时间"""
+        return self.last_update
+
+    def count_groups(self) -> int:
+        """获取缓存的群聊数量"""
+        return len(self.groups)
+
+    def list_groups(self) -> List[Dict]:
+        """获取所有群聊的基本信息（只用索引，不读取成员）"""
+        with self._lock:
+            return [
+                {
+                    "name": name,
+                    "title": info.get("title") or name,
+                    "member_count": info.get("member_count") or "0",
+                    "last_update": info.get("last_update")
+                }
+                for name, info in self.groups.items()
+            ]
+
+    def replace_groups(self, groups: List[Dict]):
+        """用新扫描到的群聊列表替换缓存中的列表"""
+        with self._lock:
+            self._append({
+                "op": "groups",
+                "last_update": datetime.now().isoformat(),
+                "groups": [
+                    [group["name"], str(group["member_count"]), group.get("title") or group["name"]]
+                    for group in groups
+                ]
+            })
+
+    def get_group_info(self, group_name: str) -> Optional[Dict]:
+        """获取单个群的缓存信息（不读取成员）"""
+        with self._lock:
+            group = self.groups.get(group_name)
+            if group is None:
+                return None
+            return {
+                "name": group_name,
+                "title": group.get("title") or group_name,
+                "member_count": group.get("member_count") or "0",
+                "last_update": group.get("last_update"),
+                "members_update": group.get("members_update"),
+                "scraped_count": group.get("scraped_count")
+            }
+
+    def get_group_member_ids(self, group_name: str) -> Optional[array]:
+        """获取缓存的群成员 ID（排好序的 array），没有缓存时返回 None"""
+        with self._lock:
+            group = self.groups.get(group_name)
+            if not group or not group.get("members_update"):
+                return None
+            return self.member_table.intern_many(self._read_members(group))
+
+    def get_group_members(self, group_name: str) -> Optional[List[str]]:
+        """获取缓存的群成员昵称列表，没有缓存时返回 None"""
+        with self._lock:
+            group = self.groups.get(group_name)
+            if not group or not group.get("members_update"):
+                return None
+            return list(self._read_members(group))
+
+    def save_group_members(self, group_name: str, member_ids: Iterable[int],
+                           member_count: Optional[str] = None, updated_at: Optional[str] = None):
+        """追加一条群成员记录
+
+        Args:
+            group_name: 群名
+            member_ids: 成员 ID（来自 member_table），日志中按昵称保存
+            member_count: 抓取时群列表显示的成员数
+            updated_at: 成员更新时间，默认为当前时间
+        """
+        with self._lock:
+            members = self.member_table.lookup(sorted(set(member_ids)))
+            index = self._member_index
+            if index is not None:
+                # 索引已加载时随写入一起维护：先移除旧成员，再加入新成员
+                group = self.groups.get(group_name)
+                if group and group.get("members_update") and ("members" in group or "source" in group):
+                    for member in self._read_members(group):
+                        groups = index.get(member)
+                        if groups is not None:
+                            groups.discard(group_name)
+                            if not groups:
+                                del index[member]
+                                self._index_names = None
+            self._append({
+                "op": "members",
+                "name": group_name,
+                "member_count": str(member_count) if member_count is not None else None,
+                "updated_at": updated_at or datetime.now().isoformat(),
+                "minhash": base64.b64encode(minhash_to_bytes(compute_minhash(members))).decode('ascii')
+            }, members)
+            if index is not None and self._member_index is index:
+                for member in members:
+                    if member not in index:
+                        index[member] = set()
+                        self._index_names = None
+                    index[member].add(group_name)
+
+    def get_group_sketches(self) -> Dict[str, np.ndarray]:
+        """获取所有缓存了成员的群的 MinHash 签名 {群标识: 签名}
+
+        签名随索引一起保存，不需要读取成员；旧缓存中没有签名的群按成员补算。
+        """
+        with self._lock:
+            sketches = {}
+            for name, group in self.groups.items():
+                if not group.get("members_update"):
+                    continue
+                if "minhash" not in group:
+                    if "members" not in group and "source" not in group:
+                        continue
+                    group["minhash"] = base64.b64encode(
+                        minhash_to_bytes(compute_minhash(self._read_members(group)))
+                    ).decode('ascii')
+                sketches[name] = minhash_from_bytes(base64.b64decode(group["minhash"]))
+            return sketches
+
+    def create_snapshot(self, note: str = "") -> Optional[int]:
+        """日志模式不保留历史快照"""
+        return None
+
+    def list_snapshots(self) -> List[Dict]:
+        """日志模式不保留历史快照"""
+        return []
+
+    def migrate_legacy_json(self, json_path: str) -> bool:
+        """快照和日志都不存在时，从旧版 wechat_groups_cache.json 导入"""
+        if self.groups or self.journal_records or not os.path.exists(json_path):
+            return False
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                cache_data = json.load(f)
+        except Exception as e:
+            print(f"读取旧缓存失败: {e}")
+            return False
+
+        groups = legacy_cache_groups(cache_data)
+        if not groups:
+            print("旧缓存中没有可以导入的群聊")
+            return False
+        with self._lock:
+            for name, info in groups.items():
+                self.groups[name] = {
+                    "member_count": info.get("member_count", "0"),
+                    "last_update": info.get("last_update")
+                }
+                if info.get("members"):
+                    self.groups[name]["members"] = list(info["members"])
+                    self.groups[name]["members_update"] = info.get("last_update")
+            self.last_update = cache_data.get("last_update")
+            # 旧缓存以 "群名(成员数)" 为标识，换成稳定标识并写入快照
+            self._upgrade_legacy_keys()
+        print(f"旧缓存迁移完成: {len(self.groups)} 个群聊")
+        return True
+
+    def close(self):
+        """合并日志并关闭文件"""
+        with self._lock:
+            if self.journal.closed:
+                return
+            if self.journal_records:
+                self.compact()
+            self.journal.close()
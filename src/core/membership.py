@@ -0,0 +1,96 @@
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+
+class StringTable:
+    """字符串驻留表：同一个字符串只保存一次，用连续的整数 ID 代替"""
+
+    def __init__(self, strings: Iterable[Optional[str]] = ()):
+        # strings[id] 为对应的字符串，允许出现 None 占位（例如数据库中缺失的 ID）
+        self.strings: List[Optional[str]] = list(strings)
+        self.ids: Dict[str, int] = {s: i for i, s in enumerate(self.strings) if s is not None}
+
+    def intern(self, s: str) -> int:
+        """返回字符串的 ID，不存在时分配新 ID"""
+        i = self.ids.get(s)
+        if i is None:
+            i = len(self.strings)
+            self.strings.append(s)
+            self.ids[s] = i
+        return i
+
+    def intern_many(self, strings: Iterable[str]) -> array:
+        """批量驻留，返回排好序、去重后的 ID 数组"""
+        return array('I', sorted({self.intern(s) for s in strings}))
+
+    def get_id(self, s: str) -> Optional[int]:
+        """查询字符串的 ID，不存在时返回 None"""
+        return self.ids.get(s)
+
+    def lookup(self, ids: Iterable[int]) -> List[str]:
+        """把 ID 转回字符串"""
+        strings = self.strings
+        return [strings[i] for i in ids]
+
+    def __getitem__(self, i: int) -> str:
+        return self.strings[i]
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+
+class Membership:
+    """群成员关系的紧凑表示
+
+    成员昵称和群名都驻留为整数 ID，每个群的成员是排好序的 array('I')，
+    每条群成员关系只占 4 字节。抓取、缓存和分析之间都传递这个结构。
+    """
+
+    def __init__(self, members: Optional[StringTable] = None):
+        self.members = members if members is not None else StringTable()
+        self.groups = StringTable()
+        self.group_members: List[array] = []
+
+    @classmethod
+    def from_dict(cls, groups: Dict[str, Iterable[str]]) -> "Membership":
+        """从 {群名: [成员昵称]} 构建"""
+        membership = cls()
+        for group_name, members in groups.items():
+            membership.set_group_names(group_name, members)
+        return membership
+
+    def set_group(self, group_name: str, member_ids: Iterable[int]) -> int:
+        """设置一个群的成员 ID，返回群 ID"""
+        if not isinstance(member_ids, array):
+            member_ids = array('I', sorted(set(member_ids)))
+        group_id = self.groups.intern(group_name)
+        if group_id == len(self.group_members):
+            self.group_members.append(member_ids)
+        else:
+            self.group_members[group_id] = member_ids
+        return group_id
+
+    def set_group_names(self, group_name: str, member_names: Iterable[str]) -> int:
+        """用成员昵称设置一个群的成员，返回群 ID"""
+        return self.set_group(group_name, self.members.intern_many(member_names))
+
+    def members_of(self, group_name: str) -> array:
+        """获取群成员 ID，群不存在时返回空数组"""
+        group_id = self.groups.get_id(group_name)
+        if group_id is None:
+            return array('I')
+        return self.group_members[group_id]
+
+    def group_names(self) -> List[str]:
+        """所有群名，顺序与群 ID 一致"""
+        return list(self.groups.strings)
+
+    def total_memberships(self) -> int:
+        """群成员关系总数"""
+        return sum(len(ids) for ids in self.group_members)
+
+    def __len__(self) -> int:
+        return len(self.group_members)
+
+    def __contains__(self, group_name: str) -> bool:
+        return self.groups.get_id(group_name) is not None
@@ -0,0 +1,128 @@
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Sequence, Set, Tuple
+
+# 括号中的备注，例如 "张三(三年级2班)"、"李四【销售】"（NFKC 之后全角括号已变为半角）
+BRACKET_PATTERN = re.compile(r"[(\[【〔<《].*?[)\]】〕>》]")
+# 群内备注常用分隔符之后的后缀，例如 "张三-家长"、"alice_北京"
+SUFFIX_PATTERN = re.compile(r"\s*[-_|/·•~—]+.*$")
+# 相似度默认阈值：两个昵称 n-gram 集合的 Jaccard 相似度。
+# 两三个字的中文昵称多一个或少一个字（"丁军" 与 "丁军军"）时约为 0.75，不应合并
+DEFAULT_THRESHOLD = 0.8
+NON_DIGIT_PATTERN = re.compile(r"\D")
+
+
+def _strip_decorations(text: str) -> str:
+    """去掉空白、标点、表情符号和各种修饰字符"""
+    return "".join(
+        ch for ch in text
+        if unicodedata.category(ch)[0] not in "ZPSC" and unicodedata.category(ch) not in ("Mn", "Me")
+    )
+
+
+def normalize_nickname(name: str) -> str:
+    """
+    昵称归一化
+
+    NFKC（全角转半角、兼容字符转标准字符）并统一大小写，去掉括号备注和
+    分隔符后的后缀，最后去掉空白、标点和表情。去掉备注或后缀后不剩文字时
+    保留原内容；整个昵称都是表情时返回去掉空白后的 NFKC 结果，避免不同的
+    纯表情昵称被归为同一个。
+    """
+    text = unicodedata.normalize("NFKC", name).casefold()
+    for pattern in (BRACKET_PATTERN, SUFFIX_PATTERN):
+        stripped = pattern.sub("", text)
+        if len(_strip_decorations(stripped)) >= 2:
+            text = stripped
+    normalized = _strip_decorations(text)
+    return normalized or "".join(text.split())
+
+
+def nickname_grams(normalized: str) -> Set[str]:
+    """带首尾标记的二元组，短昵称也有足够的 gram 参与比较"""
+    padded = f"\x02{normalized}\x03"
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+def gram_similarity(a: Set[str], b: Set[str]) -> float:
+    """两个 gram 集合的 Jaccard 相似度"""
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+class _UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, x: int) -> int:
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a: int, b: int):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parent[max(a, b)] = min(a, b)
+
+
+def cluster_nicknames(names: Sequence[str], threshold: float = DEFAULT_THRESHOLD,
+                      max_block: int = 1000) -> List[int]:
+    """
+    把可能属于同一个人的昵称归为一类
+
+    归一化后完全相同的昵称直接归为一类；其余按 gram 集合的 Jaccard 相似度
+    比较。昵称中的数字必须完全相同（"alice1" 和 "alice2" 通常是不同的人），
+    数字序列同时作为分块键。比较只在 (数字, gram) 倒排索引的同一个桶内进行，
+    并使用前缀过滤：每个昵称的 gram 按全局出现次数从少到多排序，只有前
+    k - ceil(t·k) + 1 个 gram 进入索引，相似度不低于阈值的两个昵称一定在这
+    部分中有共同的 gram。常见 gram 排在后面很少进入索引，比较次数接近线性。
+
+    Args:
+        names: 昵称列表
+        threshold: 相似度阈值
+        max_block: 单个 gram 桶中最多比较的昵称数，防止极端情况下退化为两两比较
+
+    Returns:
+        每个昵称所属类别的编号（同一类中最小的下标），与 names 一一对应
+    """
+    key_of: Dict[str, int] = {}
+    name_keys = []
+    for name in names:
+        name_keys.append(key_of.setdefault(normalize_nickname(name), len(key_of)))
+    keys = list(key_of)
+
+    grams = [nickname_grams(key) for key in keys]
+    sizes = [len(key_grams) for key_grams in grams]
+    digits = [NON_DIGIT_PATTERN.sub("", key) for key in keys]
+    frequency = Counter(gram for key_grams in grams for gram in key_grams)
+    clusters = _UnionFind(len(keys))
+    index: Dict[Tuple[str, str], List[int]] = {}
+    # 按 gram 数从少到多处理，长度过滤只需检查已入索引的较短昵称
+    for i in sorted(range(len(keys)), key=sizes.__getitem__):
+        key_grams, size = grams[i], sizes[i]
+        ordered = sorted(key_grams, key=lambda gram: (frequency[gram], gram))
+        prefix = ordered[:size - math.ceil(threshold * size) + 1]
+        min_size = threshold * size
+        seen = set()
+        for gram in prefix:
+            postings = index.setdefault((digits[i], gram), [])
+            for j in postings[-max_block:]:
+                if j in seen or sizes[j] < min_size:
+                    continue
+                seen.add(j)
+                # 与 gram_similarity(...) >= threshold 等价，省去除法
+                shared = len(key_grams & grams[j])
+                if shared * (1 + threshold) >= threshold * (size + sizes[j]):
+                    clusters.union(i, j)
+            postings.append(i)
+
+    # 类别编号取该类中第一个昵称的下标
+    first_name: Dict[int, int] = {}
+    labels = []
+    for position, key in enumerate(name_keys):
+        labels.append(first_name.setdefault(clusters.find(key), position))
+    return labels
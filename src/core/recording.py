@@ -0,0 +1,177 @@
+import gzip
+import json
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from .driver import Rect, SnapshotDriver, SnapshotElement, UIDriver, driver_for
+
+RECORDING_VERSION = 1
+# 每个节点在帧中占的整数个数：控件类型、名称编号、左、上、右、下、子节点数
+NODE_FIELDS = 7
+UNSAFE_FILENAME_PATTERN = re.compile(r'[\\/:*?"<>|\s]+')
+
+
+class TreeRecorder:
+    """
+    把界面子树录制为文件，作为测试和性能评估的素材
+
+    每次 capture 读取一棵子树（例如通讯录管理的群聊列表或聊天信息的成员面板）
+    作为一帧，列表每滚动一次录制一帧。一个录制文件是 gzip 压缩的 JSON：
+    控件名称放在字符串表中只存一次，每一帧是按先序排列的整数数组，每个节点
+    依次为控件类型、名称编号、左、上、右、下、子节点数。
+
+    Args:
+        driver: 读取控件用的驱动
+        directory: 录制文件的保存目录
+    """
+
+    def __init__(self, driver: UIDriver, directory: str):
+        self.driver = driver
+        self.directory = directory
+        self.kind: Optional[str] = None
+        self.label = ""
+        self.strings: List[str] = []
+        self.string_ids: Dict[str, int] = {}
+        self.frames: List[List[int]] = []
+
+    def begin(self, kind: str, label: str = ""):
+        """开始一个新的录制，未保存的录制被丢弃
+
+        Args:
+            kind: 录制的内容，"group_list" 或 "member_panel"
+            label: 说明，例如群名
+        """
+        self.kind = kind
+        self.label = label
+        self.strings = []
+        self.string_ids = {}
+        self.frames = []
+
+    def capture(self, root: Any) -> int:
+        """录制 root 的整棵子树作为一帧
+
+        Returns:
+            这一帧的节点数
+        """
+        if self.kind is None:
+            return 0
+        frame: List[int] = []
+        self._capture_node(root, frame)
+        self.frames.append(frame)
+        return len(frame) // NODE_FIELDS
+
+    def _intern(self, name: str) -> int:
+        """控件名称在字符串表中的编号"""
+        name_id = self.string_ids.get(name)
+        if name_id is None:
+            name_id = self.string_ids[name] = len(self.strings)
+            self.strings.append(name)
+        return name_id
+
+    def _capture_node(self, control: Any, frame: List[int]):
+        driver = driver_for(control, self.driver)
+        try:
+            name_id = self._intern(driver.get_name(control) or "")
+            rect = driver.get_rect(control)
+            children = driver.get_children(control)
+            frame.extend((driver.get_control_type(control), name_id,
+                          rect.left, rect.top, rect.right, rect.bottom, len(children)))
+        except Exception as e:
+            # 录制过程中控件消失时记为没有名称和子节点的空控件，保持帧的结构完整
+            print(f"录制控件失败: {e}")
+            frame.extend((0, self._intern(""), 0, 0, 0, 0, 0))
+            return
+        for child in children:
+            self._capture_node(child, frame)
+
+    def end(self) -> Optional[str]:
+        """保存当前录制
+
+        Returns:
+            录制文件的路径，没有录制任何帧时返回 None
+        """
+        if self.kind is None or not self.frames:
+            self.kind = None
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        label = UNSAFE_FILENAME_PATTERN.sub("_", self.label)[:40]
+        filename = f"{self.kind}_{timestamp}{'_' + label if label else ''}.json.gz"
+        path = os.path.join(self.directory, filename)
+        data = {
+            "version": RECORDING_VERSION,
+            "kind": self.kind,
+            "label": self.label,
+            "created": datetime.now().isoformat(),
+            "strings": self.strings,
+            "frames": self.frames,
+        }
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        print(f"已录制 {len(self.frames)} 帧界面到 {path}")
+        self.kind = None
+        return path
+
+
+class Recording(NamedTuple):
+    """读入的录制文件
+
+    Attributes:
+        kind: 录制的内容，"group_list" 或 "member_panel"
+        label: 录制时的说明
+        frames: 每一帧子树的根节点
+        node_counts: 每一帧的节点数
+    """
+    kind: str
+    label: str
+    frames: List[SnapshotElement]
+    node_counts: List[int]
+
+
+def _decode_frame(frame: List[int], strings: List[str]) -> SnapshotElement:
+    """把先序整数数组还原为控件树"""
+    root = None
+    # 栈中保存 (节点, 还没读到的子节点数)
+    stack = []
+    for offset in range(0, len(frame), NODE_FIELDS):
+        control_type, name_id, left, top, right, bottom, child_count = frame[offset:offset + NODE_FIELDS]
+        element = SnapshotElement(control_type, strings[name_id], Rect(left, top, right, bottom))
+        if stack:
+            parent = stack[-1]
+            parent[0].children.append(element)
+            parent[1] -= 1
+            if parent[1] == 0:
+                stack.pop()
+        else:
+            root = element
+        if child_count:
+            stack.append([element, child_count])
+    return root
+
+
+def load_recording(path: str) -> Recording:
+    """读入 TreeRecorder 保存的录制文件"""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("version") != RECORDING_VERSION:
+        raise ValueError(f"不支持的录制文件版本: {data.get('version')}")
+    strings = data["strings"]
+    frames = [_decode_frame(frame, strings) for frame in data["frames"]]
+    node_counts = [len(frame) // NODE_FIELDS for frame in data["frames"]]
+    return Recording(data["kind"], data.get("label", ""), frames, node_counts)
+
+
+class ReplayDriver(SnapshotDriver):
+    """
+    把录制的界面树交给 WeChatController 的收集函数的驱动
+
+    只支持读取控件，用于在没有微信客户端的环境中按真实的树形状和大小
+    评估 collect_group_items 和 collect_member_items，例如：
+
+        recording = load_recording(path)
+        controller = WeChatController(driver=ReplayDriver(), cache_dir=...)
+        for frame in recording.frames:
+            controller.collect_member_panel(frame, members)
+    """
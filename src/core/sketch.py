@@ -0,0 +1,112 @@
+import zlib
+from typing import Dict, Iterable, List, Sequence, Set, Tuple
+
+import numpy as np
+
+# 每个群的 MinHash 签名长度，每个值 4 字节，一个群的签名共 256 字节
+MINHASH_PERMUTATIONS = 64
+# LSH 分段数：签名分成 16 段，每段 4 个值，估计 Jaccard 约 0.4 以上的群对大概率成为候选
+LSH_BANDS = 16
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+# 固定种子，保证不同时间、不同机器上计算的签名可以互相比较
+_random = np.random.RandomState(1009)
+_PERMUTATION_A = _random.randint(1, 1 << 31, size=MINHASH_PERMUTATIONS).astype(np.uint64)
+_PERMUTATION_B = _random.randint(0, 1 << 32, size=MINHASH_PERMUTATIONS, dtype=np.int64).astype(np.uint64)
+
+
+def compute_minhash(member_names: Iterable[str]) -> np.ndarray:
+    """
+    计算一个群成员昵称集合的 MinHash 签名
+
+    昵称先用 crc32 映射成 32 位整数，再经过 MINHASH_PERMUTATIONS 个
+    (a * x + b) mod p 的随机哈希，每个哈希取最小值。两个群签名中相同位置
+    取值相等的比例是它们 Jaccard 相似度的无偏估计。
+
+    Returns:
+        uint32 数组；空群的签名全部为 0xFFFFFFFF
+    """
+    hashes = np.fromiter((zlib.crc32(name.encode('utf-8')) for name in member_names), dtype=np.uint64)
+    if not len(hashes):
+        return np.full(MINHASH_PERMUTATIONS, 0xFFFFFFFF, dtype=np.uint32)
+    permuted = (_PERMUTATION_A[:, None] * hashes[None, :] + _PERMUTATION_B[:, None]) % _MERSENNE_PRIME
+    return (permuted & _MAX_HASH).min(axis=1).astype(np.uint32)
+
+
+def minhash_to_bytes(signature: np.ndarray) -> bytes:
+    """签名序列化为固定字节序的字节串，用于存入缓存"""
+    return np.asarray(signature, dtype='<u4').tobytes()
+
+
+def minhash_from_bytes(data: bytes) -> np.ndarray:
+    """从缓存中的字节串恢复签名"""
+    return np.frombuffer(data, dtype='<u4').astype(np.uint32)
+
+
+def estimate_jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    """用两个签名估计 Jaccard 相似度"""
+    return float(np.mean(a == b))
+
+
+def lsh_candidate_pairs(signatures: np.ndarray, bands: int = LSH_BANDS) -> Set[Tuple[int, int]]:
+    """
+    用 LSH 分段找出可能重叠的群对
+
+    签名分成 bands 段，任意一段完全相同的两个群成为候选。只比较落在同一
+    桶中的群，不需要枚举所有群对。
+
+    Args:
+        signatures: 群 × 签名长度 的矩阵
+        bands: 分段数，必须整除签名长度
+
+    Returns:
+        候选群对 {(i, j)}，i < j
+    """
+    group_count, length = signatures.shape
+    rows = length // bands
+    candidates: Set[Tuple[int, int]] = set()
+    for band in range(bands):
+        keys = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows]).view(f'V{rows * 4}').ravel()
+        _, bucket_of = np.unique(keys, return_inverse=True)
+        bucket_of = bucket_of.ravel()
+        # 绝大多数桶只有一个群，先去掉再按桶切分
+        shared = np.flatnonzero(np.bincount(bucket_of)[bucket_of] >= 2)
+        order = shared[np.argsort(bucket_of[shared], kind="stable")]
+        boundaries = np.flatnonzero(np.diff(bucket_of[order])) + 1
+        for bucket in np.split(order, boundaries):
+            if len(bucket) < 2:
+                continue
+            members = bucket.tolist()
+            for x in range(len(members)):
+                for y in range(x + 1, len(members)):
+                    candidates.add((members[x], members[y]))
+    return candidates
+
+
+def rank_candidate_pairs(names: Sequence[str], signatures: np.ndarray,
+                         bands: int = LSH_BANDS) -> List[Tuple[float, str, str]]:
+    """
+    只用签名对候选群对按估计的 Jaccard 从高到低排序
+
+    Returns:
+        [(估计 Jaccard, 群A, 群B)]
+    """
+    candidates = sorted(lsh_candidate_pairs(signatures, bands))
+    if not candidates:
+        return []
+    left = np.array([i for i, _ in candidates])
+    right = np.array([j for _, j in candidates])
+    estimates = (signatures[left] == signatures[right]).mean(axis=1)
+    order = np.argsort(-estimates, kind="stable")
+    return [(float(estimates[k]), names[left[k]], names[right[k]]) for k in order]
+
+
+def stack_signatures(sketches: Dict[str, np.ndarray]) -> Tuple[List[str], np.ndarray]:
+    """把 {群名: 签名} 整理成群名列表和签名矩阵，跳过空群（空群的签名都相同）"""
+    names = list(sketches)
+    if not names:
+        return names, np.zeros((0, MINHASH_PERMUTATIONS), dtype=np.uint32)
+    signatures = np.vstack([sketches[name] for name in names])
+    keep = np.flatnonzero(~np.all(signatures == 0xFFFFFFFF, axis=1))
+    return [names[i] for i in keep], signatures[keep]
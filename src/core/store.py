@@ -0,0 +1,504 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from array import array
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from .groups import legacy_cache_groups, rekey_legacy_groups
+from .membership import StringTable
+from .sketch import compute_minhash, minhash_from_bytes, minhash_to_bytes
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS groups (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    member_count TEXT,
+    last_update TEXT,
+    members_update TEXT
+);
+CREATE TABLE IF NOT EXISTS members (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS memberships (
+    group_id INTEGER NOT NULL REFERENCES groups(id) ON DELETE CASCADE,
+    member_id INTEGER NOT NULL REFERENCES members(id),
+    PRIMARY KEY (group_id, member_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_memberships_member ON memberships(member_id, group_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS member_sets (
+    id INTEGER PRIMARY KEY,
+    digest TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    member_ids BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    note TEXT
+);
+CREATE TABLE IF NOT EXISTS snapshot_groups (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id) ON DELETE CASCADE,
+    group_name TEXT NOT NULL,
+    set_id INTEGER NOT NULL REFERENCES member_sets(id),
+    PRIMARY KEY (snapshot_id, group_name)
+) WITHOUT ROWID;
+"""
+
+
+
+def _rekey_legacy_groups(conn: sqlite3.Connection):
+    """把旧版 "群名(成员数)" 群标识改为稳定标识"""
+    rows = conn.execute("SELECT name, member_count FROM groups").fetchall()
+    mapping = rekey_legacy_groups([{"name": name, "member_count": count} for name, count in rows])
+    # 先改成临时名再改成新名，避免新旧标识互相冲突
+    for i, old_name in enumerate(mapping):
+        conn.execute("UPDATE groups SET name = ? WHERE name = ?", (f"\0rekey{i}", old_name))
+    for i, (old_name, new) in enumerate(mapping.items()):
+        conn.execute(
+            "UPDATE groups SET name = ?, title = ? WHERE name = ?",
+            (new["name"], new["title"], f"\0rekey{i}")
+        )
+    conn.execute("UPDATE groups SET title = name WHERE title IS NULL")
+
+
+def _intern_member_set(conn: sqlite3.Connection, member_ids: Iterable[int]) -> int:
+    """按内容保存排好序的成员 ID 数组，内容相同的成员集合只存一份"""
+    blob = array('I', sorted(member_ids)).tobytes()
+    digest = hashlib.sha1(blob).hexdigest()
+    conn.execute(
+        "INSERT OR IGNORE INTO member_sets (digest, size, member_ids) VALUES (?, ?, ?)",
+        (digest, len(blob) // 4, blob)
+    )
+    return conn.execute("SELECT id FROM member_sets WHERE digest = ?", (digest,)).fetchone()[0]
+
+
+def _build_member_sets(conn: sqlite3.Connection):
+    """为已有成员缓存的群生成成员集合"""
+    for group_id, in conn.execute("SELECT id FROM groups WHERE members_update IS NOT NULL").fetchall():
+        member_ids = [m for (m,) in conn.execute("SELECT member_id FROM memberships WHERE group_id = ?", (group_id,))]
+        conn.execute("UPDATE groups SET set_id = ? WHERE id = ?", (_intern_member_set(conn, member_ids), group_id))
+
+
+def _prefix_upper_bound(prefix: str) -> Optional[str]:
+    """以 prefix 开头的字符串都小于返回值，用于把前缀查询改写成索引上的范围查询"""
+    while prefix and prefix[-1] == chr(0x10FFFF):
+        prefix = prefix[:-1]
+    if not prefix:
+        return None
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _build_minhash(conn: sqlite3.Connection):
+    """为已有成员缓存的群计算 MinHash 签名"""
+    for group_id, in conn.execute("SELECT id FROM groups WHERE members_update IS NOT NULL").fetchall():
+        names = [name for (name,) in conn.execute(
+            "SELECT m.name FROM memberships ms JOIN members m ON m.id = ms.member_id WHERE ms.group_id = ?",
+            (group_id,)
+        )]
+        conn.execute("UPDATE groups SET minhash = ? WHERE id = ?", (minhash_to_bytes(compute_minhash(names)), group_id))
+
+
+# 按顺序执行的表结构升级，PRAGMA user_version 记录已经执行到第几条
+MIGRATIONS = [
+    # 抓取成员时群列表中显示的成员数，用于判断群是否有变化
+    "ALTER TABLE groups ADD COLUMN scraped_count TEXT",
+    # 群名（不含同名序号），群标识不再包含成员数
+    "ALTER TABLE groups ADD COLUMN title TEXT",
+    _rekey_legacy_groups,
+    # 群当前成员集合，快照之间共享未变化的集合
+    "ALTER TABLE groups ADD COLUMN set_id INTEGER REFERENCES member_sets(id)",
+    _build_member_sets,
+    # 成员的 MinHash 签名，用于近似估计群之间的重叠
+    "ALTER TABLE groups ADD COLUMN minhash BLOB",
+    _build_minhash,
+]
+
+
+class MembershipStore:
+    """基于 SQLite 的群成员关系存储
+
+    群聊、成员和群成员关系分别存放在三张表中，按群和按成员都建有索引，
+    单个群的成员写入在一个事务中完成，写入开销只与该群的人数有关。
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        # 工作线程和界面线程共用同一个连接，由 _lock 保证串行访问
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        self._upgrade_schema()
+        self.conn.commit()
+        self._member_table = None
+        self._saved_members = 0
+
+    def _upgrade_schema(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        for i in range(version, len(MIGRATIONS)):
+            step = MIGRATIONS[i]
+            if callable(step):
+                step(self.conn)
+            else:
+                self.conn.execute(step)
+            self.conn.execute(f"PRAGMA user_version = {i + 1}")
+
+    def get_meta(self, key: str) -> Optional[str]:
+        """读取元数据"""
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str):
+        self.conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value)
+        )
+
+    def get_last_update(self) -> Optional[str]:
+        """获取群聊列表的最后更新时间"""
+        return self.get_meta("last_update")
+
+    def count_groups(self) -> int:
+        """获取缓存的群聊数量"""
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM groups").fetchone()[0]
+
+    def list_groups(self) -> List[Dict]:
+        """获取所有群聊的基本信息（不读取成员）"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT name, title, member_count, last_update FROM groups ORDER BY id"
+            ).fetchall()
+        return [
+            {"name": name, "title": title or name, "member_count": member_count or "0", "last_update": last_update}
+            for name, title, member_count, last_update in rows
+        ]
+
+    def replace_groups(self, groups: List[Dict]):
+        """用新扫描到的群聊列表替换缓存中的列表
+
+        仍然存在的群保留已缓存的成员，已不存在的群连同成员关系一起删除。
+        """
+        now = datetime.now().isoformat()
+        with self._lock, self.conn:
+            names = [group["name"] for group in groups]
+            self.conn.executemany(
+                "INSERT INTO groups (name, title, member_count, last_update) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET title = excluded.title, "
+                "member_count = excluded.member_count, last_update = excluded.last_update",
+                [
+                    (group["name"], group.get("title") or group["name"], str(group["member_count"]), now)
+                    for group in groups
+                ]
+            )
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS keep_groups (name TEXT PRIMARY KEY)")
+            self.conn.execute("DELETE FROM keep_groups")
+            self.conn.executemany("INSERT OR IGNORE INTO keep_groups (name) VALUES (?)", [(n,) for n in names])
+            self.conn.execute("DELETE FROM groups WHERE name NOT IN (SELECT name FROM keep_groups)")
+            self._set_meta("last_update", now)
+
+    def get_group_info(self, group_name: str) -> Optional[Dict]:
+        """获取单个群的缓存信息（不读取成员）"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT title, member_count, last_update, members_update, scraped_count FROM groups WHERE name = ?",
+                (group_name,)
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            "name": group_name,
+            "title": row[0] or group_name,
+            "member_count": row[1] or "0",
+            "last_update": row[2],
+            "members_update": row[3],
+            "scraped_count": row[4]
+        }
+
+    @property
+    def member_table(self) -> StringTable:
+        """成员昵称驻留表，ID 与 members 表一致，第一次使用时才从数据库读取"""
+        with self._lock:
+            if self._member_table is None:
+                rows = self.conn.execute("SELECT id, name FROM members").fetchall()
+                strings = [None] * (max((i for i, _ in rows), default=-1) + 1)
+                for member_id, name in rows:
+                    strings[member_id] = name
+                self._member_table = StringTable(strings)
+                self._saved_members = len(strings)
+            return self._member_table
+
+    def _save_new_members(self) -> int:
+        """把驻留表中新增的昵称写入 members 表
+
+        Returns:
+            写入后已保存的昵称数。调用方在事务提交后才更新 _saved_members，
+            事务回滚时这些昵称下次会重新写入。
+        """
+        table = self.member_table
+        saved = len(table)
+        if self._saved_members < saved:
+            self.conn.executemany(
+                "INSERT INTO members (id, name) VALUES (?, ?)",
+                [(i, table[i]) for i in range(self._saved_members, saved)]
+            )
+        return saved
+
+    def get_group_member_ids(self, group_name: str) -> Optional[array]:
+        """获取缓存的群成员 ID（排好序的 array），没有缓存时返回 None"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT set_id, members_update FROM groups WHERE name = ?", (group_name,)
+            ).fetchone()
+            if not row or not row[1] or row[0] is None:
+                return None
+            return self.get_member_set(row[0])
+
+    def get_group_members(self, group_name: str) -> Optional[List[str]]:
+        """获取缓存的群成员昵称列表，没有缓存时返回 None"""
+        member_ids = self.get_group_member_ids(group_name)
+        if member_ids is None:
+            return None
+        return self.member_table.lookup(member_ids)
+
+    def find_member_groups(self, member_name: str) -> List[str]:
+        """查询成员所在的群标识（走 members.name 唯一索引和 memberships 的成员索引）"""
+        with self._lock:
+            return [name for (name,) in self.conn.execute(
+                """
+                SELECT g.name FROM members m
+                JOIN memberships ms ON ms.member_id = m.id
+                JOIN groups g ON g.id = ms.group_id
+                WHERE m.name = ?
+                ORDER BY g.name
+                """,
+                (member_name,)
+            )]
+
+    def search_members(self, prefix: str, limit: int = 20) -> List[Dict]:
+        """
+        按昵称前缀查找成员及其所在的群
+        
+        前缀查询改写为 members.name 索引上的范围查询，只返回至少在一个群中的成员。
+        
+        Returns:
+            [{"name": 昵称, "groups": [群标识]}]，按昵称排序
+        """
+        if not prefix:
+            return []
+        upper = _prefix_upper_bound(prefix)
+        range_sql = "m.name >= ?" + (" AND m.name < ?" if upper else "")
+        params = [prefix] + ([upper] if upper else []) + [limit]
+        with self._lock:
+            rows = self.conn.execute(
+                f"""
+                SELECT found.name, g.name FROM (
+                    SELECT m.id, m.name FROM members m
+                    WHERE {range_sql}
+                      AND EXISTS (SELECT 1 FROM memberships ms WHERE ms.member_id = m.id)
+                    ORDER BY m.name LIMIT ?
+                ) found
+                JOIN memberships ms ON ms.member_id = found.id
+                JOIN groups g ON g.id = ms.group_id
+                ORDER BY found.name, g.name
+                """,
+                params
+            ).fetchall()
+        results: List[Dict] = []
+        for member_name, group_name in rows:
+            if not results or results[-1]["name"] != member_name:
+                results.append({"name": member_name, "groups": []})
+            results[-1]["groups"].append(group_name)
+        return results
+
+    def save_group_members(self, group_name: str, member_ids: Iterable[int],
+                           member_count: Optional[str] = None, updated_at: Optional[str] = None):
+        """在一个事务中写入单个群的成员
+
+        Args:
+            group_name: 群名
+            member_ids: 成员 ID（来自 member_table）
+            member_count: 抓取时群列表显示的成员数，为 None 时保留原值
+            updated_at: 成员更新时间，默认为当前时间
+        """
+        member_ids = sorted(set(member_ids))
+        updated_at = updated_at or datetime.now().isoformat()
+        with self._lock:
+            with self.conn:
+                saved_members = self._save_new_members()
+                self.conn.execute(
+                    "INSERT INTO groups (name, title, member_count, last_update) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(name) DO NOTHING",
+                    (group_name, group_name, str(member_count if member_count is not None else len(member_ids)),
+                     updated_at)
+                )
+                if member_count is not None:
+                    self.conn.execute(
+                        "UPDATE groups SET member_count = ? WHERE name = ?", (str(member_count), group_name)
+                    )
+                self.conn.execute(
+                    "UPDATE groups SET last_update = ?, members_update = ?, scraped_count = ? WHERE name = ?",
+                    (updated_at, updated_at, str(member_count) if member_count is not None else None, group_name)
+                )
+                group_id = self.conn.execute("SELECT id FROM groups WHERE name = ?", (group_name,)).fetchone()[0]
+                self.conn.execute("DELETE FROM memberships WHERE group_id = ?", (group_id,))
+                self.conn.executemany(
+                    "INSERT INTO memberships (group_id, member_id) VALUES (?, ?)",
+                    [(group_id, member_id) for member_id in member_ids]
+                )
+                self.conn.execute(
+                    "UPDATE groups SET set_id = ?, minhash = ? WHERE id = ?",
+                    (
+                        _intern_member_set(self.conn, member_ids),
+                        minhash_to_bytes(compute_minhash(self.member_table.lookup(member_ids))),
+                        group_id
+                    )
+                )
+            self._saved_members = saved_members
+
+    def get_group_sketches(self) -> Dict[str, np.ndarray]:
+        """获取所有缓存了成员的群的 MinHash 签名 {群标识: 签名}"""
+        with self._lock:
+            return {
+                name: minhash_from_bytes(blob)
+                for name, blob in self.conn.execute("SELECT name, minhash FROM groups WHERE minhash IS NOT NULL")
+            }
+
+    def create_snapshot(self, note: str = "") -> int:
+        """把所有群当前的成员集合记录为一个快照
+
+        快照只保存群到成员集合的引用，成员未变化的群与之前的快照共用同一份数据。
+
+        Returns:
+            快照 ID
+        """
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO snapshots (created_at, note) VALUES (?, ?)", (datetime.now().isoformat(), note)
+            )
+            snapshot_id = cursor.lastrowid
+            self.conn.execute(
+                "INSERT INTO snapshot_groups (snapshot_id, group_name, set_id) "
+                "SELECT ?, name, set_id FROM groups WHERE set_id IS NOT NULL",
+                (snapshot_id,)
+            )
+        return snapshot_id
+
+    def list_snapshots(self) -> List[Dict]:
+        """获取所有快照，按时间从新到旧"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT s.id, s.created_at, s.note, COUNT(sg.group_name) FROM snapshots s "
+                "LEFT JOIN snapshot_groups sg ON sg.snapshot_id = s.id GROUP BY s.id ORDER BY s.id DESC"
+            ).fetchall()
+        return [
+            {"id": snapshot_id, "created_at": created_at, "note": note or "", "group_count": group_count}
+            for snapshot_id, created_at, note, group_count in rows
+        ]
+
+    def get_snapshot_groups(self, snapshot_id: int) -> Dict[str, int]:
+        """获取快照中每个群对应的成员集合 ID"""
+        with self._lock:
+            return dict(self.conn.execute(
+                "SELECT group_name, set_id FROM snapshot_groups WHERE snapshot_id = ?", (snapshot_id,)
+            ).fetchall())
+
+    def get_member_set(self, set_id: int) -> array:
+        """读取成员集合，返回排好序的成员 ID 数组"""
+        with self._lock:
+            row = self.conn.execute("SELECT member_ids FROM member_sets WHERE id = ?", (set_id,)).fetchone()
+        member_ids = array('I')
+        if row:
+            member_ids.frombytes(row[0])
+        return member_ids
+
+    def get_member_names(self, member_ids: Iterable[int]) -> Dict[int, str]:
+        """根据成员 ID 查询昵称"""
+        member_ids = list(member_ids)
+        names = {}
+        with self._lock:
+            # SQLite 对单条语句的参数个数有限制，分批查询
+            for start in range(0, len(member_ids), 500):
+                chunk = member_ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                names.update(self.conn.execute(
+                    f"SELECT id, name FROM members WHERE id IN ({placeholders})", chunk
+                ).fetchall())
+        return names
+
+    def migrate_legacy_json(self, json_path: str) -> bool:
+        """把旧版 wechat_groups_cache.json 导入数据库，只在首次启动时执行一次"""
+        if self.get_meta("legacy_migrated") or not os.path.exists(json_path):
+            return False
+
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                cache_data = json.load(f)
+        except Exception as e:
+            print(f"读取旧缓存失败: {e}")
+            return False
+
+        groups = legacy_cache_groups(cache_data)
+        if not groups:
+            # 没有读到任何群时不记录已迁移，以后修好文件还可以再导入
+            print("旧缓存中没有可以导入的群聊")
+            return False
+        print(f"开始迁移旧缓存: {len(groups)} 个群聊")
+        # 旧缓存以 "群名(成员数)" 为标识，导入时换成稳定标识
+        keys = rekey_legacy_groups([
+            {"name": name, "member_count": info.get("member_count", "0")} for name, info in groups.items()
+        ])
+        with self._lock:
+            self.replace_groups([
+                {
+                    "name": keys.get(name, {}).get("name", name),
+                    "title": keys.get(name, {}).get("title", name),
+                    "member_count": info.get("member_count", "0")
+                }
+                for name, info in groups.items()
+            ])
+            for name, info in groups.items():
+                if info.get("members"):
+                    self.save_group_members(
+                        keys.get(name, {}).get("name", name), self.member_table.intern_many(info["members"]),
+                        member_count=info.get("member_count"),
+                        updated_at=info.get("last_update")
+                    )
+            with self.conn:
+                if cache_data.get("last_update"):
+                    self._set_meta("last_update", cache_data["last_update"])
+                self._set_meta("legacy_migrated", datetime.now().isoformat())
+        print("旧缓存迁移完成")
+        return True
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self.conn.close()
+
+
+def open_store(cache_dir: str, mode: str = "sqlite"):
+    """按缓存模式打开群成员存储
+
+    Args:
+        cache_dir: 缓存目录
+        mode: "sqlite" 使用 SQLite 数据库，"journal" 使用快照加追加日志
+    """
+    if mode == "journal":
+        from .journal import JournalStore
+        return JournalStore(cache_dir)
+    return MembershipStore(os.path.join(cache_dir, "wechat_groups.db"))
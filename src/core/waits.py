@@ -0,0 +1,86 @@
+import time
+from typing import Any, Callable, Optional
+
+# 默认轮询间隔：从 50 毫秒开始，每次乘以 BACKOFF，最长 500 毫秒
+POLL_INTERVAL = 0.05
+POLL_BACKOFF = 1.5
+MAX_POLL_INTERVAL = 0.5
+
+
+def wait_until(predicate: Callable[[], Any], timeout: float = 5.0, interval: float = POLL_INTERVAL,
+               backoff: float = POLL_BACKOFF, max_interval: float = MAX_POLL_INTERVAL,
+               should_stop: Optional[Callable[[], bool]] = None) -> Any:
+    """
+    等待条件成立
+
+    立即检查一次，之后按逐渐变长的间隔轮询：界面响应快时几十毫秒内返回，
+    响应慢时最多等到 timeout，不会像固定的 sleep 那样要么白等要么等不够。
+    predicate 抛出的异常视为条件不成立（控件正在创建或销毁时经常出现）。
+
+    Args:
+        predicate: 条件，返回真值时结束等待
+        timeout: 最长等待秒数
+        interval: 第一次轮询的间隔
+        backoff: 每次轮询后间隔乘以的倍数
+        max_interval: 轮询间隔的上限
+        should_stop: 返回 True 时立即放弃等待，例如用户终止任务
+
+    Returns:
+        predicate 最后一次返回的真值；超时或被终止时返回 None
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            result = predicate()
+        except Exception:
+            result = None
+        if result:
+            return result
+        if should_stop and should_stop():
+            return None
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        time.sleep(min(interval, remaining))
+        interval = min(interval * backoff, max_interval)
+
+
+def wait_for_change(read: Callable[[], Any], timeout: float = 2.0, initial: Any = None,
+                    **kwargs) -> bool:
+    """
+    等待某个值发生变化，例如滚动后列表中可见的项
+
+    Args:
+        read: 读取当前值
+        timeout: 最长等待秒数
+        initial: 变化前的值，默认在调用时读取
+        kwargs: 传给 wait_until 的轮询参数
+
+    Returns:
+        在 timeout 内发生变化时返回 True
+    """
+    if initial is None:
+        initial = read()
+    return wait_until(lambda: read() != initial, timeout, **kwargs) is not None
+
+
+def wait_until_stable(read: Callable[[], Any], timeout: float = 3.0, settle: float = 0.2,
+                      interval: float = POLL_INTERVAL) -> Any:
+    """
+    等待某个值在 settle 秒内不再变化，例如逐步加载的成员面板
+
+    Returns:
+        稳定后的值；超时时返回最后一次读到的值
+    """
+    deadline = time.monotonic() + timeout
+    value = read()
+    stable_since = time.monotonic()
+    while True:
+        now = time.monotonic()
+        if now - stable_since >= settle or now >= deadline:
+            return value
+        time.sleep(min(interval, max(0.0, deadline - now)))
+        current = read()
+        if current != value:
+            value = current
+            stable_since = time.monotonic()
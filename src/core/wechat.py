@@ -1,48 +1,72 @@
-import win32gui
-import win32con
-import win32api
-import pyautogui
-import pyperclip
-import time
-import json
 import os
-from datetime import datetime
-from typing import Dict, List, Optional
-import uiautomation as auto
-from win32com.client import Dispatch  # 修改导入方式
+from array import array
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+from .analyzer import diff_snapshots
+from .driver import BUTTON, EDIT, LIST, LIST_ITEM, TEXT, Rect, SnapshotElement, UIDriver, driver_for
+from .groups import LEGACY_KEY_PATTERN, assign_group_keys
+from .membership import Membership, StringTable
+from .recording import TreeRecorder
+from .store import open_store
+from .waits import wait_for_change, wait_until, wait_until_stable
+
+# 操作前把微信窗口和通讯录管理窗口移到固定位置，坐标点击都基于这个位置
+WINDOW_RECT = Rect(0, 0, 1000, 700)
+# 不是成员昵称的控件文字
+MEMBER_NAME_BLACKLIST = (
+    "群聊", "聊天", "消息", "发送", "置顶", "最小化", "最大化", "关闭",
+    "查看更多", "群公告", "备注", "清空", "退出", "保存", "显示",
+    ".com", ".cn", "[图片]", "[视频]", "[链接]",
+    "播放：", "UP主：", "pdf", "weixinfile", "微信"
+)
+MEMBER_NAME_BLACKLIST_PREFIXES = ("收起", "直播", "语音", "发送", "置顶")
+MEMBER_NAME_BLACKLIST_SUFFIXES = ("M", "K", "B")
+# 在搜索框输入后弹出的搜索结果列表
+SEARCH_RESULT_LIST = "搜索结果"
+# 连续这么多次滚动没有新的项时认为已到达列表底部
+MAX_NO_CHANGE_SCROLLS = 3
 
 class WeChatController:
-    def __init__(self):
+    def __init__(self, cache_mode: str = "sqlite", cache_ttl_hours: float = 24,
+                 driver: Optional[UIDriver] = None, cache_dir: Optional[str] = None,
+                 bulk_fetch: bool = True):
+        """
+        Args:
+            cache_mode: 缓存模式，"sqlite"（默认）或 "journal"（快照加追加日志）
+            cache_ttl_hours: 增量分析时群成员缓存的有效期（小时）
+            driver: 界面自动化驱动，默认为操作真实微信的 WindowsDriver
+            cache_dir: 缓存目录，默认为 ~/wechat_tool_cache
+            bulk_fetch: 收集群聊和成员前一次读回整棵子树，而不是逐个控件跨进程读取
+        """
+        if driver is None:
+            from .win_driver import WindowsDriver
+            driver = WindowsDriver()
+        self.driver = driver
+        self.bulk_fetch = bulk_fetch
         self.wechat_window = None
-        self.member_list_window = None
-        self.members_data = []
-        self.shell = Dispatch("WScript.Shell")  # 创建 Shell 对象
         
-        # 初始化 UI 自动化
-        try:
-            # 使用 UIAutomationInitializerInThread 对象初始化 UI 自动化
-            self.ui_automation_initializer = auto.UIAutomationInitializerInThread()
-            print("UI 自动化初始化成功")
-        except Exception as e:
-            print(f"UI 自动化初始化失败: {e}")
-            
         self.debug_mode = False  # 添加调试模式标志
+        self.recorder: Optional[TreeRecorder] = None  # 调试模式下录制界面树
+        self.visited_controls = 0  # 最近一次收集成员时访问的控件数
         self.is_running = True  # 初始状态设为 True
         
-        # 设置缓存文件路径
-        self.cache_dir = os.path.join(os.path.expanduser("~"), "wechat_tool_cache")
+        # 设置缓存路径
+        self.cache_dir = cache_dir or os.path.join(os.path.expanduser("~"), "wechat_tool_cache")
         if not os.path.exists(self.cache_dir):
             os.makedirs(self.cache_dir)
-        self.cache_file = os.path.join(self.cache_dir, "wechat_groups_cache.json")
+        self.cache_file = os.path.join(self.cache_dir, "wechat_groups_cache.json")  # 旧版缓存，仅用于迁移
+        self.cache_mode = cache_mode
+        self.cache_ttl = timedelta(hours=cache_ttl_hours)
         print(f"\n=== 初始化缓存 ===")
         print(f"缓存目录: {self.cache_dir}")
-        print(f"缓存文件: {self.cache_file}")
-        self.cached_groups = self.load_cache()
+        print(f"缓存模式: {self.cache_mode}")
+        self.store = open_store(self.cache_dir, self.cache_mode)
+        self.store.migrate_legacy_json(self.cache_file)
         
         # 如果有缓存数据，打印群聊数量
-        if self.cached_groups and self.cached_groups.get("groups"):
-            groups_count = len(self.cached_groups["groups"])
-            last_update = self.cached_groups.get("last_update", "未知")
+        groups_count = self.store.count_groups()
+        if groups_count:
+            last_update = self.store.get_last_update() or "未知"
             print(f"已从缓存加载 {groups_count} 个群聊信息")
             print(f"上次更新时间: {last_update}")
             print("=== 缓存初始化完成 ===\n")
@@ -50,68 +74,45 @@ class WeChatController:
             print("未找到有效的缓存数据")
             print("=== 缓存初始化完成 ===\n")
 
-    def load_cache(self) -> dict:
-        """从缓存文件加载群聊信息"""
-        try:
-            if os.path.exists(self.cache_file):
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-                print(f"已从缓存加载 {len(cache_data.get('groups', []))} 个群聊信息")
-                return cache_data
-            print("未找到缓存文件，将创建新的缓存")
-            return {"last_update": None, "groups": {}}
-        except Exception as e:
-            print(f"加载缓存失败: {e}")
-            return {"last_update": None, "groups": {}}
-
-    def save_cache(self, groups_data: dict):
-        """保存群聊信息到缓存文件"""
-        try:
-            print(f"\n=== 开始保存缓存 ===")
-            print(f"缓存目录: {self.cache_dir}")
-            print(f"缓存文件: {self.cache_file}")
-            
-            # 确保缓存目录存在
-            if not os.path.exists(self.cache_dir):
-                print(f"创建缓存目录: {self.cache_dir}")
-                os.makedirs(self.cache_dir)
-            
-            # 打印要保存的数据
-            print(f"要保存的数据: {json.dumps(groups_data, ensure_ascii=False, indent=2)}")
-            
-            # 保存数据
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(groups_data, f, ensure_ascii=False, indent=2)
-            
-            # 验证文件是否创建成功
-            if os.path.exists(self.cache_file):
-                file_size = os.path.getsize(self.cache_file)
-                print(f"缓存文件创建成功，大小: {file_size} 字节")
-                print(f"已将 {len(groups_data.get('groups', {}))} 个群聊信息保存到缓存")
-            else:
-                print("警告：缓存文件似乎未能成功创建")
-            
-            print("=== 缓存保存完成 ===\n")
-        except Exception as e:
-            print(f"保存缓存失败: {str(e)}")
-            import traceback
-            print(f"错误详情:\n{traceback.format_exc()}")
+    @property
+    def member_table(self) -> StringTable:
+        """成员昵称驻留表，抓取、缓存和分析共用同一套成员 ID"""
+        return self.store.member_table
 
     def get_cached_groups(self) -> List[Dict]:
         """获取缓存的群聊列表"""
-        if not self.cached_groups.get("groups"):
+        groups = self.store.list_groups()
+        if not groups:
             print("缓存中没有群聊信息")
-            return []
-        
-        groups = []
-        for name, info in self.cached_groups["groups"].items():
-            groups.append({
-                "name": name,
-                "member_count": info.get("member_count", "0"),
-                "last_update": info.get("last_update")
-            })
         return groups
 
+    def load_cached_membership(self, group_names: Optional[List[str]] = None) -> Membership:
+        """从缓存读取群成员关系，不驱动微信界面
+        
+        Args:
+            group_names: 要读取的群标识，默认为所有缓存了成员的群
+        """
+        if group_names is None:
+            group_names = [group["name"] for group in self.store.list_groups()]
+        membership = Membership(self.member_table)
+        for group_name in group_names:
+            member_ids = self.store.get_group_member_ids(group_name)
+            if member_ids:
+                membership.set_group(group_name, member_ids)
+        return membership
+
+    def find_member_groups(self, member_name: str) -> List[str]:
+        """查询成员所在的群（只查缓存的倒排索引）"""
+        return self.store.find_member_groups(member_name)
+
+    def search_members(self, prefix: str, limit: int = 20) -> List[Dict]:
+        """按昵称前缀查找成员及其所在的群，返回 [{"name", "groups"}]"""
+        return self.store.search_members(prefix, limit)
+
+    def get_group_sketches(self) -> Dict:
+        """获取缓存中每个群的 MinHash 签名，用于近似估计群之间的重叠"""
+        return self.store.get_group_sketches()
+
     def update_group_cache(self, groups_data=None):
         """更新群聊缓存"""
         print("\n=== 开始更新群聊缓存 ===")
@@ -125,30 +126,8 @@ class WeChatController:
             groups = groups_data
             
         try:
-            # 转换格式以便存储
-            formatted_groups = {}
-            for group in groups:
-                group_name = group["name"]  # 完整群名（包含成员数）
-                formatted_groups[group_name] = {
-                    "member_count": group["member_count"],
-                    "last_update": datetime.now().isoformat(),
-                    "members": {}  # 预留成员信息字段
-                }
-            
-            print(f"处理群聊数据: {len(formatted_groups)} 个群聊")
-            
-            # 构建完整的缓存数据结构
-            cache_data = {
-                "last_update": datetime.now().isoformat(),
-                "groups": formatted_groups
-            }
-            
-            print(f"准备缓存 {len(formatted_groups)} 个群聊信息")
-            
-            # 保存到缓存
-            self.save_cache(cache_data)
-            self.cached_groups = cache_data
-            
+            print(f"准备缓存 {len(groups)} 个群聊信息")
+            self.store.replace_groups(groups)
             print("=== 群聊缓存更新完成 ===\n")
             return True
         except Exception as e:
@@ -157,26 +136,143 @@ class WeChatController:
             print(f"错误详情:\n{traceback.format_exc()}")
             return False
 
-    def get_group_members_with_cache(self, group_name: str, force_update: bool = False) -> Optional[Dict]:
-        """获取群成员信息（支持缓存）"""
+    def get_group_members_with_cache(self, group_name: str, force_update: bool = False,
+                                     member_count: Optional[str] = None) -> Optional[array]:
+        """获取群成员 ID（支持缓存）
+
+        Args:
+            group_name: 群名
+            force_update: 是否忽略缓存重新抓取
+            member_count: 群列表中显示的成员数，随成员一起写入缓存
+
+        Returns:
+            排好序的成员 ID 数组，ID 对应 member_table 中的昵称
+        """
         # 检查缓存
-        if not force_update and self.cached_groups.get("groups"):
-            group_info = self.cached_groups["groups"].get(group_name)
-            if group_info and group_info.get("members"):
+        if not force_update:
+            cached_members = self.store.get_group_member_ids(group_name)
+            if cached_members:
                 print(f"从缓存中获取群 {group_name} 的成员信息")
-                return group_info["members"]
+                return cached_members
         
         # 如果没有缓存或强制更新，则获取新数据
         members = self.get_group_members(group_name)
         if members:
-            # 更新缓存
-            if self.cached_groups["groups"].get(group_name):
-                self.cached_groups["groups"][group_name]["members"] = members
-                self.cached_groups["groups"][group_name]["last_update"] = datetime.now().isoformat()
-                self.save_cache(self.cached_groups["groups"])
+            # 更新缓存，只写入这一个群
+            try:
+                self.store.save_group_members(group_name, members, member_count=member_count)
+            except Exception as e:
+                print(f"保存群 {group_name} 的成员缓存失败: {e}")
             return members
         return None
 
+    def create_snapshot(self, note: str = "") -> Optional[int]:
+        """把当前缓存的群成员记录为一个历史快照"""
+        try:
+            snapshot_id = self.store.create_snapshot(note)
+            if snapshot_id is not None:
+                print(f"已创建成员快照 #{snapshot_id}")
+            return snapshot_id
+        except Exception as e:
+            print(f"创建成员快照失败: {e}")
+            return None
+
+    def list_snapshots(self) -> List[Dict]:
+        """获取历史快照列表"""
+        return self.store.list_snapshots()
+
+    def diff_snapshots(self, old_snapshot_id: int, new_snapshot_id: int) -> Dict[str, Dict[str, List[str]]]:
+        """比较两个快照之间每个群的成员变化
+
+        Returns:
+            {群标识: {"joined": [新加入成员], "left": [退出成员]}}，只包含有变化的群
+        """
+        changes = diff_snapshots(
+            self.store.get_snapshot_groups(old_snapshot_id),
+            self.store.get_snapshot_groups(new_snapshot_id),
+            self.store.get_member_set
+        )
+        member_ids = set()
+        for change in changes.values():
+            member_ids.update(change["joined"])
+            member_ids.update(change["left"])
+        names = self.store.get_member_names(member_ids)
+        return {
+            group_name: {
+                "joined": [names.get(m, str(m)) for m in change["joined"]],
+                "left": [names.get(m, str(m)) for m in change["left"]]
+            }
+            for group_name, change in changes.items()
+        }
+
+    def get_group_title(self, group_name: str) -> str:
+        """根据群标识获取用于搜索的群名"""
+        info = self.store.get_group_info(group_name)
+        if info:
+            return info["title"]
+        match = LEGACY_KEY_PATTERN.match(group_name)
+        return match.group(1).strip() if match else group_name
+
+    def is_group_cache_fresh(self, group_name: str, member_count: Optional[str] = None) -> bool:
+        """判断群成员缓存是否可以直接复用
+
+        成员数与抓取时一致且缓存未超过有效期时返回 True。
+        """
+        info = self.store.get_group_info(group_name)
+        if not info or not info.get("members_update") or not info.get("scraped_count"):
+            return False
+        current_count = member_count if member_count is not None else info["member_count"]
+        if str(current_count) != str(info["scraped_count"]):
+            return False
+        try:
+            age = datetime.now() - datetime.fromisoformat(info["members_update"])
+        except (TypeError, ValueError):
+            return False
+        return age <= self.cache_ttl
+
+    def get_fresh_cached_members(self, group_name: str, member_count: Optional[str] = None) -> Optional[array]:
+        """增量分析用：成员数未变化且缓存未过期时返回缓存的成员，否则返回 None"""
+        if not self.is_group_cache_fresh(group_name, member_count):
+            return None
+        cached_members = self.store.get_group_member_ids(group_name)
+        if not cached_members:
+            return None
+        print(f"群 {group_name} 成员数未变化，复用缓存")
+        return cached_members
+
+    def wait_for(self, predicate, timeout: float = 5.0):
+        """等待界面条件成立，任务被终止时立即放弃
+        
+        Returns:
+            条件的返回值；超时或任务被终止时返回 None
+        """
+        return wait_until(predicate, timeout, should_stop=lambda: not self.is_running)
+
+    def reader(self, control) -> UIDriver:
+        """读取 control 用的驱动，已经读入进程的子树不再跨进程读取"""
+        return driver_for(control, self.driver)
+
+    def snapshot(self, control):
+        """批量读取模式下一次读回 control 的整棵子树，读取失败时返回 control 本身"""
+        if not self.bulk_fetch or isinstance(control, SnapshotElement):
+            return control
+        try:
+            return self.driver.snapshot(control)
+        except Exception as e:
+            print(f"批量读取控件失败，改为逐个读取: {e}")
+            return control
+
+    def visible_item_names(self, list_control) -> List[str]:
+        """列表当前显示的项，用于判断切换或滚动后列表内容是否已经变化"""
+        list_control = self.snapshot(list_control)
+        driver = self.reader(list_control)
+        return [driver.get_name(child) for child in driver.get_children(list_control)]
+
+    def is_scrolled_to_bottom(self, list_control) -> bool:
+        """列表的滚动条是否已经到底，控件不支持滚动模式时返回 False"""
+        percent = self.driver.get_scroll_percent(list_control)
+        return percent is not None and percent >= 100
+
     def find_wechat_window(self):
         """查找微信窗口"""
         try:
@@ -187,30 +283,17 @@ class WeChatController:
             for attempt in range(max_retries):
                 print(f"尝试查找微信窗口 (第{attempt + 1}次)")
                 
-                # 先通过窗口句柄查找
-                self.wechat_window = win32gui.FindWindow("WeChatMainWndForPC", "微信")
-                if self.wechat_window and win32gui.IsWindowVisible(self.wechat_window):
-                    print(f"通过窗口句柄找到微信窗口: {self.wechat_window}")
-                    
-                    # 再尝试通过UI自动化查找
-                    try:
-                        self.wechat_ui = auto.WindowControl(
-                            searchDepth=1,
-                            ClassName="WeChatMainWndForPC",
-                            searchInterval=0.5
-                        )
-                        if self.wechat_ui.Exists(maxSearchSeconds=2):
-                            print("UI自动化成功找到微信窗口")
-                            return True
-                    except Exception as e:
-                        print(f"UI自动化查找失败: {e}")
+                self.wechat_window = self.driver.find_main_window()
+                if self.wechat_window:
+                    print("UI自动化成功找到微信窗口")
+                    return True
                 
-                print("等待1秒后重试...")
-                time.sleep(1)
+                print("等待微信窗口出现后重试...")
+                wait_until(self.driver.find_main_window, timeout=1)
             
             print("未找到微信窗口，请先打开微信界面")
             return False
-            
+        
         except Exception as e:
             print(f"查找微信窗口时发生错误: {e}")
             return False
@@ -223,130 +306,81 @@ class WeChatController:
                 print("无法找到微信窗口")
                 return False
         
+        driver = self.driver
+        window = self.wechat_window
+        
+        def is_foreground():
+            return driver.is_foreground(window)
+        
         try:
             max_retries = 3
             for attempt in range(max_retries):
                 print(f"尝试激活微信窗口 (第{attempt + 1}次)")
                 
                 # 检查窗口是否最小化并还原
-                placement = win32gui.GetWindowPlacement(self.wechat_window)
-                if placement[1] == win32con.SW_SHOWMINIMIZED:
+                if driver.is_minimized(window):
                     print("微信窗口已最小化，正在还原...")
-                    win32gui.ShowWindow(self.wechat_window, win32con.SW_RESTORE)
-                    time.sleep(0.5)
+                    driver.restore_window(window)
+                    wait_until(lambda: not driver.is_minimized(window), timeout=0.5)
                 
                 # 移动窗口到固定位置
                 try:
                     print("移动窗口到屏幕左上角...")
-                    win32gui.MoveWindow(self.wechat_window, 0, 0, 1000, 700, True)
-                    time.sleep(0.5)
+                    driver.move_window(window, WINDOW_RECT)
+                    wait_until(lambda: driver.get_rect(window) == WINDOW_RECT, timeout=0.5)
                 except Exception as e:
                     print(f"移动窗口失败: {e}")
                 
                 # 尝试多种方式激活窗口
                 try:
-                    # 方式1：使用SetForegroundWindow
-                    win32gui.SetForegroundWindow(self.wechat_window)
-                    time.sleep(0.2)
+                    driver.set_foreground(window)
                     
-                    # 方式2：使用BringWindowToTop
-                    win32gui.BringWindowToTop(self.wechat_window)
-                    time.sleep(0.2)
-                    
-                    # 方式3：使用Alt键
-                    self.shell.SendKeys('%')
-                    time.sleep(0.1)
-                    win32gui.SetForegroundWindow(self.wechat_window)
+                    if not wait_until(is_foreground, timeout=0.2):
+                        driver.force_foreground(window)
                     
                     # 验证窗口是否真的激活
-                    if win32gui.GetForegroundWindow() == self.wechat_window:
+                    if wait_until(is_foreground, timeout=0.5):
                         print("微信窗口已成功激活")
                         
                         # 获取窗口位置并点击
-                        left, top, right, bottom = win32gui.GetWindowRect(self.wechat_window)
-                        click_x = left + 10  # 距离左边10像素
-                        click_y = top + 10   # 距离顶部10像素
+                        rect = driver.get_rect(window)
+                        click_x = rect.left + 10  # 距离左边10像素
+                        click_y = rect.top + 10   # 距离顶部10像素
                         print(f"点击窗口位置: x={click_x}, y={click_y}")
-                        pyautogui.click(click_x, click_y)
-                        time.sleep(0.5)
+                        driver.click(click_x, click_y)
                         
                         return True
                 except Exception as e:
                     print(f"激活尝试失败: {e}")
                 
-                print("等待0.5秒后重试...")
-                time.sleep(0.5)
+                print("等待窗口激活后重试...")
+                wait_until(is_foreground, timeout=0.5)
             
             print("无法激活微信窗口，请手动点击微信窗口")
             return False
-            
+        
         except Exception as e:
             print(f"激活窗口时发生错误: {e}")
             return False
 
-    def find_member_list_window(self):
-        """查找群成员列表窗口"""
-        def callback(hwnd, extra):
-            if win32gui.IsWindowVisible(hwnd):
-                window_text = win32gui.GetWindowText(hwnd)
-                class_name = win32gui.GetClassName(hwnd)
-                # 打印窗口信息，用于调试
-                print(f"Window: {window_text}, Class: {class_name}")
-                # 根据实际观察调整条件
-                if ("群聊" in window_text or "聊天信息" in window_text) and class_name != "WeChatMainWndForPC":
-                    self.member_list_window = hwnd
-                    return False
-            return True
-
-        self.member_list_window = None  # 重置窗口句柄
-        win32gui.EnumWindows(callback, None)
-        return self.member_list_window is not None
-
-    def get_member_list_items(self) -> List[Dict[str, str]]:
-        """获取群成员列表中的所有成员信息"""
-        self.members_data = []
-
-        def enum_child_proc(hwnd, param):
-            """遍历子窗口回调函数"""
-            try:
-                # 获取窗口类名和文本
-                class_name = win32gui.GetClassName(hwnd)
-                window_text = win32gui.GetWindowText(hwnd)
-                
-                # 打印窗口信息用于调试
-                print(f"Child Window - Class: {class_name}, Text: {window_text}")
-                
-                # 根据实际情况调整判断条件
-                if class_name == "ListBox" and window_text:  # 这里的类名需要根据实际情况调整
-                    member_info = {
-                        "name": window_text,
-                        "wxid": "",  # TODO: 获取微信ID
-                    }
-                    self.members_data.append(member_info)
-            except Exception as e:
-                print(f"获取子窗口信息失败: {e}")
-
-        if self.member_list_window:
-            try:
-                # 遍历群成员列表窗口的子窗口
-                win32gui.EnumChildWindows(self.member_list_window, enum_child_proc, None)
-            except Exception as e:
-                print(f"遍历子窗口失败: {e}")
+    def enable_debug_mode(self, record_dir: Optional[str] = None):
+        """启用调试模式：抓取时把群聊列表和成员面板的界面树录制为文件
 
-        return self.members_data
-
-    def enable_debug_mode(self):
-        """启用调试模式"""
+        Args:
+            record_dir: 录制文件的保存目录，默认为缓存目录下的 recordings
+        """
         self.debug_mode = True
-        print("调试模式已启用")
+        self.recorder = TreeRecorder(self.driver, record_dir or os.path.join(self.cache_dir, "recordings"))
+        print(f"调试模式已启用，界面录制保存到 {self.recorder.directory}")
 
     def disable_debug_mode(self):
         """禁用调试模式"""
         self.debug_mode = False
+        self.recorder = None
         print("调试模式已禁用")
 
     def debug_ui_element(self, window_control, description=""):
-        """交互式调试UI元素
+        """调试UI元素，交互方式由驱动决定
         
         Args:
             window_control: 要调试的窗口控件
@@ -354,120 +388,182 @@ class WeChatController:
         """
         if not self.debug_mode:
             return
+        if self.reader(window_control).debug_element(window_control, description) is False:
+            self.disable_debug_mode()
+
+    def record_tree(self, control):
+        """调试模式下把 control 的子树录制为当前录制的一帧"""
+        if self.recorder:
+            self.recorder.capture(self.snapshot(control))
 
-        print(f"\n=== 开始调试UI元素 ===")
-        if description:
-            print(f"正在调试: {description}")
+    def collect_group_items(self, control, found: Dict[Tuple[str, str], None]) -> bool:
+        """递归收集所有群聊项
         
-        print("\n当前控件信息:")
-        print(f"类型: {window_control.ControlType}")
-        print(f"名称: {window_control.Name}")
-        print(f"类名: {window_control.ClassName}")
-        print(f"自动化ID: {window_control.AutomationId}")
-        rect = window_control.BoundingRectangle
-        print(f"位置: 左={rect.left}, 上={rect.top}, 右={rect.right}, 下={rect.bottom}")
+        Args:
+            control: 群聊列表或其中的控件
+            found: 已找到的 (群名, 成员数)，用 dict 保持发现顺序并去重
         
-        while True:
-            print("\n请选择操作:")
-            print("1 - 高亮显示元素位置")
-            print("2 - 点击元素")
-            print("3 - 显示子元素")
-            print("4 - 显示父元素")
-            print("5 - 继续执行（默认）")
-            print("6 - 退出调试")
-            print("Q - 退出程序")
-            print("\n直接按回车将执行选项5")
-            
-            # 等待按键
-            while True:
-                try:
-                    # 检查数字键1-6
-                    for i in range(ord('1'), ord('7')):
-                        if win32api.GetAsyncKeyState(i) & 0x8000:
-                            choice = chr(i)
-                            time.sleep(0.1)  # 等待按键释放
-                            break
-                    # 检查Q键
-                    if win32api.GetAsyncKeyState(ord('Q')) & 0x8000:
-                        choice = 'Q'
-                        time.sleep(0.1)
-                        break
-                    # 检查回车键
-                    if win32api.GetAsyncKeyState(0x0D) & 0x8000:  # 0x0D 是回车键的虚拟键码
-                        choice = '5'  # 默认选项
-                        time.sleep(0.1)
-                        break
-                    time.sleep(0.1)
-                except:
-                    continue
-                
-            print(f"\n选择了选项: {choice}")
-            
-            if choice == '1':
-                # 使用pyautogui移动到元素位置
-                pyautogui.moveTo(rect.xcenter(), rect.ycenter(), duration=0.5)
-                print(f"已将鼠标移动到元素中心点({rect.xcenter()}, {rect.ycenter()})")
-                
-            elif choice == '2':
-                print("确认要点击该元素吗？按Y确认，按N取消...")
-                while True:
-                    try:
-                        if win32api.GetAsyncKeyState(ord('Y')) & 0x8000:
-                            window_control.Click()
-                            print("已点击元素")
-                            time.sleep(0.5)
-                            break
-                        elif win32api.GetAsyncKeyState(ord('N')) & 0x8000:
-                            print("已取消点击")
-                            break
-                        time.sleep(0.1)
-                    except:
-                        continue
-                
-            elif choice == '3':
-                print("\n子元素列表:")
-                for i, child in enumerate(window_control.GetChildren(), 1):
-                    print(f"{i}. 类型={child.ControlType}, 名称={child.Name}, 类名={child.ClassName}")
-                print("\n按任意键继续...")
-                while True:
-                    try:
-                        if any(win32api.GetAsyncKeyState(i) & 0x8000 for i in range(256)):
-                            break
-                        time.sleep(0.1)
-                    except:
-                        continue
+        Returns:
+            任务被终止时返回 False
+        """
+        if not self.is_running:  # 在收集过程中也检查终止状态
+            return False
+        
+        driver = self.reader(control)
+        try:
+            rect = driver.get_rect(control)
+            if driver.get_control_type(control) == LIST_ITEM and rect.left < 200:
+                group_name = None
+                member_count = None
                 
-            elif choice == '4':
-                parent = window_control.GetParentControl()
-                print("\n父元素信息:")
-                print(f"类型: {parent.ControlType}")
-                print(f"名称: {parent.Name}")
-                print(f"类名: {parent.ClassName}")
-                print("\n按任意键继续...")
-                while True:
+                def find_text(ctrl):
+                    if not self.is_running:  # 在查找文本过程中也检查终止状态
+                        return False
+                    
+                    nonlocal group_name, member_count
                     try:
-                        if any(win32api.GetAsyncKeyState(i) & 0x8000 for i in range(256)):
-                            break
-                        time.sleep(0.1)
-                    except:
-                        continue
-                
-            elif choice == '5':
-                print("继续执行...")
-                break
-                
-            elif choice == '6':
-                print("退出调试模式")
-                self.disable_debug_mode()
-                break
+                        if driver.get_control_type(ctrl) == TEXT:
+                            text = driver.get_name(ctrl)
+                            if text:
+                                if "(" in text and ")" in text:
+                                    member_count = text.strip("()")
+                                    try:
+                                        int(member_count)
+                                    except:
+                                        member_count = None
+                                elif not text.startswith("当前群聊"):
+                                    group_name = text
+                    except Exception as e:
+                        print(f"处理文本控件失败: {e}")
+                    
+                    for child in driver.get_children(ctrl):
+                        if find_text(child) is False:
+                            return False
                 
-            elif choice.upper() == 'Q':
-                print("退出程序")
-                import sys
-                sys.exit(0)
+                if find_text(control) is False:
+                    return False
                 
-            else:
-                print("无效的选项，请重新输入")
+                if group_name and member_count:
+                    # 同名群按成员数区分，重复滚动到的同一个群只记一次
+                    found.setdefault((group_name, member_count))
+            
+            for child in driver.get_children(control):
+                if self.collect_group_items(child, found) is False:
+                    return False
+        
+        except Exception as e:
+            print(f"处理群聊项时出错: {e}")
+        return True
+
+    @staticmethod
+    def is_member_name(name: str) -> bool:
+        """过滤无效的成员名（按钮文字、聊天记录、文件名等）"""
+        return (
+            not any(x in name for x in MEMBER_NAME_BLACKLIST) and
+            not name.startswith(MEMBER_NAME_BLACKLIST_PREFIXES) and
+            not name.endswith(MEMBER_NAME_BLACKLIST_SUFFIXES) and
+            "：" not in name
+        )
+
+    def find_search_result(self, window, title: str):
+        """在搜索结果弹出列表中查找名称为 title 的项，还没有出现时返回 None"""
+        results = self.driver.find(window, LIST, SEARCH_RESULT_LIST)
+        return self.driver.find(results, LIST_ITEM, title) if results else None
+
+    def chat_title_region(self, window) -> Rect:
+        """聊天标题所在的区域：会话列表右侧、主窗口顶部"""
+        rect = self.reader(window).get_rect(window)
+        return Rect(int(rect.left + rect.width() * 0.3), rect.top, rect.right, int(rect.top + rect.height() * 0.08))
+
+    def current_chat_title(self, window) -> Optional[str]:
+        """当前打开的聊天的标题（去掉群成员数），没有打开聊天时返回 None
+        
+        只进入与标题区域相交的控件，不读取聊天记录和会话列表。
+        """
+        driver = self.reader(window)
+        region = self.chat_title_region(window)
+        
+        def find_title(control) -> Optional[str]:
+            for child in driver.get_children(control):
+                rect = driver.get_rect(child)
+                if not rect.is_empty() and not rect.intersects(region):
+                    continue
+                if driver.get_control_type(child) == TEXT and rect.left >= region.left:
+                    name = driver.get_name(child)
+                    if name:
+                        # 群聊的标题显示为 "群名 (成员数)"
+                        match = LEGACY_KEY_PATTERN.match(name)
+                        return match.group(1).strip() if match else name
+                title = find_title(child)
+                if title:
+                    return title
+            return None
+        
+        return find_title(window)
+
+    def member_panel_region(self, window) -> Rect:
+        """成员面板所在的区域：主窗口右侧 40%，左边是聊天记录"""
+        rect = self.reader(window).get_rect(window)
+        return Rect(int(rect.left + rect.width() * 0.6), rect.top, rect.right, rect.bottom)
+
+    def collect_member_panel(self, window, members: Set[str], member_list=None) -> bool:
+        """先定位成员面板，只收集面板子树中的成员
+        
+        访问的控件数只与面板中显示的成员数有关，与聊天记录的多少无关。
+        找不到成员列表时退回遍历整个窗口，面板区域之外的子树仍然被跳过。
+        
+        Args:
+            window: 微信主窗口
+            members: 已找到的成员昵称
+            member_list: 已经找到的成员列表控件，默认在 window 中查找
+        
+        Returns:
+            任务被终止时返回 False
+        """
+        region = self.member_panel_region(window)
+        container = member_list or self.reader(window).find(window, LIST, "聊天成员") or window
+        return self.collect_member_items(self.snapshot(container), members, region)
+
+    def collect_member_items(self, control, members: Set[str], region: Rect, depth: int = 0) -> bool:
+        """递归收集所有成员项
+        
+        Args:
+            control: 开始收集的控件
+            members: 已找到的成员昵称
+            region: 成员面板的区域，完全在区域之外的子树（聊天记录等）不再遍历
+        
+        Returns:
+            任务被终止时返回 False
+        """
+        if not self.is_running:
+            print("收集成员过程中检测到停止信号")
+            return False
+        
+        driver = self.reader(control)
+        self.visited_controls += 1
+        try:
+            rect = driver.get_rect(control)
+            # 有的容器没有大小，只能继续看它的子控件
+            if not rect.is_empty() and not rect.intersects(region):
+                return True
+            
+            if driver.get_control_type(control) in (BUTTON, TEXT):
+                name = driver.get_name(control)
+                if name and name not in members and self.is_member_name(name):
+                    if rect.left > region.left:
+                        members.add(name)
+            
+            # 每处理3个子控件检查一次停止信号
+            for i, child in enumerate(driver.get_children(control)):
+                if i % 3 == 0 and not self.is_running:
+                    print("处理子控件时检测到停止信号")
+                    return False
+                if self.collect_member_items(child, members, region, depth + 1) is False:
+                    return False
+        
+        except Exception as e:
+            print(f"处理成员项时出错: {str(e)}")
+        return True
 
     def get_group_list(self, use_cache=True):
         """获取群聊列表
@@ -480,18 +576,17 @@ class WeChatController:
             self.is_running = True
             
             # 如果允许使用缓存且缓存中有数据，直接返回缓存的群聊列表
-            if use_cache and self.cached_groups and self.cached_groups.get("groups"):
+            cached_groups = self.store.list_groups() if use_cache else []
+            if cached_groups:
                 print("\n=== 使用缓存数据 ===")
-                groups = []
-                for name, info in self.cached_groups["groups"].items():
-                    groups.append({
-                        "name": name,
-                        "member_count": info.get("member_count", "0")
-                    })
+                groups = [
+                    {"name": group["name"], "title": group["title"], "member_count": group["member_count"]}
+                    for group in cached_groups
+                ]
                 print(f"从缓存中获取到 {len(groups)} 个群聊")
                 print("=== 使用缓存完成 ===\n")
                 return groups
-                
+            
             print("\n=== 开始从微信获取群聊列表 ===")
             
             # 检查任务是否已终止
@@ -524,6 +619,7 @@ class WeChatController:
                 self.stop_task()
                 return None
             
+            driver = self.driver
             contact_manage_window = None  # 用于存储通讯录管理窗口引用
             
             try:
@@ -542,50 +638,50 @@ class WeChatController:
                         if not self.is_running:
                             self.stop_task()
                             return None
-                            
+                        
                         print("点击通讯录按钮...")
-                        window_rect = self.wechat_ui.BoundingRectangle
+                        window_rect = driver.get_rect(self.wechat_window)
                         click_x = window_rect.left + 30
                         click_y = window_rect.top + 140
-                        pyautogui.click(click_x, click_y)
-                        time.sleep(1)
+                        driver.click(click_x, click_y)
+                        self.wait_for(lambda: driver.find(self.wechat_window, BUTTON, "通讯录管理"), timeout=1)
                         
                         # 滚动到顶部
                         print("滚动到顶部...")
                         # 移动到通讯录管理按钮的位置
                         manage_x = window_rect.left + 100
                         manage_y = window_rect.top + 100
-                        pyautogui.moveTo(manage_x, manage_y)
-                        time.sleep(0.2)
+                        driver.move_to(manage_x, manage_y)
                         
-                        # 连续滚动多次确保到达顶部
+                        # 连续滚动多次确保到达顶部，等到通讯录管理按钮出现在可见区域
                         for _ in range(5):
-                            pyautogui.scroll(1000)
-                            time.sleep(0.2)
+                            driver.scroll(1000)
+                        
+                        def manage_button_visible():
+                            button = driver.find(self.wechat_window, BUTTON, "通讯录管理")
+                            return button and not driver.is_offscreen(button)
+                        
+                        self.wait_for(manage_button_visible, timeout=1)
                         
                         # 点击通讯录管理按钮
                         if not self.is_running:
                             self.stop_task()
                             return None
-                            
+                        
                         print("点击通讯录管理按钮...")
-                        manage_x = window_rect.left + 100
-                        manage_y = window_rect.top + 100
-                        pyautogui.click(manage_x, manage_y)
-                        time.sleep(1)
+                        driver.click(manage_x, manage_y)
                         
                         # 等待通讯录管理窗口出现
                         if not self.is_running:
                             self.stop_task()
                             return None
-                            
-                        print("等待通讯录管理窗口...")
-                        time.sleep(2)
                         
-                        # 获取并移动通讯录管理窗口
-                        print("查找通讯录管理窗口...")
-                        contact_manage_window = auto.WindowControl(searchDepth=1, Name="通讯录管理")
-                        if not contact_manage_window.Exists(maxSearchSeconds=3):
+                        print("等待通讯录管理窗口...")
+                        contact_manage_window = self.wait_for(lambda: driver.find_window("通讯录管理"), timeout=6)
+                        if not contact_manage_window:
+                            if not self.is_running:
+                                self.stop_task()
+                                return None
                             print("未找到通讯录管理窗口，请先打开微信界面")
                             continue
                         
@@ -595,9 +691,8 @@ class WeChatController:
                         
                         # 移动窗口到固定位置
                         try:
-                            window_handle = contact_manage_window.NativeWindowHandle
-                            win32gui.MoveWindow(window_handle, 0, 0, 1000, 700, True)
-                            time.sleep(0.5)
+                            driver.move_window(contact_manage_window, WINDOW_RECT)
+                            self.wait_for(lambda: driver.get_rect(contact_manage_window) == WINDOW_RECT, timeout=0.5)
                         except Exception as e:
                             print(f"移动窗口失败: {e}")
                             continue
@@ -606,99 +701,55 @@ class WeChatController:
                             self.stop_task()
                             return None
                         
-                        # 点击群聊标签
+                        # 点击群聊标签，列表内容切换为群聊后再开始收集
                         print("点击群聊标签...")
-                        window_rect = contact_manage_window.BoundingRectangle
+                        list_view = driver.find(contact_manage_window, LIST)
+                        names_before = self.visible_item_names(list_view) if list_view else []
+                        window_rect = driver.get_rect(contact_manage_window)
                         click_x = window_rect.left + 100
                         click_y = window_rect.top + 200
-                        pyautogui.click(click_x, click_y)
-                        time.sleep(1)
+                        driver.click(click_x, click_y)
                         
                         # 查找左侧列表
                         if not self.is_running:
                             self.stop_task()
                             return None
-                            
+                        
                         print("查找群聊列表...")
-                        list_view = contact_manage_window.ListControl()
-                        if not list_view.Exists(maxSearchSeconds=3):
+                        list_view = self.wait_for(lambda: driver.find(contact_manage_window, LIST), timeout=3)
+                        if not list_view:
                             print("未找到群聊列表，请先打开微信界面")
                             continue
+                        wait_for_change(lambda: self.visible_item_names(list_view), timeout=1, initial=names_before,
+                                        should_stop=lambda: not self.is_running)
                         
-                        # 收集群聊信息
-                        initial_groups = []
-                        
-                        def collect_group_items(control):
-                            """递归收集所有群聊项"""
-                            if not self.is_running:  # 在收集过程中也检查终止状态
-                                return False
-                                
-                            try:
-                                rect = control.BoundingRectangle
-                                if control.ControlType == 50007 and rect.left < 200:
-                                    group_name = None
-                                    member_count = None
-                                    
-                                    def find_text(ctrl):
-                                        if not self.is_running:  # 在查找文本过程中也检查终止状态
-                                            return False
-                                            
-                                        nonlocal group_name, member_count
-                                        try:
-                                            if ctrl.ControlType == 50020:
-                                                text = ctrl.Name
-                                                if text:
-                                                    if "(" in text and ")" in text:
-                                                        member_count = text.strip("()")
-                                                        try:
-                                                            int(member_count)
-                                                        except:
-                                                            member_count = None
-                                                    elif not text.startswith("当前群聊"):
-                                                        group_name = text
-                                        except Exception as e:
-                                            print(f"处理文本控件失败: {e}")
-                                        
-                                        for child in ctrl.GetChildren():
-                                            if find_text(child) is False:
-                                                return False
-                                    
-                                    if find_text(control) is False:
-                                        return False
-                                        
-                                    if group_name and member_count:
-                                        if not any(g[0] == group_name for g in initial_groups):
-                                            initial_groups.append((group_name, member_count))
-                                
-                                for child in control.GetChildren():
-                                    if collect_group_items(child) is False:
-                                        return False
-                                    
-                            except Exception as e:
-                                print(f"处理群聊项时出错: {e}")
-                            return True
+                        # 收集群聊信息，同名群按成员数区分
+                        found_groups: Dict[Tuple[str, str], None] = {}
                         
                         # 开始收集群聊信息
                         print("\n=== 开始收集群聊信息 ===")
                         
                         # 先收集第一屏的群聊
-                        if collect_group_items(list_view) is False:
+                        if self.recorder:
+                            self.recorder.begin("group_list", "通讯录管理")
+                        tree = self.snapshot(list_view)
+                        self.record_tree(tree)
+                        if self.collect_group_items(tree, found_groups) is False:
                             self.stop_task()
                             return None
-                            
-                        last_count = len(initial_groups)
+                        
+                        last_count = len(found_groups)
                         print(f"第一屏找到 {last_count} 个群聊")
                         
                         # 开始滚动收集
                         scroll_count = 0
-                        max_no_change_count = 3
                         no_change_count = 0
                         
                         print("\n=== 开始滚动收集群聊 ===")
                         while self.is_running:  # 使用is_running作为循环条件
-                            # 检查停止状态
-                            if not self.is_running:
-                                print("\n检测到停止信号！正在终止滚动收集...")
+                            # 滚动条已经到底时不必再滚动和等待
+                            if self.is_scrolled_to_bottom(list_view):
+                                print("已到达列表底部，停止滚动")
                                 break
                             
                             # 计算滚动位置
@@ -707,18 +758,19 @@ class WeChatController:
                             
                             # 移动到滚动位置
                             print(f"移动到滚动位置: x={scroll_x}, y={scroll_y}")
-                            pyautogui.moveTo(scroll_x, scroll_y)
-                            time.sleep(0.5)
+                            driver.move_to(scroll_x, scroll_y)
                             
                             # 再次检查停止状态
                             if not self.is_running:
                                 print("\n检测到停止信号！正在终止滚动操作...")
                                 break
                             
-                            # 执行滚动
+                            # 执行滚动，等到列表显示的内容变化；到达底部时内容不变，等待 1 秒后超时
                             print(f"执行第 {scroll_count + 1} 次滚动...")
-                            pyautogui.scroll(-700)
-                            time.sleep(1)
+                            names_before = self.visible_item_names(list_view)
+                            driver.scroll(-700)
+                            wait_for_change(lambda: self.visible_item_names(list_view), timeout=1,
+                                            initial=names_before, should_stop=lambda: not self.is_running)
                             
                             # 滚动后检查停止状态
                             if not self.is_running:
@@ -727,11 +779,13 @@ class WeChatController:
                             
                             # 收集当前可见的群聊
                             print("收集当前页面的群聊...")
-                            if collect_group_items(list_view) is False:
+                            tree = self.snapshot(list_view)
+                            self.record_tree(tree)
+                            if self.collect_group_items(tree, found_groups) is False:
                                 print("\n检测到停止信号或收集完成！")
                                 break
-                                
-                            current_count = len(initial_groups)
+                            
+                            current_count = len(found_groups)
                             new_items = current_count - last_count
                             print(f"当前共找到 {current_count} 个群聊 (新增: {new_items})")
                             
@@ -739,41 +793,24 @@ class WeChatController:
                             if new_items == 0:
                                 no_change_count += 1
                                 print(f"连续 {no_change_count} 次没有新增群聊")
-                                if no_change_count >= max_no_change_count:
+                                if no_change_count >= MAX_NO_CHANGE_SCROLLS:
                                     print("已到达列表底部，停止滚动")
                                     break
                             else:
                                 no_change_count = 0
-                                
+                            
                             last_count = current_count
                             scroll_count += 1
-                            
-                            # 每次循环结束前检查停止状态
-                            if not self.is_running:
-                                print("\n检测到停止信号！正在结束本次循环...")
-                                break
-                            
-                            time.sleep(0.5)
                         
                         # 循环结束后检查是否是因为停止信号退出
                         if not self.is_running:
                             print("\n=== 任务已被用户终止 ===")
                             break
                         
-                        # 循环结束后的处理
-                        if not self.is_running:
-                            print("正在清理并关闭窗口...")
-                            self.stop_task()
-                            return None
-                        
-                        if initial_groups:
-                            print(f"\n总共找到 {len(initial_groups)} 个群聊")
-                            groups = []
-                            for group_name, member_count in initial_groups:
-                                groups.append({
-                                    "name": f"{group_name}({member_count})",
-                                    "member_count": member_count
-                                })
+                        if found_groups:
+                            print(f"\n总共找到 {len(found_groups)} 个群聊")
+                            # 群标识只取决于群名，成员数变化时沿用原有缓存
+                            groups = assign_group_keys(list(found_groups), self.store.list_groups())
                             
                             # 更新缓存
                             print("\n=== 更新缓存 ===")
@@ -785,22 +822,25 @@ class WeChatController:
                             return groups
                         
                         print("未找到任何群聊，重试...")
-                        
+                    
                     except Exception as e:
                         print(f"获取群聊列表时出错: {e}")
                         if attempt < max_retries - 1:
                             print("等待2秒后重试...")
-                            time.sleep(2)
+                            # 等待期间任务被终止时立即结束
+                            self.wait_for(lambda: False, timeout=2)
                         continue
                 
                 print("\n=== 获取群聊列表失败 ===")
                 return None
-                
+            
             finally:
+                if self.recorder:
+                    self.recorder.end()
                 # 确保在任何情况下都关闭窗口
                 if not self.is_running and self.wechat_window:
                     self.stop_task()
-                
+        
         except Exception as e:
             print(f"获取群聊列表失败: {e}")
             import traceback
@@ -808,20 +848,22 @@ class WeChatController:
             self.stop_task()
             return None
 
-    def get_group_members(self, group_name):
-        """获取指定群的成员列表"""
+    def get_group_members(self, group_name) -> Optional[array]:
+        """获取指定群的成员列表
+        
+        Returns:
+            排好序的成员 ID 数组，昵称驻留在 member_table 中
+        """
         # 启动新任务
         if not self.start_task():
             return None
-
+        
+        driver = self.driver
         try:
             print(f"\n=== 开始获取群 {group_name} 的成员列表 ===")
-            members = {}  # 初始化成员字典
             
-            # 处理群名，去掉括号和数字
-            search_name = group_name
-            if "(" in group_name:
-                search_name = group_name.split("(")[0].strip()
+            # 群标识可能带同名序号，搜索时使用群名
+            search_name = self.get_group_title(group_name)
             print(f"使用处理后的群名进行搜索: {search_name}")
             
             # 确保微信窗口已激活
@@ -829,198 +871,167 @@ class WeChatController:
                 print("无法激活微信窗口")
                 self.stop_task()
                 return None
-
+            
             if not self.is_running:
                 print("任务已终止")
                 self.stop_task()
                 return None
             
+            window = self.wechat_window
+            
             # 点击聊天按钮确保在主界面
-            chat_btn = self.wechat_ui.ButtonControl(Name="聊天")
-            if chat_btn.Exists():
-                chat_btn.Click()
-                time.sleep(0.2)
+            chat_btn = driver.find(window, BUTTON, "聊天")
+            if chat_btn:
+                driver.click_element(chat_btn)
             
             if not self.is_running:
                 print("任务已终止")
                 self.stop_task()
                 return None
             
-            # 使用 UI 自动化查找搜索框
-            search_box = self.wechat_ui.EditControl(Name="搜索")
-            if not search_box.Exists(maxSearchSeconds=2):
+            # 查找搜索框
+            search_box = self.wait_for(lambda: driver.find(window, EDIT, "搜索"), timeout=2)
+            if not search_box:
                 print("未找到搜索框")
                 self.stop_task()
                 return None
             
             # 获取搜索框位置并输入群名
-            search_rect = search_box.BoundingRectangle
-            search_box.Click()
-            time.sleep(0.2)
+            search_rect = driver.get_rect(search_box)
+            driver.click_element(search_box)
+            self.wait_for(lambda: driver.has_focus(search_box), timeout=0.5)
             
             # 使用剪贴板来输入群名
-            original_clipboard = pyperclip.paste()  # 保存当前剪贴板内容
+            original_clipboard = driver.get_clipboard()  # 保存当前剪贴板内容
             try:
-                pyautogui.hotkey('ctrl', 'a')  # 全选
-                pyautogui.press('backspace')    # 清除
-                pyperclip.copy(search_name)     # 复制群名到剪贴板
-                pyautogui.hotkey('ctrl', 'v')   # 粘贴
+                driver.hotkey('ctrl', 'a')  # 全选
+                driver.press('backspace')    # 清除
+                driver.set_clipboard(search_name)     # 复制群名到剪贴板
+                driver.hotkey('ctrl', 'v')   # 粘贴
             finally:
-                time.sleep(0.2)
-                pyperclip.copy(original_clipboard)  # 恢复原始剪贴板内容
-
+                # 搜索框中出现群名说明粘贴已完成，之后才能恢复剪贴板
+                self.wait_for(lambda: driver.get_value(search_box) == search_name, timeout=0.5)
+                driver.set_clipboard(original_clipboard)  # 恢复原始剪贴板内容
+            
             if not self.is_running:
                 print("任务已终止")
                 self.stop_task()
                 return None
-
-            print("等待搜索结果...")
-            time.sleep(0.5)
             
-            # 计算并点击搜索结果的位置
-            result_x = search_rect.left + 20
-            result_y = search_rect.bottom + 100
-            print(f"点击搜索结果位置: x={result_x}, y={result_y}")
-            pyautogui.click(result_x, result_y)
-            time.sleep(0.5)
+            print("等待搜索结果...")
+            # 左侧会话列表中可能已有同名的项，只在搜索结果弹出列表中查找
+            result_item = self.wait_for(lambda: self.find_search_result(window, search_name), timeout=2)
+            if result_item:
+                print("点击搜索结果")
+                driver.click_element(result_item)
+            else:
+                # 找不到搜索结果列表时点击第一个结果的位置，下面会核对打开的聊天
+                result_x = search_rect.left + 20
+                result_y = search_rect.bottom + 100
+                print(f"未找到搜索结果，点击搜索结果位置: x={result_x}, y={result_y}")
+                driver.click(result_x, result_y)
             
             if not self.is_running:
                 print("任务已终止")
                 self.stop_task()
                 return None
             
+            # 之前打开的聊天也有"聊天信息"按钮，等聊天标题变成要找的群再继续
+            if not self.wait_for(lambda: self.current_chat_title(window) == search_name, timeout=2):
+                print(f"没有打开群 {search_name} 的聊天，当前聊天: {self.current_chat_title(window)}")
+                self.stop_task()
+                return None
+            
             # 点击右侧的"..."设置按钮
             print("查找设置按钮...")
-            more_btn = self.wechat_ui.ButtonControl(Name="聊天信息")
-            if not more_btn.Exists(maxSearchSeconds=2):
+            more_btn = self.wait_for(lambda: driver.find(window, BUTTON, "聊天信息"), timeout=2)
+            if not more_btn:
                 print("尝试查找备选设置按钮...")
-                more_btn = self.wechat_ui.ButtonControl(Name="更多")
-                if not more_btn.Exists():
-                    more_btn = self.wechat_ui.ButtonControl(searchDepth=5, ClassName="Button")
+                more_btn = (driver.find(window, BUTTON, "更多") or
+                            driver.find(window, BUTTON, class_name="Button", depth=5))
             
             if not self.is_running:
                 print("任务已终止")
                 self.stop_task()
                 return None
             
-            if more_btn.Exists():
-                print("点击设置按钮")
-                more_btn.Click()
-                time.sleep(0.5)
-                
-                if not self.is_running:
-                    print("任务已终止")
-                    self.stop_task()
-                    return None
-                
-                # 点击"查看更多"按钮
-                print("查找并点击查看更多按钮...")
-                view_more_btn = self.wechat_ui.ButtonControl(Name="查看更多")
-                if not view_more_btn.Exists(maxSearchSeconds=2):
-                    print("尝试查找备选查看更多按钮...")
-                    view_more_btn = self.wechat_ui.ButtonControl(searchDepth=5, Name="群成员")
-                
-                if not self.is_running:
-                    print("任务已终止")
-                    self.stop_task()
-                    return None
-                
-                if view_more_btn.Exists():
-                    print("点击查看更多按钮")
-                    view_more_btn.Click()
-                    time.sleep(1)
-                    
-                    if not self.is_running:
-                        print("任务已终止")
-                        self.stop_task()
-                        return None
-                    
-                    # 获取主窗口的位置
-                    main_rect = self.wechat_ui.BoundingRectangle
-                    print(f"主窗口位置: 左={main_rect.left}, 上={main_rect.top}, 右={main_rect.right}, 下={main_rect.bottom}")
-                    
-                    # 初始化成员集合
-                    initial_members = set()
-                    processed_members = set()
-                    
-                    def collect_member_items(control, depth=0):
-                        """递归收集所有成员项"""
-                        if not self.is_running:
-                            print("收集成员过程中检测到停止信号")
-                            return False
-                            
-                        try:
-                            # 每递归3层检查一次停止信号
-                            if depth % 3 == 0 and not self.is_running:
-                                print("递归过程中检测到停止信号")
-                                return False
-                            
-                            rect = control.BoundingRectangle
-                            if control.ControlType in [50000, 50020]:
-                                name = control.Name
-                                if name and name not in processed_members:
-                                    # 过滤无效的成员名
-                                    if (not any(x in name for x in [
-                                        "群聊", "聊天", "消息", "发送", "置顶", "最小化", "最大化", "关闭",
-                                        "查看更多", "群公告", "备注", "清空", "退出", "保存", "显示",
-                                        ".com", ".cn", "[图片]", "[视频]", "[链接]",
-                                        "播放：", "UP主：", "pdf", "weixinfile", "微信"
-                                    ]) and
-                                    not name.startswith(("收起", "直播", "语音", "发送", "置顶")) and
-                                    not name.endswith(("M", "K", "B")) and
-                                    "：" not in name
-                                    ):
-                                        if rect.left > main_rect.left + (main_rect.width() * 0.6):
-                                            initial_members.add(name)
-                                            processed_members.add(name)
-                            
-                            # 每处理3个子控件检查一次停止信号
-                            for i, child in enumerate(control.GetChildren()):
-                                if i % 3 == 0 and not self.is_running:
-                                    print("处理子控件时检测到停止信号")
-                                    return False
-                                if collect_member_items(child, depth + 1) is False:
-                                    return False
-                                
-                        except Exception as e:
-                            print(f"处理成员项时出错: {str(e)}")
-                        return True
-                    
-                    print("\n=== 开始收集成员信息 ===")
-                    
-                    # 收集当前可见的成员
-                    if collect_member_items(self.wechat_ui) is False:
-                        print("收集成员过程被终止")
-                        self.stop_task()
-                        return None
-                    
-                    if not self.is_running:
-                        print("任务已终止")
-                        self.stop_task()
-                        return None
-                    
-                    # 处理收集到的成员信息
-                    if initial_members:
-                        print(f"\n总共找到 {len(initial_members)} 个成员")
-                        for member_name in initial_members:
-                            members[member_name] = {
-                                "group": group_name
-                            }
-                        print(f"成功处理 {len(members)} 个成员信息")
-                        return members
-                    else:
-                        print("未找到任何成员")
-                        self.stop_task()
-                        return None
-                else:
-                    print("未找到查看更多按钮")
-                    self.stop_task()
-                    return None
-            else:
+            if not more_btn:
                 print("未找到设置按钮")
                 self.stop_task()
                 return None
             
+            print("点击设置按钮")
+            driver.click_element(more_btn)
+            
+            if not self.is_running:
+                print("任务已终止")
+                self.stop_task()
+                return None
+            
+            # 点击"查看更多"按钮
+            print("查找并点击查看更多按钮...")
+            view_more_btn = self.wait_for(lambda: driver.find(window, BUTTON, "查看更多"), timeout=2)
+            if not view_more_btn:
+                print("尝试查找备选查看更多按钮...")
+                view_more_btn = driver.find(window, BUTTON, "群成员", depth=5)
+            
+            if not self.is_running:
+                print("任务已终止")
+                self.stop_task()
+                return None
+            
+            if not view_more_btn:
+                print("未找到查看更多按钮")
+                self.stop_task()
+                return None
+            
+            print("点击查看更多按钮")
+            driver.click_element(view_more_btn)
+            # 等成员面板出现并且成员数不再增加（成员是逐批加载的）
+            member_list = self.wait_for(lambda: driver.find(window, LIST, "聊天成员"), timeout=1)
+            if member_list:
+                wait_until_stable(lambda: len(driver.get_children(member_list)), timeout=2, settle=0.2)
+            
+            if not self.is_running:
+                print("任务已终止")
+                self.stop_task()
+                return None
+            
+            print("\n=== 开始收集成员信息 ===")
+            
+            # 收集当前可见的成员
+            members: Set[str] = set()
+            self.visited_controls = 0
+            if self.recorder:
+                self.recorder.begin("member_panel", search_name)
+            self.record_tree(window)
+            if self.collect_member_panel(window, members, member_list) is False:
+                print("收集成员过程被终止")
+                self.stop_task()
+                return None
+            
+            # 成员列表是虚拟化的，只有显示出来的成员才能读到，需要滚动收集
+            if member_list and not self.scroll_member_list(member_list, members):
+                print("收集成员过程被终止")
+                self.stop_task()
+                return None
+            
+            if not self.is_running:
+                print("任务已终止")
+                self.stop_task()
+                return None
+            
+            # 处理收集到的成员信息
+            if members:
+                print(f"\n总共找到 {len(members)} 个成员，访问了 {self.visited_controls} 个控件")
+                member_ids = self.member_table.intern_many(members)
+                print(f"成功处理 {len(member_ids)} 个成员信息")
+                return member_ids
+            else:
+                print("未找到任何成员")
+                self.stop_task()
+                return None
+        
         except Exception as e:
             print(f"获取群成员失败: {str(e)}")
             import traceback
@@ -1028,14 +1039,51 @@ class WeChatController:
             self.stop_task()
             return None
         finally:
+            if self.recorder:
+                self.recorder.end()
             if not self.is_running:  # 修改条件判断
                 print("任务已终止，执行清理操作")
                 self.stop_task()
 
+    def scroll_member_list(self, member_list, members: Set[str]) -> bool:
+        """滚动成员列表，收集每一屏显示的成员
+        
+        Returns:
+            任务被终止时返回 False
+        """
+        driver = self.driver
+        list_rect = driver.get_rect(member_list)
+        region = self.member_panel_region(self.wechat_window)
+        no_change_count = 0
+        while self.is_running:
+            # 滚动条已经到底时不必再滚动和等待
+            if self.is_scrolled_to_bottom(member_list):
+                return True
+            
+            names_before = self.visible_item_names(member_list)
+            driver.move_to(list_rect.xcenter(), list_rect.ycenter())
+            driver.scroll(-700)
+            if not wait_for_change(lambda: self.visible_item_names(member_list), timeout=1,
+                                   initial=names_before, should_stop=lambda: not self.is_running):
+                # 滚动后内容不变，说明已经到底
+                return self.is_running
+            
+            count = len(members)
+            self.record_tree(self.wechat_window)
+            if self.collect_member_items(self.snapshot(member_list), members, region) is False:
+                return False
+            if len(members) == count:
+                no_change_count += 1
+                if no_change_count >= MAX_NO_CHANGE_SCROLLS:
+                    return True
+            else:
+                no_change_count = 0
+        return False
+
     def get_member_info(self, member_id):
         """获取成员信息"""
         # TODO: 实现成员信息获取逻辑
-        pass 
+        pass
 
     def stop_task(self):
         """停止当前任务"""
@@ -1043,81 +1091,40 @@ class WeChatController:
         # 立即设置终止标志
         self.is_running = False
         
+        driver = self.driver
         try:
-            # 先尝试使用UI自动化关闭窗口
+            # 先尝试按 ESC 关闭窗口
             try:
-                # 群成员列表窗口
-                member_list = auto.WindowControl(searchDepth=1, Name="聊天信息")
-                if member_list.Exists(maxSearchSeconds=1):
-                    print("关闭群成员列表窗口...")
-                    member_list.SendKeys("{ESC}")
-                    time.sleep(0.2)
-                
-                # 通讯录管理窗口
-                contact_manage = auto.WindowControl(searchDepth=1, Name="通讯录管理")
-                if contact_manage.Exists(maxSearchSeconds=1):
-                    print("关闭通讯录管理窗口...")
-                    contact_manage.SendKeys("{ESC}")
-                    time.sleep(0.2)
+                for title, description in (("聊天信息", "群成员列表"), ("通讯录管理", "通讯录管理")):
+                    window = driver.find_window(title)
+                    if window:
+                        print(f"关闭{description}窗口...")
+                        driver.send_keys(window, "{ESC}")
+                        wait_until(lambda: not driver.is_window(window), timeout=0.5)
             except Exception as e:
                 print(f"UI自动化关闭窗口时出错: {e}")
             
-            # 然后使用Win32 API强制关闭
-            def force_close_window(window_title):
-                """强制关闭指定窗口"""
-                try:
-                    def callback(hwnd, windows):
-                        if win32gui.IsWindowVisible(hwnd):
-                            title = win32gui.GetWindowText(hwnd)
-                            window_class = win32gui.GetClassName(hwnd)
-                            
-                            # 排除主窗口和主程序窗口
-                            if (window_class == "WeChatMainWndForPC" or 
-                                "微信群成员分析工具" in title):
-                                return True
-                                
-                            if window_title in title:
-                                windows.append(hwnd)
-                        return True
-                    
-                    windows = []
-                    win32gui.EnumWindows(callback, windows)
-                    
-                    for hwnd in windows:
-                        try:
-                            title = win32gui.GetWindowText(hwnd)
-                            # 再次确认不是主程序窗口
-                            if "微信群成员分析工具" not in title:
-                                print(f"尝试关闭窗口: {title}")
-                                win32gui.PostMessage(hwnd, win32con.WM_CLOSE, 0, 0)
-                                time.sleep(0.2)
-                        except Exception as e:
-                            print(f"关闭窗口失败: {e}")
-                            
-                    return len(windows) > 0
-                except Exception as e:
-                    print(f"查找窗口失败: {e}")
-                    return False
-            
-            # 按顺序关闭窗口
+            # 然后强制关闭，排除主程序窗口
             windows_to_close = ["群成员", "聊天信息", "群聊", "通讯录管理"]
             for title in windows_to_close:
                 print(f"尝试关闭 {title} 窗口...")
-                if force_close_window(title):
-                    print(f"已关闭 {title} 窗口")
-                    time.sleep(0.3)  # 稍微增加等待时间
+                try:
+                    if driver.close_windows(title, exclude_titles=("微信群成员分析工具",)):
+                        print(f"已关闭 {title} 窗口")
+                except Exception as e:
+                    print(f"查找窗口失败: {e}")
             
             # 最后点击微信主窗口以确保焦点回到主窗口
-            if self.wechat_window and win32gui.IsWindow(self.wechat_window):
+            if self.wechat_window and driver.is_window(self.wechat_window):
                 try:
-                    win32gui.SetForegroundWindow(self.wechat_window)
-                    rect = win32gui.GetWindowRect(self.wechat_window)
-                    pyautogui.click(rect[0] + 10, rect[1] + 10)
+                    driver.set_foreground(self.wechat_window)
+                    rect = driver.get_rect(self.wechat_window)
+                    driver.click(rect.left + 10, rect.top + 10)
                 except:
                     pass
             
             print("任务终止完成")
-            
+        
         except Exception as e:
             print(f"终止任务时出错: {str(e)}")
             import traceback
@@ -1130,14 +1137,15 @@ class WeChatController:
         """开始新任务"""
         print("\n=== 开始新任务 ===")
         self.is_running = True
-        return True 
+        return True
 
     def __del__(self):
         """析构函数，用于释放资源"""
         try:
             # 释放 UI 自动化资源
-            if hasattr(self, 'ui_automation_initializer'):
-                del self.ui_automation_initializer
-                print("UI 自动化资源已释放")
+            if hasattr(self, 'driver'):
+                self.driver.close()
+            if hasattr(self, 'store'):
+                self.store.close()
         except Exception as e:
-            print(f"释放 UI 自动化资源时出错: {e}") 
\ No newline at end of file
+            print(f"释放 UI 自动化资源时出错: {e}")
@@ -0,0 +1,340 @@
+import time
+from typing import Any, List, Optional
+
+import pyautogui
+import pyperclip
+import uiautomation as auto
+import win32api
+import win32con
+import win32gui
+from win32com.client import Dispatch
+
+from .driver import Rect, SnapshotElement, UIDriver, counted
+from .waits import wait_until
+
+MAIN_WINDOW_CLASS = "WeChatMainWndForPC"
+MAIN_WINDOW_TITLE = "微信"
+# UIA 的 AutomationElementMode_None
+AUTOMATION_ELEMENT_MODE_NONE = 0
+
+
+class WindowsDriver(UIDriver):
+    """通过 uiautomation、win32 和 pyautogui 操作真实的微信客户端"""
+
+    def __init__(self):
+        super().__init__()
+        self.shell = Dispatch("WScript.Shell")  # 创建 Shell 对象
+
+        # 初始化 UI 自动化
+        try:
+            # 使用 UIAutomationInitializerInThread 对象初始化 UI 自动化
+            self.ui_automation_initializer = auto.UIAutomationInitializerInThread()
+            print("UI 自动化初始化成功")
+        except Exception as e:
+            print(f"UI 自动化初始化失败: {e}")
+
+    # ---- 窗口 ----
+
+    @counted
+    def find_main_window(self) -> Optional[Any]:
+        # 先通过窗口句柄查找，找到后再交给 UI 自动化
+        hwnd = win32gui.FindWindow(MAIN_WINDOW_CLASS, MAIN_WINDOW_TITLE)
+        if not hwnd or not win32gui.IsWindowVisible(hwnd):
+            return None
+        print(f"通过窗口句柄找到微信窗口: {hwnd}")
+        try:
+            window = auto.WindowControl(searchDepth=1, ClassName=MAIN_WINDOW_CLASS, searchInterval=0.5)
+            if window.Exists(maxSearchSeconds=2):
+                return window
+        except Exception as e:
+            print(f"UI自动化查找失败: {e}")
+        return None
+
+    @counted
+    def find_window(self, name: str) -> Optional[Any]:
+        window = auto.WindowControl(searchDepth=1, Name=name)
+        return window if window.Exists(0, 0) else None
+
+    @counted
+    def is_window(self, window: Any) -> bool:
+        return bool(win32gui.IsWindow(window.NativeWindowHandle))
+
+    @counted
+    def is_minimized(self, window: Any) -> bool:
+        return win32gui.GetWindowPlacement(window.NativeWindowHandle)[1] == win32con.SW_SHOWMINIMIZED
+
+    @counted
+    def restore_window(self, window: Any):
+        win32gui.ShowWindow(window.NativeWindowHandle, win32con.SW_RESTORE)
+
+    @counted
+    def move_window(self, window: Any, rect: Rect):
+        win32gui.MoveWindow(window.NativeWindowHandle, rect.left, rect.top, rect.width(), rect.height(), True)
+
+    @counted
+    def set_foreground(self, window: Any):
+        win32gui.SetForegroundWindow(window.NativeWindowHandle)
+
+    @counted
+    def force_foreground(self, window: Any):
+        hwnd = window.NativeWindowHandle
+        # 使用BringWindowToTop，再按一下Alt键解除前台锁定
+        win32gui.BringWindowToTop(hwnd)
+        self.shell.SendKeys('%')
+        win32gui.SetForegroundWindow(hwnd)
+
+    @counted
+    def is_foreground(self, window: Any) -> bool:
+        return win32gui.GetForegroundWindow() == window.NativeWindowHandle
+
+    def close_windows(self, title: str, exclude_titles=()) -> int:
+        def callback(hwnd, windows):
+            if win32gui.IsWindowVisible(hwnd):
+                window_title = win32gui.GetWindowText(hwnd)
+                # 排除主窗口和指定的窗口
+                if win32gui.GetClassName(hwnd) == MAIN_WINDOW_CLASS:
+                    return True
+                if any(excluded in window_title for excluded in exclude_titles):
+                    return True
+                if title in window_title:
+                    windows.append(hwnd)
+            return True
+
+        windows = []
+        win32gui.EnumWindows(callback, windows)
+        for hwnd in windows:
+            try:
+                print(f"尝试关闭窗口: {win32gui.GetWindowText(hwnd)}")
+                win32gui.PostMessage(hwnd, win32con.WM_CLOSE, 0, 0)
+                wait_until(lambda: not win32gui.IsWindow(hwnd), timeout=0.5)
+            except Exception as e:
+                print(f"关闭窗口失败: {e}")
+        return len(windows)
+
+    # ---- 鼠标和键盘 ----
+
+    @counted
+    def click(self, x: int, y: int):
+        pyautogui.click(x, y)
+
+    @counted
+    def move_to(self, x: int, y: int):
+        pyautogui.moveTo(x, y)
+
+    @counted
+    def scroll(self, amount: int):
+        pyautogui.scroll(amount)
+
+    @counted
+    def hotkey(self, *keys: str):
+        pyautogui.hotkey(*keys)
+
+    @counted
+    def press(self, key: str):
+        pyautogui.press(key)
+
+    @counted
+    def get_clipboard(self) -> str:
+        return pyperclip.paste()
+
+    @counted
+    def set_clipboard(self, text: str):
+        pyperclip.copy(text)
+
+    @counted
+    def click_element(self, element: Any):
+        element.Click()
+
+    @counted
+    def send_keys(self, element: Any, keys: str):
+        element.SendKeys(keys)
+
+    # ---- 控件 ----
+
+    @counted
+    def find(self, root: Any, control_type: Optional[int] = None, name: Optional[str] = None,
+             class_name: Optional[str] = None, depth: Optional[int] = None) -> Optional[Any]:
+        conditions = {}
+        if control_type is not None:
+            conditions["ControlType"] = control_type
+        if name is not None:
+            conditions["Name"] = name
+        if class_name is not None:
+            conditions["ClassName"] = class_name
+        control = auto.Control(searchFromControl=root, searchDepth=depth or 0xFFFFFFFF, **conditions)
+        return control if control.Exists(0, 0) else None
+
+    @counted
+    def get_children(self, element: Any) -> List[Any]:
+        children = element.GetChildren()
+        # GetChildren 先取第一个子控件，再逐个取下一个兄弟控件，每个子控件都是一次往返
+        self.calls["get_children"] += len(children)
+        return children
+
+    @counted
+    def get_name(self, element: Any) -> str:
+        return element.Name
+
+    @counted
+    def get_control_type(self, element: Any) -> int:
+        return element.ControlType
+
+    @counted
+    def get_class_name(self, element: Any) -> str:
+        return element.ClassName
+
+    @counted
+    def get_rect(self, element: Any) -> Rect:
+        rect = element.BoundingRectangle
+        return Rect(rect.left, rect.top, rect.right, rect.bottom)
+
+    @counted
+    def has_focus(self, element: Any) -> bool:
+        return element.HasKeyboardFocus
+
+    @counted
+    def get_value(self, element: Any) -> str:
+        return element.GetValuePattern().Value
+
+    @counted
+    def is_offscreen(self, element: Any) -> bool:
+        return element.IsOffscreen
+
+    @counted
+    def get_scroll_percent(self, element: Any) -> Optional[float]:
+        try:
+            pattern = element.GetScrollPattern()
+            if not pattern:
+                return None
+            percent = pattern.VerticalScrollPercent
+        except Exception:
+            return None
+        # UIA 在不能滚动时返回 -1
+        return 100.0 if percent < 0 else percent
+
+    def debug_element(self, element: Any, description: str = "") -> bool:
+        """交互式调试UI元素，通过键盘选择操作"""
+        print(f"\n=== 开始调试UI元素 ===")
+        if description:
+            print(f"正在调试: {description}")
+
+        print("\n当前控件信息:")
+        print(f"类型: {element.ControlType}")
+        print(f"名称: {element.Name}")
+        print(f"类名: {element.ClassName}")
+        print(f"自动化ID: {element.AutomationId}")
+        rect = element.BoundingRectangle
+        print(f"位置: 左={rect.left}, 上={rect.top}, 右={rect.right}, 下={rect.bottom}")
+
+        while True:
+            print("\n请选择操作:")
+            print("1 - 高亮显示元素位置")
+            print("2 - 点击元素")
+            print("3 - 显示子元素")
+            print("4 - 显示父元素")
+            print("5 - 继续执行（默认）")
+            print("6 - 退出调试")
+            print("Q - 退出程序")
+            print("\n直接按回车将执行选项5")
+
+            choice = self._wait_key()
+            print(f"\n选择了选项: {choice}")
+
+            if choice == '1':
+                # 使用pyautogui移动到元素位置
+                pyautogui.moveTo(rect.xcenter(), rect.ycenter(), duration=0.5)
+                print(f"已将鼠标移动到元素中心点({rect.xcenter()}, {rect.ycenter()})")
+
+            elif choice == '2':
+                print("确认要点击该元素吗？按Y确认，按N取消...")
+                if self._wait_key('YN') == 'Y':
+                    element.Click()
+                    print("已点击元素")
+                else:
+                    print("已取消点击")
+
+            elif choice == '3':
+                print("\n子元素列表:")
+                for i, child in enumerate(element.GetChildren(), 1):
+                    print(f"{i}. 类型={child.ControlType}, 名称={child.Name}, 类名={child.ClassName}")
+                print("\n按任意键继续...")
+                self._wait_key(None)
+
+            elif choice == '4':
+                parent = element.GetParentControl()
+                print("\n父元素信息:")
+                print(f"类型: {parent.ControlType}")
+                print(f"名称: {parent.Name}")
+                print(f"类名: {parent.ClassName}")
+                print("\n按任意键继续...")
+                self._wait_key(None)
+
+            elif choice == '5':
+                print("继续执行...")
+                return True
+
+            elif choice == '6':
+                print("退出调试模式")
+                return False
+
+            elif choice == 'Q':
+                print("退出程序")
+                import sys
+                sys.exit(0)
+
+    @staticmethod
+    def _wait_key(keys: Optional[str] = '123456Q') -> str:
+        """
+        等待按键（回车视为 '5'）
+
+        Args:
+            keys: 接受的按键，None 表示任意键
+        """
+        while True:
+            try:
+                if keys is None:
+                    if any(win32api.GetAsyncKeyState(i) & 0x8000 for i in range(256)):
+                        return ''
+                else:
+                    for key in keys:
+                        if win32api.GetAsyncKeyState(ord(key)) & 0x8000:
+                            time.sleep(0.1)  # 等待按键释放
+                            return key
+                    # 0x0D 是回车键的虚拟键码
+                    if '5' in keys and win32api.GetAsyncKeyState(0x0D) & 0x8000:
+                        time.sleep(0.1)
+                        return '5'
+                time.sleep(0.1)
+            except Exception:
+                continue
+
+    @counted
+    def snapshot(self, root: Any) -> SnapshotElement:
+        """用 UIA 缓存请求一次往返取回整棵子树的控件类型、名称和位置"""
+        client = auto._AutomationClient.instance()
+        request = client.IUIAutomation.CreateCacheRequest()
+        for property_id in (auto.PropertyId.ControlTypePropertyId, auto.PropertyId.NamePropertyId,
+                            auto.PropertyId.BoundingRectanglePropertyId):
+            request.AddProperty(property_id)
+        request.TreeScope = auto.TreeScope.Subtree
+        # 与 GetChildren 使用的 RawViewWalker 看到的控件一致
+        request.TreeFilter = client.IUIAutomation.RawViewCondition
+        # 只需要缓存的属性，不保留对界面控件的引用
+        request.AutomationElementMode = AUTOMATION_ELEMENT_MODE_NONE
+        return self._cached_element(root.Element.BuildUpdatedCache(request))
+
+    def _cached_element(self, element) -> SnapshotElement:
+        """把缓存请求取回的元素转换为 SnapshotElement，读取缓存的属性不跨进程"""
+        rect = element.CachedBoundingRectangle
+        node = SnapshotElement(element.CachedControlType, element.CachedName or "",
+                               Rect(rect.left, rect.top, rect.right, rect.bottom))
+        children = element.GetCachedChildren()
+        if children:
+            node.children = [self._cached_element(children.GetElement(i)) for i in range(children.Length)]
+        return node
+
+    def close(self):
+        # 释放 UI 自动化资源
+        if hasattr(self, 'ui_automation_initializer'):
+            del self.ui_automation_initializer
+            print("UI 自动化资源已释放")
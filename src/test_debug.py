@@ -4,12 +4,12 @@ def main():
     # 创建控制器实例
     controller = WeChatController()
     
-    # 启用调试模式
+    # 启用调试模式，抓取过程中的界面树会录制到文件
     controller.enable_debug_mode()
     
-    # 开始获取群聊列表，这个过程会触发调试功能
+    # 开始获取群聊列表（不使用缓存，这样才会真正驱动微信界面并录制）
     print("开始测试获取群聊列表...")
-    groups = controller.get_group_list()
+    groups = controller.get_group_list(use_cache=False)
     
     # 打印获取到的群聊信息
     if groups:
@@ -18,6 +18,7 @@ def main():
             print(f"群名: {group['name']}, 成员数: {group['member_count']}")
     else:
         print("未获取到群聊信息")
+    print(f"界面录制文件保存在: {controller.recorder.directory}")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -14,18 +14,26 @@ from PyQt5.QtWidgets import (
     QCheckBox,
     QFileDialog,
     QDialog,
-    QApplication
+    QApplication,
+    QSpinBox,
+    QComboBox,
+    QLineEdit,
+    QSlider
 )
 from PyQt5.QtCore import Qt, QTimer, QThread, pyqtSignal
 import keyboard
 from src.core.wechat import WeChatController
+from src.core.groups import format_group_label
+from src.core.membership import Membership
+from src.core.analyzer import AnalysisEngine, MembershipQuery, compute_group_overlap, top_group_pairs
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
+import math
 import os
 import sys
 import logging
 import traceback
-from PyQt5.QtGui import QIcon
+from PyQt5.QtGui import QIcon, QPainter, QColor
 import uiautomation as auto
 
 class TaskPromptDialog(QDialog):
@@ -138,9 +146,290 @@ class TaskPromptDialog(QDialog):
         self.raise_()  # 确保窗口在最前面
         self.activateWindow()  # 激活窗口
 
+class SnapshotDiffDialog(QDialog):
+    """成员变化对比窗口"""
+    def __init__(self, wechat, snapshots, parent=None):
+        super().__init__(parent)
+        self.wechat = wechat
+        self.setWindowTitle("成员变化")
+        self.resize(900, 500)
+        
+        layout = QVBoxLayout(self)
+        
+        # 快照选择
+        select_layout = QHBoxLayout()
+        self.old_combo = QComboBox()
+        self.new_combo = QComboBox()
+        for snapshot in snapshots:
+            label = f"#{snapshot['id']} {snapshot['created_at'][:19].replace('T', ' ')} {snapshot['note']}"
+            self.old_combo.addItem(label, snapshot["id"])
+            self.new_combo.addItem(label, snapshot["id"])
+        # 默认对比最近两次
+        self.old_combo.setCurrentIndex(1)
+        self.new_combo.setCurrentIndex(0)
+        compare_button = QPushButton("对比")
+        compare_button.clicked.connect(self.compare)
+        select_layout.addWidget(QLabel("旧快照"))
+        select_layout.addWidget(self.old_combo, 1)
+        select_layout.addWidget(QLabel("新快照"))
+        select_layout.addWidget(self.new_combo, 1)
+        select_layout.addWidget(compare_button)
+        layout.addLayout(select_layout)
+        
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+        
+        self.table = QTableWidget()
+        self.table.setColumnCount(5)
+        self.table.setHorizontalHeaderLabels(["群聊", "新加入", "退出", "新加入成员", "退出成员"])
+        self.table.setAlternatingRowColors(True)
+        layout.addWidget(self.table)
+        
+        self.compare()
+        
+    def compare(self):
+        """对比选中的两个快照"""
+        old_id = self.old_combo.currentData()
+        new_id = self.new_combo.currentData()
+        changes = self.wechat.diff_snapshots(old_id, new_id)
+        
+        self.table.setRowCount(0)
+        for row, (group_name, change) in enumerate(sorted(changes.items())):
+            self.table.insertRow(row)
+            self.table.setItem(row, 0, QTableWidgetItem(group_name))
+            self.table.setItem(row, 1, QTableWidgetItem(str(len(change["joined"]))))
+            self.table.setItem(row, 2, QTableWidgetItem(str(len(change["left"]))))
+            self.table.setItem(row, 3, QTableWidgetItem(", ".join(change["joined"])))
+            self.table.setItem(row, 4, QTableWidgetItem(", ".join(change["left"])))
+        self.table.resizeColumnsToContents()
+        
+        joined = sum(len(change["joined"]) for change in changes.values())
+        left = sum(len(change["left"]) for change in changes.values())
+        self.summary_label.setText(f"{len(changes)} 个群有变化，新加入 {joined} 人次，退出 {left} 人次")
+
+class GroupOverlapDialog(QDialog):
+    """群重叠分析窗口：列出共同成员最多的群对"""
+    MAX_ROWS = 1000  # 表格最多显示的群对数，完整矩阵通过导出查看
+    
+    def __init__(self, overlap, parent=None):
+        super().__init__(parent)
+        self.overlap = overlap
+        self.setWindowTitle("群重叠分析")
+        self.resize(900, 500)
+        
+        layout = QVBoxLayout(self)
+        
+        header_layout = QHBoxLayout()
+        pairs = overlap.top_pairs(limit=self.MAX_ROWS)
+        total_pairs = overlap.pair_count()
+        summary_label = QLabel(f"{len(overlap)} 个群，{total_pairs} 对群有共同成员"
+                               + (f"，显示重叠最高的 {len(pairs)} 对" if total_pairs > len(pairs) else ""))
+        export_button = QPushButton("导出")
+        export_button.clicked.connect(self.export)
+        header_layout.addWidget(summary_label)
+        header_layout.addStretch()
+        header_layout.addWidget(export_button)
+        layout.addLayout(header_layout)
+        
+        self.table = QTableWidget()
+        self.table.setColumnCount(6)
+        self.table.setHorizontalHeaderLabels(["群聊A", "群聊B", "群聊A人数", "群聊B人数", "共同成员", "Jaccard"])
+        self.table.setAlternatingRowColors(True)
+        self.table.setRowCount(len(pairs))
+        for row, pair in enumerate(pairs):
+            self.table.setItem(row, 0, QTableWidgetItem(pair["group_a"]))
+            self.table.setItem(row, 1, QTableWidgetItem(pair["group_b"]))
+            self.table.setItem(row, 2, QTableWidgetItem(str(pair["size_a"])))
+            self.table.setItem(row, 3, QTableWidgetItem(str(pair["size_b"])))
+            self.table.setItem(row, 4, QTableWidgetItem(str(pair["shared"])))
+            self.table.setItem(row, 5, QTableWidgetItem(f"{pair['jaccard']:.3f}"))
+        self.table.resizeColumnsToContents()
+        layout.addWidget(self.table)
+        
+    def export(self):
+        """导出群对列表以及完整的共同成员数、Jaccard 矩阵"""
+        default_filename = f"群重叠分析_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        filename, _ = QFileDialog.getSaveFileName(
+            self,
+            "导出群重叠分析",
+            os.path.join(os.path.expanduser("~"), "Desktop", default_filename),
+            "Excel 文件 (*.xlsx);;所有文件 (*.*)"
+        )
+        if not filename:
+            return
+        if not filename.endswith('.xlsx'):
+            filename += '.xlsx'
+            
+        try:
+            pairs = pd.DataFrame(self.overlap.top_pairs()).rename(columns={
+                "group_a": "群聊A", "group_b": "群聊B", "size_a": "群聊A人数",
+                "size_b": "群聊B人数", "shared": "共同成员", "jaccard": "Jaccard"
+            })
+            groups = self.overlap.groups
+            with pd.ExcelWriter(filename, engine='openpyxl') as writer:
+                pairs.to_excel(writer, index=False, sheet_name='群对')
+                pd.DataFrame(self.overlap.intersections, index=groups, columns=groups).to_excel(
+                    writer, sheet_name='共同成员数')
+                pd.DataFrame(self.overlap.jaccard.round(4), index=groups, columns=groups).to_excel(
+                    writer, sheet_name='Jaccard')
+            QMessageBox.information(self, "成功", f"数据已成功导出到：\n{filename}")
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"导出失败：{str(e)}")
+
+class QueryResultDialog(QDialog):
+    """成员查询结果窗口"""
+    MAX_ROWS = 5000  # 表格最多显示的成员数
+    
+    def __init__(self, expression, member_rows, parent=None):
+        """
+        Args:
+            expression: 查询表达式
+            member_rows: [(成员昵称, [表达式中涉及且该成员所在的群])]
+        """
+        super().__init__(parent)
+        self.setWindowTitle("成员查询")
+        self.resize(700, 500)
+        
+        layout = QVBoxLayout(self)
+        shown = member_rows[:self.MAX_ROWS]
+        summary = f"{expression}\n共 {len(member_rows)} 个成员"
+        if len(shown) < len(member_rows):
+            summary += f"，显示前 {len(shown)} 个"
+        layout.addWidget(QLabel(summary))
+        
+        table = QTableWidget()
+        table.setColumnCount(2)
+        table.setHorizontalHeaderLabels(["群成员", "所在群聊（查询涉及的群）"])
+        table.setAlternatingRowColors(True)
+        table.setRowCount(len(shown))
+        for row, (member, groups) in enumerate(shown):
+            table.setItem(row, 0, QTableWidgetItem(member))
+            table.setItem(row, 1, QTableWidgetItem(", ".join(groups)))
+        table.resizeColumnsToContents()
+        layout.addWidget(table)
+
+class GroupCountHistogram(QWidget):
+    """所在群数分布的柱状图，达到阈值的柱子高亮显示"""
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.histogram = []
+        self.threshold = 2
+        self.setFixedHeight(60)
+        
+    def set_data(self, histogram, threshold):
+        """
+        Args:
+            histogram: 第 n 项为恰好在 n 个群中的成员数
+            threshold: 当前的 min_groups
+        """
+        self.histogram = histogram
+        self.threshold = threshold
+        tips = [f"{n} 个群：{count} 人" for n, count in enumerate(histogram) if n and count]
+        self.setToolTip("\n".join(tips))
+        self.update()
+        
+    def paintEvent(self, event):
+        bars = self.histogram[1:]
+        if not any(bars):
+            return
+        painter = QPainter(self)
+        width = self.width() / len(bars)
+        # 只在 1 个群中的成员通常远多于其他，按对数高度显示
+        scale = math.log1p(max(bars))
+        for i, count in enumerate(bars):
+            if not count:
+                continue
+            height = max(1, int((self.height() - 2) * math.log1p(count) / scale))
+            color = QColor("#4A90E2") if i + 1 >= self.threshold else QColor("#CCCCCC")
+            painter.fillRect(int(i * width) + 1, self.height() - height,
+                             max(1, int(width) - 2), height, color)
+        painter.end()
+
+class RankingDialog(QDialog):
+    """排行窗口：所在群最多的成员和共同成员最多的群对"""
+    TOP_K = 100
+    WEIGHTINGS = [("按群数", "count"), ("按群人数倒数加权（小群优先）", "inverse_size")]
+    membersReady = pyqtSignal(object, object)  # 成员排行计算完成信号，携带 Future 和计分方式
+    
+    def __init__(self, analysis, membership, parent=None):
+        """
+        Args:
+            analysis: 主窗口的 AnalysisEngine
+            membership: 最近一次分析的群成员关系，没有时只显示成员排行
+        """
+        super().__init__(parent)
+        self.analysis = analysis
+        self.membership = membership
+        self.setWindowTitle("排行")
+        self.resize(900, 600)
+        
+        layout = QVBoxLayout(self)
+        header_layout = QHBoxLayout()
+        header_layout.addWidget(QLabel("计分方式"))
+        self.weighting_combo = QComboBox()
+        for label, weighting in self.WEIGHTINGS:
+            self.weighting_combo.addItem(label, weighting)
+        self.weighting_combo.currentIndexChanged.connect(self.refresh)
+        header_layout.addWidget(self.weighting_combo)
+        header_layout.addStretch()
+        layout.addLayout(header_layout)
+        
+        layout.addWidget(QLabel(f"所在群最多的前 {self.TOP_K} 个成员"))
+        self.member_table = QTableWidget()
+        self.member_table.setColumnCount(4)
+        self.member_table.setHorizontalHeaderLabels(["群成员", "所在群数", "分数", "所在群聊"])
+        self.member_table.setAlternatingRowColors(True)
+        layout.addWidget(self.member_table)
+        
+        layout.addWidget(QLabel(f"共同成员最多的前 {self.TOP_K} 对群"))
+        self.pair_table = QTableWidget()
+        self.pair_table.setColumnCount(5)
+        self.pair_table.setHorizontalHeaderLabels(["群聊A", "群聊B", "共同成员", "Jaccard", "分数"])
+        self.pair_table.setAlternatingRowColors(True)
+        layout.addWidget(self.pair_table)
+        
+        self.membersReady.connect(self.show_members)
+        self.refresh()
+        
+    def refresh(self):
+        """按当前的计分方式重新取前 K 名"""
+        weighting = self.weighting_combo.currentData()
+        # 成员排行排在已提交的分析之后执行，结果到达后再填表，不阻塞界面线程
+        future = self.analysis.top_members(self.TOP_K, weighting)
+        future.add_done_callback(lambda done: self.membersReady.emit(done, weighting))
+        
+        pairs = top_group_pairs(self.membership, self.TOP_K, weighting) if self.membership else []
+        self.pair_table.setRowCount(len(pairs))
+        for row, pair in enumerate(pairs):
+            self.pair_table.setItem(row, 0, QTableWidgetItem(pair["group_a"]))
+            self.pair_table.setItem(row, 1, QTableWidgetItem(pair["group_b"]))
+            self.pair_table.setItem(row, 2, QTableWidgetItem(str(pair["shared"])))
+            self.pair_table.setItem(row, 3, QTableWidgetItem(f"{pair['jaccard']:.3f}"))
+            self.pair_table.setItem(row, 4, QTableWidgetItem(f"{pair['score']:.3f}"))
+        self.pair_table.resizeColumnsToContents()
+        
+    def show_members(self, future, weighting):
+        """填写成员排行，计分方式已经切换时丢弃过期的结果"""
+        if weighting != self.weighting_combo.currentData():
+            return
+        try:
+            members = future.result()
+        except Exception as e:
+            logging.error(f"计算成员排行失败: {str(e)}")
+            return
+        self.member_table.setRowCount(len(members))
+        for row, (member, groups, score) in enumerate(members):
+            self.member_table.setItem(row, 0, QTableWidgetItem(member))
+            self.member_table.setItem(row, 1, QTableWidgetItem(str(len(groups))))
+            self.member_table.setItem(row, 2, QTableWidgetItem(f"{score:.3f}"))
+            self.member_table.setItem(row, 3, QTableWidgetItem(", ".join(groups)))
+        self.member_table.resizeColumnsToContents()
+
 class WorkerThread(QThread):
     """工作线程类，用于执行耗时操作"""
     progressChanged = pyqtSignal(int)  # 进度信号
+    groupAnalyzed = pyqtSignal(str, object)  # 单个群抓取完成信号，携带群标识和成员 ID
     finished = pyqtSignal(object)  # 完成信号，携带结果数据
     error = pyqtSignal(str)  # 错误信号
     
@@ -150,6 +439,8 @@ class WorkerThread(QThread):
         self.wechat = wechat
         self.kwargs = kwargs
         self._is_running = True
+        self.skipped_scrapes = 0  # 增量分析时复用缓存、未重新抓取的群数量
+        self.failed_groups = []  # 抓取出错的群，不影响其他群的结果
         
     def stop(self):
         """停止线程"""
@@ -203,18 +494,14 @@ class WorkerThread(QThread):
         """分析群聊的具体实现"""
         try:
             selected_groups = self.kwargs.get("selected_groups", [])
-            
-            # 确保微信窗口已初始化
-            if not self.wechat.find_wechat_window():
-                self.error.emit("请确保微信界面已经打开！")
-                return
+            group_counts = self.kwargs.get("group_counts", {})
+            incremental = self.kwargs.get("incremental", False)
+            self.skipped_scrapes = 0
+            self.failed_groups = []
+            window_ready = False
                 
-            if not self.wechat.activate_window():
-                self.error.emit("无法激活微信窗口，请确保微信界面已经打开！")
-                return
-                
-            # 获取所有选中群的成员
-            all_members = {}
+            # 获取所有选中群的成员，成员 ID 与缓存共用同一张驻留表
+            all_members = Membership(self.wechat.member_table)
             for i, group_name in enumerate(selected_groups):
                 if not self._is_running:
                     return
@@ -222,13 +509,57 @@ class WorkerThread(QThread):
                 progress = int((i + 1) * 100 / len(selected_groups))
                 self.progressChanged.emit(progress)
                 
-                members = self.wechat.get_group_members(group_name)
+                member_count = group_counts.get(group_name)
+                members = None
+                if incremental:
+                    # 成员数未变化且缓存未过期的群不再驱动微信界面
+                    members = self.wechat.get_fresh_cached_members(group_name, member_count)
+                    
+                if members:
+                    self.skipped_scrapes += 1
+                else:
+                    # 确保微信窗口已初始化，只在第一次真正抓取前执行
+                    if not window_ready:
+                        if not self.wechat.find_wechat_window():
+                            self.error.emit("请确保微信界面已经打开！")
+                            return
+                            
+                        if not self.wechat.activate_window():
+                            self.error.emit("无法激活微信窗口，请确保微信界面已经打开！")
+                            return
+                        window_ready = True
+                        
+                    try:
+                        members = self.wechat.get_group_members_with_cache(
+                            group_name, force_update=True, member_count=member_count
+                        )
+                    except Exception as e:
+                        # 单个群出错时跳过，已抓取的群仍然有效
+                        print(f"抓取群 {group_name} 失败: {e}")
+                        self.failed_groups.append(group_name)
+                        continue
+                    if members is None:
+                        if not self._is_running:
+                            return
+                        # get_group_members 自己处理了错误并返回 None，同样记为失败
+                        print(f"抓取群 {group_name} 失败")
+                        self.failed_groups.append(group_name)
+                        continue
                 if members:
-                    all_members[group_name] = members
+                    all_members.set_group(group_name, members)
+                    # 每抓完一个群立即交给界面，表格随抓取进度更新
+                    self.groupAnalyzed.emit(group_name, members)
                     
             if not self._is_running:
                 return
                 
+            if incremental:
+                print(f"增量分析: 跳过 {self.skipped_scrapes} 个未变化的群")
+                
+            # 有群重新抓取过时记录一个历史快照，用于查看成员变化
+            if len(all_members) > self.skipped_scrapes:
+                self.wechat.create_snapshot(f"分析 {len(all_members)} 个群")
+                
             if all_members:
                 self.finished.emit(all_members)
             else:
@@ -238,6 +569,8 @@ class WorkerThread(QThread):
             self.error.emit(f"分析失败：{str(e)}")
 
 class MainWindow(QMainWindow):
+    analysisUpdated = pyqtSignal(object, object)  # 后台分析完成信号，携带 Future 和结果到达后的回调
+    
     def __init__(self):
         logging.info("开始初始化 MainWindow...")
         try:
@@ -259,6 +592,14 @@ class MainWindow(QMainWindow):
             logging.info("初始化 WeChatController...")
             self.wechat = WeChatController()
             self.groups_data = {}
+            self.last_membership = None  # 最近一次分析的群成员关系，用于群重叠分析
+            # 跨多次分析保留的重复成员统计，只按群成员的变化更新；
+            # 统计在后台线程中进行，界面只接收不可变的 AnalysisResult
+            self.analysis = AnalysisEngine(self.wechat.member_table)
+            self.analysis_result = self.analysis.current().result()
+            self.analysisUpdated.connect(self.on_analysis_updated)
+            self.result_rows = {}  # 成员昵称 -> 结果表格中的行号
+            self.query_engine = None  # 基于缓存构建的成员查询，缓存变化后重建
             self.task_dialog = None
             self.worker_thread = None
             logging.info("基本变量初始化完成")
@@ -442,10 +783,7 @@ class MainWindow(QMainWindow):
             if cached_groups:
                 self.groups_data = {group["name"]: group for group in cached_groups}
                 for group in cached_groups:
-                    item = QListWidgetItem(group["name"])
-                    item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
-                    item.setCheckState(Qt.Unchecked)
-                    self.group_list.addItem(item)
+                    self.add_group_item(group)
                 # 更新初始群聊数量显示
                 self.group_count_label.setText(f"({len(cached_groups)}个群聊)")
             
@@ -462,9 +800,10 @@ class MainWindow(QMainWindow):
             # 扫描和分析按钮
             scan_button = QPushButton("更新群聊列表")
             analyze_button = QPushButton("分析重复成员")
+            history_button = QPushButton("查看成员变化")
             
             # 设置按钮样式
-            for button in [scan_button, analyze_button]:
+            for button in [scan_button, analyze_button, history_button]:
                 button.setStyleSheet("""
                     QPushButton {
                         background-color: #4A90E2;
@@ -490,8 +829,28 @@ class MainWindow(QMainWindow):
             self.progress_bar.setTextVisible(True)  # 显示进度文字
             self.progress_bar.setFormat("  %p%")  # 设置进度文字格式，添加空格使文字向右偏移
 
+            # 增量分析选项
+            incremental_container = QWidget()
+            incremental_layout = QHBoxLayout(incremental_container)
+            incremental_layout.setContentsMargins(0, 0, 0, 0)
+            self.incremental_checkbox = QCheckBox("增量分析")
+            self.incremental_checkbox.setChecked(True)
+            self.incremental_checkbox.setToolTip("成员数未变化且缓存未过期的群直接使用缓存，不再重新读取")
+            self.cache_ttl_spinbox = QSpinBox()
+            self.cache_ttl_spinbox.setRange(1, 24 * 30)
+            self.cache_ttl_spinbox.setValue(int(self.wechat.cache_ttl.total_seconds() // 3600))
+            self.cache_ttl_spinbox.setSuffix(" 小时")
+            self.cache_ttl_spinbox.setToolTip("缓存有效期")
+            self.cache_ttl_spinbox.valueChanged.connect(self.on_cache_ttl_changed)
+            incremental_layout.addWidget(self.incremental_checkbox)
+            incremental_layout.addStretch()
+            incremental_layout.addWidget(QLabel("有效期"))
+            incremental_layout.addWidget(self.cache_ttl_spinbox)
+
             button_layout.addWidget(scan_button)
             button_layout.addWidget(analyze_button)
+            button_layout.addWidget(history_button)
+            button_layout.addWidget(incremental_container)
             button_layout.addWidget(self.progress_bar)
 
             left_layout.addWidget(list_header)
@@ -520,26 +879,33 @@ class MainWindow(QMainWindow):
             result_label = QLabel("分析结果")
             export_button = QPushButton("导出结果")
             self.export_button = export_button  # 将按钮保存为类属性
-            self.export_button.setStyleSheet("""
-                QPushButton {
-                    background-color: #4A90E2;
-                    color: white;
-                    border: none;
-                    padding: 8px 15px;
-                    border-radius: 4px;
-                    font-size: 13px;
-                    min-width: 80px;
-                }
-                QPushButton:hover {
-                    background-color: #357ABD;
-                }
-                QPushButton:pressed {
-                    background-color: #2E6DA4;
-                }
-            """)
+            overlap_button = QPushButton("群重叠分析")
+            overlap_button.setToolTip("查看所分析的群两两之间的共同成员数和相似度")
+            ranking_button = QPushButton("排行")
+            ranking_button.setToolTip("查看所在群最多的成员和共同成员最多的群对")
+            for button in [self.export_button, overlap_button, ranking_button]:
+                button.setStyleSheet("""
+                    QPushButton {
+                        background-color: #4A90E2;
+                        color: white;
+                        border: none;
+                        padding: 8px 15px;
+                        border-radius: 4px;
+                        font-size: 13px;
+                        min-width: 80px;
+                    }
+                    QPushButton:hover {
+                        background-color: #357ABD;
+                    }
+                    QPushButton:pressed {
+                        background-color: #2E6DA4;
+                    }
+                """)
             
             title_layout.addWidget(result_label)
             title_layout.addStretch()  # 添加弹性空间
+            title_layout.addWidget(ranking_button)
+            title_layout.addWidget(overlap_button)
             title_layout.addWidget(self.export_button)
             
             self.result_table = QTableWidget()
@@ -555,7 +921,56 @@ class MainWindow(QMainWindow):
                 }
             """)
 
+            # 成员查询：在缓存的群成员上做集合运算
+            query_container = QWidget()
+            query_layout = QHBoxLayout(query_container)
+            query_layout.setContentsMargins(0, 0, 0, 0)
+            self.query_edit = QLineEdit()
+            self.query_edit.setPlaceholderText('成员查询，例如 "群A" & "群B" - "群C"、exactly(1, "家长群*")')
+            self.query_edit.setToolTip(
+                "运算符：& 交集，| 并集，- 差集，^ 对称差，支持括号\n"
+                "函数：any(...)、all(...)、exactly(n, ...)、atleast(n, ...)、atmost(n, ...)\n"
+                "群名含空格或运算符时加引号，* 匹配多个群"
+            )
+            self.query_edit.returnPressed.connect(self.run_member_query)
+            query_button = QPushButton("查询")
+            query_button.clicked.connect(self.run_member_query)
+            query_layout.addWidget(self.query_edit, 1)
+            query_layout.addWidget(query_button)
+
+            # 成员查找：输入昵称前缀即时查询缓存中的倒排索引
+            self.member_search_edit = QLineEdit()
+            self.member_search_edit.setPlaceholderText("查找成员所在的群，输入昵称或昵称开头")
+            self.member_search_edit.textChanged.connect(self.on_member_search_changed)
+            self.member_search_table = QTableWidget()
+            self.member_search_table.setColumnCount(2)
+            self.member_search_table.setHorizontalHeaderLabels(["群成员", "所在群聊"])
+            self.member_search_table.setMaximumHeight(180)
+            self.member_search_table.setVisible(False)
+
+            # 重复次数阈值：所在群数已经统计，拖动时只筛选，不重新分析
+            threshold_container = QWidget()
+            threshold_layout = QVBoxLayout(threshold_container)
+            threshold_layout.setContentsMargins(0, 0, 0, 0)
+            threshold_layout.setSpacing(4)
+            self.histogram_widget = GroupCountHistogram()
+            self.min_groups_slider = QSlider(Qt.Horizontal)
+            self.min_groups_slider.setRange(2, 2)
+            self.min_groups_slider.setValue(self.analysis_result.min_groups)
+            self.min_groups_slider.valueChanged.connect(self.on_min_groups_changed)
+            self.min_groups_label = QLabel()
+            slider_layout = QHBoxLayout()
+            slider_layout.addWidget(self.min_groups_label)
+            slider_layout.addWidget(self.min_groups_slider, 1)
+            threshold_layout.addWidget(self.histogram_widget)
+            threshold_layout.addLayout(slider_layout)
+            self.update_histogram(self.analysis_result)
+
             right_layout.addWidget(title_container)
+            right_layout.addWidget(query_container)
+            right_layout.addWidget(self.member_search_edit)
+            right_layout.addWidget(self.member_search_table)
+            right_layout.addWidget(threshold_container)
             right_layout.addWidget(self.result_table)
 
             # 添加左右面板到主布局
@@ -565,7 +980,10 @@ class MainWindow(QMainWindow):
             # 绑定按钮事件
             scan_button.clicked.connect(self.scan_groups)
             analyze_button.clicked.connect(self.analyze_selected_groups)
+            history_button.clicked.connect(self.show_snapshot_diff)
             export_button.clicked.connect(self.export_results)
+            overlap_button.clicked.connect(self.show_group_overlap)
+            ranking_button.clicked.connect(self.show_ranking)
             
             # 设置滚动条样式
             scroll_bar_style = """
@@ -655,12 +1073,10 @@ class MainWindow(QMainWindow):
             # 清空并更新群聊列表
             self.group_list.clear()
             self.groups_data = {group["name"]: group for group in groups}
+            self.query_engine = None
             
-            for display_name in self.groups_data.keys():
-                item = QListWidgetItem(display_name)
-                item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
-                item.setCheckState(Qt.Unchecked)
-                self.group_list.addItem(item)
+            for group in groups:
+                self.add_group_item(group)
             
             # 更新群聊数量显示
             self.group_count_label.setText(f"({len(groups)}个群聊)")
@@ -670,10 +1086,18 @@ class MainWindow(QMainWindow):
         self.progress_bar.setVisible(False)
         self.worker_thread = None
 
+    def add_group_item(self, group):
+        """向群聊列表添加一项，显示群名和成员数，按群标识查找"""
+        item = QListWidgetItem(format_group_label(group))
+        item.setData(Qt.UserRole, group["name"])
+        item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+        item.setCheckState(Qt.Unchecked)
+        self.group_list.addItem(item)
+
     def analyze_selected_groups(self):
         """分析选中的群聊"""
         selected_items = self.group_list.selectedItems()
-        selected_groups = [item.text() for item in selected_items]
+        selected_groups = [item.data(Qt.UserRole) for item in selected_items]
         
         if not selected_groups:
             QMessageBox.warning(self, "警告", "请先选择要分析的群聊！")
@@ -681,34 +1105,153 @@ class MainWindow(QMainWindow):
             
         # 显示任务执行窗口
         self.task_dialog = TaskPromptDialog(self)
+        self.task_dialog.stop_button.clicked.connect(self.on_analyze_stopped)
         self.task_dialog.show()
         
+        # 未选中的群从结果中移除，选中的群在抓取完成后逐个更新
+        self.submit_analysis(self.analysis.retain_groups(selected_groups))
+        self.last_membership = Membership(self.wechat.member_table)
+        
         # 创建并启动工作线程
-        self.worker_thread = WorkerThread("analyze_groups", self.wechat, selected_groups=selected_groups)
+        group_counts = {
+            name: self.groups_data[name]["member_count"]
+            for name in selected_groups if name in self.groups_data
+        }
+        self.worker_thread = WorkerThread(
+            "analyze_groups", self.wechat,
+            selected_groups=selected_groups,
+            group_counts=group_counts,
+            incremental=self.incremental_checkbox.isChecked()
+        )
+        self.worker_thread.groupAnalyzed.connect(self.on_group_analyzed)
         self.worker_thread.finished.connect(self.on_analyze_finished)
         self.worker_thread.error.connect(self.on_worker_error)
         self.worker_thread.start()
 
+    def on_group_analyzed(self, group_name, member_ids):
+        """一个群抓取完成后立即更新分析结果"""
+        self.last_membership.set_group(group_name, member_ids)
+        self.submit_analysis(self.analysis.set_group(group_name, member_ids))
+        self.query_engine = None
+
+    def on_analyze_stopped(self):
+        """分析中途停止时保留已抓取群的结果"""
+        analyzed = len(self.last_membership) if self.last_membership else 0
+        
+        def show_partial_results(result):
+            self.result_table.resizeColumnsToContents()
+            if analyzed:
+                QMessageBox.information(
+                    self, "提示",
+                    f"任务已终止，已显示 {analyzed} 个群的分析结果"
+                    f"（{result.common_count} 个重复成员），可以直接导出"
+                )
+        
+        # 等已抓取的群全部分析完再提示
+        self.submit_analysis(self.analysis.current(), show_partial_results)
+
     def on_analyze_finished(self, all_members):
         """处理分析完成的结果"""
         if self.task_dialog:
             self.task_dialog.close()
             
         if all_members:
-            # 分析重复成员
-            common_members = self.analyze_common_members(all_members)
+            self.last_membership = all_members
             
-            # 显示结果
-            self.show_analysis_results(common_members)
+            skipped_text = ""
+            if self.worker_thread and self.worker_thread.skipped_scrapes:
+                skipped_text = f"\n（{self.worker_thread.skipped_scrapes} 个群成员数未变化，已复用缓存）"
+            if self.worker_thread and self.worker_thread.failed_groups:
+                skipped_text += f"\n（{len(self.worker_thread.failed_groups)} 个群抓取失败：" \
+                                f"{', '.join(self.worker_thread.failed_groups)}）"
             
-            if not common_members:
-                QMessageBox.information(self, "提示", "未发现重复成员！")
-            else:
-                QMessageBox.information(self, "成功", f"分析完成，发现 {len(common_members)} 个重复成员！")
+            def show_summary(result):
+                self.result_table.resizeColumnsToContents()
+                if not result.common_count:
+                    QMessageBox.information(self, "提示", f"未发现重复成员！{skipped_text}")
+                else:
+                    QMessageBox.information(self, "成功", f"分析完成，发现 {result.common_count} 个重复成员！{skipped_text}")
+            
+            # 各群的结果已随抓取进度更新，这里只处理剩余的差异（例如未选中的群）
+            self.submit_analysis(self.analysis.update(all_members), show_summary)
         
         self.progress_bar.setVisible(False)
         self.worker_thread = None
 
+    def show_snapshot_diff(self):
+        """显示两次分析之间的成员变化"""
+        snapshots = self.wechat.list_snapshots()
+        if len(snapshots) < 2:
+            QMessageBox.information(self, "提示", "至少需要两次分析记录才能查看成员变化！")
+            return
+        dialog = SnapshotDiffDialog(self.wechat, snapshots, self)
+        dialog.exec_()
+
+    def show_group_overlap(self):
+        """显示最近一次分析的群两两重叠情况"""
+        if not self.last_membership or len(self.last_membership) < 2:
+            QMessageBox.information(self, "提示", "请先分析至少两个群聊！")
+            return
+        overlap = compute_group_overlap(self.last_membership)
+        dialog = GroupOverlapDialog(overlap, self)
+        dialog.exec_()
+
+    def show_ranking(self):
+        """显示重复成员和群对的前 K 名"""
+        if not self.analysis_result.common_count and not self.last_membership:
+            QMessageBox.information(self, "提示", "请先分析群聊！")
+            return
+        dialog = RankingDialog(self.analysis, self.last_membership, self)
+        dialog.exec_()
+
+    def run_member_query(self):
+        """在缓存的群成员上执行查询表达式"""
+        expression = self.query_edit.text().strip()
+        if not expression:
+            return
+        try:
+            if self.query_engine is None:
+                self.query_engine = MembershipQuery(self.wechat.load_cached_membership())
+            bits, group_ids = self.query_engine.evaluate(expression)
+        except ValueError as e:
+            QMessageBox.warning(self, "查询失败", str(e))
+            return
+            
+        member_ids = self.query_engine.to_ids(bits)
+        member_names = self.query_engine.membership.members.strings
+        limit = QueryResultDialog.MAX_ROWS
+        member_rows = [
+            (member_names[member_id], self.query_engine.groups_of(member_id, group_ids) if i < limit else [])
+            for i, member_id in enumerate(member_ids)
+        ]
+        dialog = QueryResultDialog(expression, member_rows, self)
+        dialog.exec_()
+
+    def on_member_search_changed(self, text):
+        """输入时查询成员所在的群，精确匹配的成员排在最前"""
+        prefix = text.strip()
+        if not prefix:
+            self.member_search_table.setVisible(False)
+            return
+        results = self.wechat.search_members(prefix, limit=20)
+        exact = [result for result in results if result["name"] == prefix]
+        results = exact + [result for result in results if result["name"] != prefix]
+        
+        self.member_search_table.setRowCount(len(results))
+        for row, result in enumerate(results):
+            labels = [
+                format_group_label(self.groups_data[name]) if name in self.groups_data else name
+                for name in result["groups"]
+            ]
+            self.member_search_table.setItem(row, 0, QTableWidgetItem(result["name"]))
+            self.member_search_table.setItem(row, 1, QTableWidgetItem(", ".join(labels)))
+        self.member_search_table.resizeColumnsToContents()
+        self.member_search_table.setVisible(True)
+
+    def on_cache_ttl_changed(self, hours):
+        """修改增量分析的缓存有效期"""
+        self.wechat.cache_ttl = timedelta(hours=hours)
+
     def on_worker_error(self, error_message):
         """处理工作线程的错误"""
         if self.task_dialog:
@@ -717,48 +1260,88 @@ class MainWindow(QMainWindow):
         self.progress_bar.setVisible(False)
         self.worker_thread = None
 
-    def analyze_common_members(self, groups_data):
-        """分析重复成员"""
-        member_groups = {}
+    def submit_analysis(self, future, callback=None):
+        """
+        等待后台分析的结果，到达后在界面线程中更新表格
         
-        # 统计每个成员在哪些群中
-        for group_name, members in groups_data.items():
-            for member_name, member_info in members.items():
-                if member_name not in member_groups:
-                    member_groups[member_name] = {
-                        "groups": set()
-                    }
-                member_groups[member_name]["groups"].add(group_name)
-        
-        # 筛选出现在多个群的成员
-        return {
-            name: info for name, info in member_groups.items()
-            if len(info["groups"]) >= 2
-        }
+        Args:
+            future: AnalysisEngine 返回的 Future
+            callback: 表格更新后以 AnalysisResult 调用
+        """
+        # 回调在分析线程中执行，通过信号转到界面线程
+        future.add_done_callback(lambda done: self.analysisUpdated.emit(done, callback))
 
-    def show_analysis_results(self, common_members):
-        """显示分析结果"""
-        # 清空表格
-        self.result_table.setRowCount(0)
-        
-        # 设置表格列数
-        self.result_table.setColumnCount(3)
-        self.result_table.setHorizontalHeaderLabels(["群成员", "重复出现次数", "所在群聊"])
-        
-        # 添加结果到表格
-        total_members = len(common_members)
-        
-        for row, (member, info) in enumerate(common_members.items()):
-            groups = list(info["groups"])  # 转换set为list
-            self.result_table.insertRow(row)
-            self.result_table.setItem(row, 0, QTableWidgetItem(member))
-            self.result_table.setItem(row, 1, QTableWidgetItem(str(len(groups))))
-            self.result_table.setItem(row, 2, QTableWidgetItem(", ".join(groups)))
-        
-        # 调整列宽
-        self.result_table.resizeColumnsToContents()
+    def on_analysis_updated(self, future, callback):
+        """应用一次后台分析的结果"""
+        try:
+            result = future.result()
+        except Exception as e:
+            logging.error(f"分析失败: {str(e)}")
+            QMessageBox.critical(self, "错误", f"分析失败：{str(e)}")
+            return
+        self.analysis_result = result
+        self.update_analysis_results(result)
+        if callback:
+            callback(result)
+
+    def update_histogram(self, result):
+        """刷新所在群数分布和阈值滑块的范围"""
+        self.min_groups_slider.blockSignals(True)
+        self.min_groups_slider.setMaximum(max(2, len(result.histogram) - 1, result.min_groups))
+        self.min_groups_slider.blockSignals(False)
+        self.histogram_widget.set_data(list(result.histogram), result.min_groups)
+        self.min_groups_label.setText(
+            f"已分析 {result.group_count} 个群，至少出现在 {result.min_groups} 个群：{result.common_count} 人"
+        )
+
+    def on_min_groups_changed(self, min_groups):
+        """拖动阈值滑块时在已统计的结果上重新筛选"""
+        self.submit_analysis(self.analysis.set_min_groups(min_groups))
+
+    def set_result_row(self, row, member, groups):
+        """填写结果表格中的一行"""
+        self.result_table.setItem(row, 0, QTableWidgetItem(member))
+        self.result_table.setItem(row, 1, QTableWidgetItem(str(len(groups))))
+        self.result_table.setItem(row, 2, QTableWidgetItem(", ".join(groups)))
+
+    def prepare_result_table(self):
+        """设置结果表格的列"""
+        if self.result_table.columnCount() != 3:
+            self.result_table.setColumnCount(3)
+            self.result_table.setHorizontalHeaderLabels(["群成员", "重复出现次数", "所在群聊"])
+
+    def update_analysis_results(self, result):
+        """只更新结果有变化的成员所在的行"""
+        self.prepare_result_table()
+        self.result_table.setUpdatesEnabled(False)
+        for member, groups in result.rows.items():
+            row = self.result_rows.get(member)
+            if groups is None:
+                if row is None:
+                    continue
+                # 用最后一行填补被删除的行，其他行的行号不变
+                last_row = self.result_table.rowCount() - 1
+                if row != last_row:
+                    moved = self.result_table.item(last_row, 0).text()
+                    for column in range(self.result_table.columnCount()):
+                        self.result_table.setItem(row, column, self.result_table.takeItem(last_row, column))
+                    self.result_rows[moved] = row
+                self.result_table.removeRow(last_row)
+                del self.result_rows[member]
+            else:
+                if row is None:
+                    row = self.result_table.rowCount()
+                    self.result_table.insertRow(row)
+                    self.result_rows[member] = row
+                self.set_result_row(row, member, groups)
+        self.result_table.setUpdatesEnabled(True)
         
-        # 设置导出按钮状态
+        if self.result_rows:
+            self.enable_export_button()
+        self.update_histogram(result)
+
+    def enable_export_button(self):
+        """设置导出按钮状态"""
         self.export_button.setEnabled(True)
         self.export_button.setStyleSheet("""
             QPushButton {
@@ -838,6 +1421,11 @@ class MainWindow(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, "错误", f"导出失败：{str(e)}")
 
+    def closeEvent(self, event):
+        """关闭窗口时停止后台分析线程"""
+        self.analysis.shutdown()
+        super().closeEvent(event)
+
     def eventFilter(self, source, event):
         """事件过滤器，处理列表项的点击事件"""
         if (source is self.group_list.viewport() and
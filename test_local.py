@@ -130,6 +130,564 @@ def test_wechat():
         logging.error(f"微信控制功能测试失败: {str(e)}")
         return False
 
+def test_waits():
+    """用模拟的界面树测试条件等待：结果与固定等待一致，耗时更短"""
+    try:
+        logging.info("测试条件等待...")
+        # 确保src目录在Python路径中
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        src_dir = os.path.join(current_dir, 'src')
+        if src_dir not in sys.path:
+            sys.path.insert(0, src_dir)
+            
+        import time
+        from core.waits import wait_for_change, wait_until, wait_until_stable
+        
+        class SimulatedItem:
+            def __init__(self, name):
+                self.Name = name
+                
+        class SimulatedList:
+            """每屏显示 10 项，滚动和首次显示都在 latency 秒后才生效"""
+            def __init__(self, names, latency):
+                self.names = names
+                self.latency = latency
+                self.top = 0
+                self.pending = (time.monotonic() + latency, 0)
+                
+            def _settle(self):
+                if self.pending and time.monotonic() >= self.pending[0]:
+                    self.top = self.pending[1]
+                    self.pending = None
+                    
+            def Exists(self):
+                self._settle()
+                return self.pending is None
+                
+            def GetChildren(self):
+                self._settle()
+                return [SimulatedItem(name) for name in self.names[self.top:self.top + 10]]
+                
+            def scroll(self):
+                target = min(self.top + 10, max(0, len(self.names) - 10))
+                self.pending = (time.monotonic() + self.latency, target)
+        
+        def visible(list_control):
+            return [child.Name for child in list_control.GetChildren()]
+        
+        def collect(list_control, wait_scroll):
+            """与 get_group_list 相同的滚动收集：连续 2 次没有新增时结束"""
+            found = []
+            for name in visible(list_control):
+                if name not in found:
+                    found.append(name)
+            no_change = 0
+            while no_change < 2:
+                before = visible(list_control)
+                list_control.scroll()
+                wait_scroll(list_control, before)
+                new_names = [name for name in visible(list_control) if name not in found]
+                found.extend(new_names)
+                no_change = 0 if new_names else no_change + 1
+            return found
+        
+        names = [f"测试群{i}" for i in range(45)]
+        latency = 0.03
+        
+        # 旧做法：每一步固定等待 0.2 秒
+        fixed_list = SimulatedList(names, latency)
+        start = time.monotonic()
+        time.sleep(0.2)
+        fixed_result = collect(fixed_list, lambda list_control, before: time.sleep(0.2))
+        fixed_elapsed = time.monotonic() - start
+        
+        # 条件等待：控件出现或内容变化后立即继续
+        wait_list = SimulatedList(names, latency)
+        start = time.monotonic()
+        if not wait_until(wait_list.Exists, timeout=1):
+            logging.error("等待列表出现超时")
+            return False
+        wait_result = collect(wait_list, lambda list_control, before: wait_for_change(
+            lambda: visible(list_control), timeout=0.2, initial=before))
+        wait_elapsed = time.monotonic() - start
+        logging.info(f"固定等待 {fixed_elapsed:.2f} 秒，条件等待 {wait_elapsed:.2f} 秒")
+        
+        if wait_result != names or fixed_result != names:
+            logging.error("条件等待收集到的结果与预期不一致")
+            return False
+        if wait_elapsed >= fixed_elapsed:
+            logging.error("条件等待没有比固定等待更快")
+            return False
+        
+        # 超时、终止和稳定等待
+        start = time.monotonic()
+        if wait_until(lambda: False, timeout=0.1) is not None or time.monotonic() - start > 0.5:
+            logging.error("超时处理不正确")
+            return False
+        if wait_until(lambda: False, timeout=5, should_stop=lambda: True) is not None:
+            logging.error("终止处理不正确")
+            return False
+        counter = iter(range(1, 1000))
+        if wait_until_stable(lambda: min(next(counter), 5), timeout=2, settle=0.1) != 5:
+            logging.error("稳定等待结果不正确")
+            return False
+        return True
+    except Exception as e:
+        logging.error(f"条件等待测试失败: {str(e)}")
+        return False
+
+def test_fake_wechat():
+    """在模拟的微信界面上端到端地抓取群聊列表和群成员"""
+    try:
+        logging.info("测试模拟微信界面上的抓取...")
+        # 确保src目录在Python路径中
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        src_dir = os.path.join(current_dir, 'src')
+        if src_dir not in sys.path:
+            sys.path.insert(0, src_dir)
+            
+        import tempfile
+        from core.fake_driver import FakeDriver, synthetic_account
+        from core.wechat import WeChatController
+        
+        account = synthetic_account(300, seed=1)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            controller = WeChatController(driver=FakeDriver(account), cache_dir=cache_dir)
+            groups = controller.get_group_list(use_cache=False)
+            found = sorted((group["title"], int(group["member_count"])) for group in groups or [])
+            if found != sorted((title, len(members)) for title, members in account.items()):
+                logging.error("群聊列表与模拟账号不一致")
+                return False
+            
+            # 包括需要滚动成员列表的大群；再次抓取第一个群时它已在会话列表中，
+            # 并且打开的是另一个群的聊天
+            largest = max(groups, key=lambda group: int(group["member_count"]))
+            for group in [groups[0], largest, groups[0]]:
+                member_ids = controller.get_group_members(group["name"])
+                names = set(controller.member_table.lookup(member_ids)) if member_ids else set()
+                if names != set(account[group["title"]]):
+                    logging.error(f"群 {group['title']} 的成员不一致")
+                    return False
+            controller.store.close()
+
+        # 逐个读取控件时结果相同，但跨进程往返多得多
+        bulk_calls = controller.driver.calls["get_children"]
+        with tempfile.TemporaryDirectory() as cache_dir:
+            driver = FakeDriver(account)
+            controller = WeChatController(driver=driver, cache_dir=cache_dir, bulk_fetch=False)
+            single_groups = controller.get_group_list(use_cache=False)
+            controller.store.close()
+        if sorted(group["title"] for group in single_groups) != sorted(group["title"] for group in groups):
+            logging.error("逐个读取控件时群聊列表不一致")
+            return False
+        if driver.calls["get_children"] <= bulk_calls:
+            logging.error("批量读取没有减少读取子控件的次数")
+            return False
+        return True
+    except Exception as e:
+        logging.error(f"模拟微信界面抓取测试失败: {str(e)}")
+        return False
+
+def test_recording():
+    """录制模拟微信界面的界面树，回放时收集到的群和成员与实时抓取一致"""
+    try:
+        logging.info("测试界面录制和回放...")
+        # 确保src目录在Python路径中
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        src_dir = os.path.join(current_dir, 'src')
+        if src_dir not in sys.path:
+            sys.path.insert(0, src_dir)
+            
+        import glob
+        import tempfile
+        from core.fake_driver import FakeDriver, synthetic_account
+        from core.driver import LIST, TEXT, Rect, UIDriver
+        from core.recording import ReplayDriver, TreeRecorder, load_recording
+        from core.wechat import WeChatController
+        
+        account = synthetic_account(100, seed=2)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            record_dir = os.path.join(cache_dir, "recordings")
+            controller = WeChatController(driver=FakeDriver(account), cache_dir=cache_dir)
+            controller.enable_debug_mode(record_dir)
+            groups = controller.get_group_list(use_cache=False)
+            largest = max(groups, key=lambda group: int(group["member_count"]))
+            member_ids = controller.get_group_members(largest["name"])
+            controller.store.close()
+            
+            replay_controller = WeChatController(driver=ReplayDriver(), cache_dir=os.path.join(cache_dir, "replay"))
+            paths = glob.glob(os.path.join(record_dir, "*.json.gz"))
+            if len(paths) != 2:
+                logging.error(f"应录制 2 个文件，实际 {len(paths)} 个")
+                return False
+            for path in paths:
+                recording = load_recording(path)
+                if recording.kind == "group_list":
+                    found = {}
+                    for frame in recording.frames:
+                        replay_controller.collect_group_items(frame, found)
+                    if len(found) != len(groups):
+                        logging.error(f"回放群聊列表得到 {len(found)} 个群，实时抓取 {len(groups)} 个")
+                        return False
+                else:
+                    members = set()
+                    for frame in recording.frames:
+                        replay_controller.collect_member_panel(frame, members)
+                    if members != set(controller.member_table.lookup(member_ids)):
+                        logging.error("回放成员面板得到的成员与实时抓取不一致")
+                        return False
+            replay_controller.store.close()
+            
+            # 录制时消失的控件记为没有名称的空控件，不能借用其他控件的名称
+            class VanishingDriver(UIDriver):
+                """控件是 (类型, 名称, 子控件) 元组，名称为 "消失的控件" 的读取位置时失败"""
+                def get_name(self, element):
+                    return element[1]
+                
+                def get_control_type(self, element):
+                    return element[0]
+                
+                def get_children(self, element):
+                    return element[2]
+                
+                def get_rect(self, element):
+                    if element[1] == "消失的控件":
+                        raise RuntimeError("控件已不存在")
+                    return Rect(0, 0, 100, 100)
+            
+            root = (LIST, "群聊", [(TEXT, "消失的控件", [])])
+            recorder = TreeRecorder(VanishingDriver(), record_dir)
+            recorder.begin("group_list", "消失的控件")
+            recorder.capture(root)
+            frame = load_recording(recorder.end()).frames[0]
+            if [child.name for child in frame.children] != [""]:
+                logging.error(f"消失的控件录制成了 {[child.name for child in frame.children]}")
+                return False
+        return True
+    except Exception as e:
+        logging.error(f"界面录制和回放测试失败: {str(e)}")
+        return False
+
+def test_group_keys():
+    """群标识在群名变化、成员数变化和群名带 "#" 时都不重复"""
+    try:
+        logging.info("测试群标识分配...")
+        # 确保src目录在Python路径中
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        src_dir = os.path.join(current_dir, 'src')
+        if src_dir not in sys.path:
+            sys.path.insert(0, src_dir)
+            
+        from core.groups import assign_group_keys, rekey_legacy_groups
+        
+        # 群名 "A#2" 与第二个 "A" 群的序号标识相同
+        scanned = [("A", "10"), ("A", "20"), ("A#2", "5")]
+        groups = assign_group_keys(scanned, [])
+        keys = [group["name"] for group in groups]
+        if len(set(keys)) != len(keys) or keys[2] != "A#2":
+            logging.error(f"群标识重复: {keys}")
+            return False
+        
+        # 重新扫描时成员数有变化、顺序不同，仍然沿用上次的标识
+        rescanned = [("A#2", "6"), ("A", "21"), ("A", "11")]
+        again = {(group["title"], group["member_count"]): group["name"]
+                 for group in assign_group_keys(rescanned, groups)}
+        if again != {("A#2", "6"): "A#2", ("A", "21"): keys[1], ("A", "11"): keys[0]}:
+            logging.error(f"重新扫描后群标识变化: {again}")
+            return False
+        
+        mapping = rekey_legacy_groups([
+            {"name": "A(10)", "member_count": "10"},
+            {"name": "A(20)", "member_count": "20"},
+            {"name": "A#2(5)", "member_count": "5"},
+        ])
+        new_keys = [new["name"] for new in mapping.values()]
+        if len(set(new_keys)) != 3:
+            logging.error(f"旧版群标识转换后重复: {mapping}")
+            return False
+        return True
+    except Exception as e:
+        logging.error(f"群标识分配测试失败: {str(e)}")
+        return False
+
+def test_store_migration():
+    """旧版 JSON 缓存的两种格式都能导入，旧版数据库重新打开时依次执行表结构升级"""
+    try:
+        logging.info("测试缓存迁移...")
+        # 确保src目录在Python路径中
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        src_dir = os.path.join(current_dir, 'src')
+        if src_dir not in sys.path:
+            sys.path.insert(0, src_dir)
+            
+        import itertools
+        import json
+        import sqlite3
+        import tempfile
+        from core.store import MIGRATIONS, MembershipStore, open_store
+        
+        # 旧版缓存中的成员是 {昵称: 成员信息}
+        groups = {
+            "家长群(3)": {"name": "家长群", "member_count": "3", "last_update": "2024-01-01T00:00:00",
+                          "members": {name: {"name": name} for name in ["张三", "李四", "王五"]}},
+            "家长群(2)": {"name": "家长群", "member_count": "2", "last_update": "2024-01-01T00:00:00",
+                          "members": {name: {"name": name} for name in ["张三", "赵六"]}},
+            "同学群(40)": {"name": "同学群", "member_count": "40"},
+        }
+        layouts = {
+            "启动时保存的格式": {"last_update": "2024-01-02T00:00:00", "groups": groups},
+            # 旧版抓取成员后直接保存了 groups 这一层
+            "抓取成员后保存的格式": groups,
+        }
+        for (layout, cache_data), mode in itertools.product(layouts.items(), ("sqlite", "journal")):
+            with tempfile.TemporaryDirectory() as cache_dir:
+                json_path = os.path.join(cache_dir, "wechat_groups_cache.json")
+                with open(json_path, "w", encoding="utf-8") as f:
+                    json.dump(cache_data, f, ensure_ascii=False)
+                store = open_store(cache_dir, mode)
+                if not store.migrate_legacy_json(json_path) or (mode == "sqlite" and not store.get_meta("legacy_migrated")):
+                    logging.error(f"{layout}的旧缓存没有导入 {mode}")
+                    return False
+                migrated = {group["name"]: group["title"] for group in store.list_groups()}
+                if migrated != {"家长群": "家长群", "家长群#2": "家长群", "同学群": "同学群"}:
+                    logging.error(f"{layout}导入 {mode} 的群聊不正确: {migrated}")
+                    return False
+                members = {name: sorted(store.get_group_members(name) or []) for name in migrated}
+                if members != {"家长群": ["张三", "李四", "王五"], "家长群#2": ["张三", "赵六"], "同学群": []}:
+                    logging.error(f"{layout}导入 {mode} 的成员不正确: {members}")
+                    return False
+                store.close()
+        
+        # 没有读到任何群时不记录已迁移
+        with tempfile.TemporaryDirectory() as cache_dir:
+            json_path = os.path.join(cache_dir, "wechat_groups_cache.json")
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump({"last_update": None, "groups": {}}, f)
+            store = MembershipStore(os.path.join(cache_dir, "wechat_groups.db"))
+            if store.migrate_legacy_json(json_path) or store.get_meta("legacy_migrated"):
+                logging.error("空的旧缓存被记录为已迁移")
+                return False
+            store.close()
+        
+        # 最早版本的数据库：群标识为 "群名(成员数)"，没有成员集合和 MinHash 签名
+        with tempfile.TemporaryDirectory() as cache_dir:
+            db_path = os.path.join(cache_dir, "wechat_groups.db")
+            conn = sqlite3.connect(db_path)
+            conn.executescript("""
+                CREATE TABLE groups (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE,
+                                     member_count TEXT, last_update TEXT, members_update TEXT);
+                CREATE TABLE members (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+                CREATE TABLE memberships (group_id INTEGER NOT NULL, member_id INTEGER NOT NULL,
+                                          PRIMARY KEY (group_id, member_id)) WITHOUT ROWID;
+                CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+                INSERT INTO groups VALUES (1, '家长群(3)', '3', '2024-01-01', '2024-01-01');
+                INSERT INTO groups VALUES (2, '家长群(2)', '2', '2024-01-01', '2024-01-01');
+                INSERT INTO groups VALUES (3, '同学群(40)', '40', '2024-01-01', NULL);
+                INSERT INTO members VALUES (0, '张三'), (1, '李四'), (2, '王五'), (3, '赵六');
+                INSERT INTO memberships VALUES (1, 0), (1, 1), (1, 2), (2, 0), (2, 3);
+            """)
+            conn.commit()
+            conn.close()
+            
+            store = MembershipStore(db_path)
+            version = store.conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != len(MIGRATIONS):
+                logging.error(f"表结构升级没有执行完: {version}/{len(MIGRATIONS)}")
+                return False
+            members = {group["name"]: sorted(store.get_group_members(group["name"]) or [])
+                       for group in store.list_groups()}
+            if members != {"家长群": ["张三", "李四", "王五"], "家长群#2": ["张三", "赵六"], "同学群": []}:
+                logging.error(f"升级后的群和成员不正确: {members}")
+                return False
+            if set(store.get_group_sketches()) != {"家长群", "家长群#2"}:
+                logging.error("升级后没有生成 MinHash 签名")
+                return False
+            store.close()
+            
+            # 再次打开时不重复执行升级
+            store = MembershipStore(db_path)
+            if len(store.list_groups()) != 3:
+                logging.error("再次打开升级后的数据库时群聊数不正确")
+                return False
+            store.close()
+        return True
+    except Exception as e:
+        logging.error(f"缓存迁移测试失败: {str(e)}")
+        return False
+
+def test_store_rollback():
+    """写入群成员的事务回滚后，新昵称在下次写入时重新保存"""
+    try:
+        logging.info("测试缓存写入回滚...")
+        # 确保src目录在Python路径中
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        src_dir = os.path.join(current_dir, 'src')
+        if src_dir not in sys.path:
+            sys.path.insert(0, src_dir)
+            
+        import tempfile
+        from unittest import mock
+        from core import store as store_module
+        from core.store import MembershipStore
+        
+        with tempfile.TemporaryDirectory() as cache_dir:
+            store = MembershipStore(os.path.join(cache_dir, "wechat_groups.db"))
+            member_ids = store.member_table.intern_many(["张三", "李四"])
+            # 事务中途出错，整个事务回滚
+            with mock.patch.object(store_module, "_intern_member_set", side_effect=RuntimeError("模拟写入失败")):
+                try:
+                    store.save_group_members("家长群", member_ids)
+                except RuntimeError:
+                    pass
+            store.save_group_members("家长群", member_ids)
+            if sorted(store.get_group_members("家长群") or []) != ["张三", "李四"]:
+                logging.error("事务回滚后再次写入的成员不正确")
+                return False
+            store.close()
+        return True
+    except Exception as e:
+        logging.error(f"缓存写入回滚测试失败: {str(e)}")
+        return False
+
+def test_journal_store():
+    """日志模式缓存：不完整的日志尾部被截掉，合并快照后重新打开数据不变"""
+    try:
+        logging.info("测试日志模式缓存...")
+        # 确保src目录在Python路径中
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        src_dir = os.path.join(current_dir, 'src')
+        if src_dir not in sys.path:
+            sys.path.insert(0, src_dir)
+            
+        import tempfile
+        from core.journal import JournalStore
+        
+        groups = {
+            "家长群": ["张三", "李四", "王五"],
+            "同学群": ["张三", "赵六"],
+            "同事群": ["钱七", "孙八", "李四"],
+        }
+        with tempfile.TemporaryDirectory() as cache_dir:
+            store = JournalStore(cache_dir)
+            store.replace_groups([{"name": name, "member_count": len(members)} for name, members in groups.items()])
+            for name, members in groups.items():
+                store.save_group_members(name, store.member_table.intern_many(members))
+            # 模拟写最后一条记录时异常退出：不合并日志，截掉最后几个字节
+            store.journal.close()
+            journal_size = os.path.getsize(store.journal_file)
+            with open(store.journal_file, "r+b") as f:
+                f.truncate(journal_size - 5)
+            
+            store = JournalStore(cache_dir)
+            if store.get_group_members("同事群") is not None:
+                logging.error("不完整的日志记录没有被跳过")
+                return False
+            if sorted(store.get_group_members("同学群") or []) != sorted(groups["同学群"]):
+                logging.error("不完整的记录之前的日志没有重放")
+                return False
+            if os.path.getsize(store.journal_file) >= journal_size - 5:
+                logging.error("不完整的日志尾部没有被截掉")
+                return False
+            # 截掉尾部之后追加的记录能正常重放
+            store.save_group_members("同事群", store.member_table.intern_many(groups["同事群"]))
+            store.journal.close()
+            
+            store = JournalStore(cache_dir)
+            if {name: sorted(store.get_group_members(name) or []) for name in groups} != \
+                    {name: sorted(members) for name, members in groups.items()}:
+                logging.error("截掉日志尾部后追加的记录没有重放")
+                return False
+            
+            # 合并后成员列表不留在内存中，重新打开时从快照读取
+            store.compact()
+            if any("members" in group for group in store.groups.values()):
+                logging.error("合并快照后成员列表仍在内存中")
+                return False
+            if store.find_member_groups("李四") != ["同事群", "家长群"]:
+                logging.error(f"合并快照后成员索引不正确: {store.find_member_groups('李四')}")
+                return False
+            store.close()
+            
+            store = JournalStore(cache_dir)
+            if store.journal_records != 0:
+                logging.error("合并快照后日志没有清空")
+                return False
+            if {name: sorted(store.get_group_members(name) or []) for name in groups} != \
+                    {name: sorted(members) for name, members in groups.items()}:
+                logging.error("合并快照后重新打开的成员不正确")
+                return False
+            if store.find_member_groups("张三") != ["同学群", "家长群"]:
+                logging.error("重新打开后成员索引不正确")
+                return False
+            store.close()
+        return True
+    except Exception as e:
+        logging.error(f"日志模式缓存测试失败: {str(e)}")
+        return False
+
+def test_membership_query():
+    """成员集合查询：运算符优先级、带引号和连字符的群名、找不到群时报错"""
+    try:
+        logging.info("测试成员集合查询...")
+        # 确保src目录在Python路径中
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        src_dir = os.path.join(current_dir, 'src')
+        if src_dir not in sys.path:
+            sys.path.insert(0, src_dir)
+            
+        from core.analyzer import MembershipQuery
+        from core.membership import Membership
+        
+        groups = {
+            "A": {"张三", "李四", "王五", "赵六"},
+            "B": {"李四", "王五", "钱七"},
+            "C": {"王五", "钱七", "孙八"},
+            "家长-一班": {"张三", "孙八"},
+            "家长群 2": {"李四", "周九"},
+        }
+        query = MembershipQuery(Membership.from_dict({name: sorted(members) for name, members in groups.items()}))
+        A, B, C = groups["A"], groups["B"], groups["C"]
+        cases = [
+            # 优先级从高到低为 - & ^ |
+            ("A | B & C", A | (B & C)),
+            ("A & B | C", (A & B) | C),
+            ("A - B & C", (A - B) & C),
+            ("A & B - C", A & (B - C)),
+            ("A ^ B | C", (A ^ B) | C),
+            ("A | B ^ C", A | (B ^ C)),
+            ("A & B ^ C", (A & B) ^ C),
+            ("A - B - C", A - B - C),
+            ("(A | B) & C", (A | B) & C),
+            ("A - (B - C)", A - (B - C)),
+            # 群名含连字符或空格时加引号
+            ('"家长-一班" & A', groups["家长-一班"] & A),
+            ("'家长群 2' | C", groups["家长群 2"] | C),
+            ("“家长-一班” - A", groups["家长-一班"] - A),
+            ('"家长*" & A', (groups["家长-一班"] | groups["家长群 2"]) & A),
+            ("exactly(1, A, B, C)", {m for m in A | B | C if (m in A) + (m in B) + (m in C) == 1}),
+            ("atleast(2, A, B, C)", {m for m in A | B | C if (m in A) + (m in B) + (m in C) >= 2}),
+            ("all(A, B) - C", (A & B) - C),
+        ]
+        for expression, expected in cases:
+            result = set(query.query_names(expression))
+            if result != expected:
+                logging.error(f"查询 {expression} 的结果不正确: {sorted(result)}，应为 {sorted(expected)}")
+                return False
+        
+        # 不加引号时连字符是差集运算符，"家长" 群不存在
+        errors = ["家长-一班", "不存在的群", "A & 不存在的群", "A &", "(A | B", "A B", "", "exactly(x, A)"]
+        for expression in errors:
+            try:
+                query.query(expression)
+            except ValueError:
+                continue
+            logging.error(f"查询 {expression!r} 应该报错")
+            return False
+        return True
+    except Exception as e:
+        logging.error(f"成员集合查询测试失败: {str(e)}")
+        return False
+
 def main():
     """主测试函数"""
     log_file = setup_test_env()
@@ -139,7 +697,15 @@ def main():
         ("导入测试", test_imports),
         ("许可证测试", test_license),
         ("UI测试", test_ui),
-        ("微信控制测试", test_wechat)
+        ("微信控制测试", test_wechat),
+        ("群标识测试", test_group_keys),
+        ("缓存迁移测试", test_store_migration),
+        ("缓存写入回滚测试", test_store_rollback),
+        ("日志模式缓存测试", test_journal_store),
+        ("成员集合查询测试", test_membership_query),
+        ("条件等待测试", test_waits),
+        ("模拟微信抓取测试", test_fake_wechat),
+        ("界面录制回放测试", test_recording)
     ]
     
     all_passed = True
@@ -0,0 +1,47 @@
+import contextlib
+import io
+import tempfile
+import time
+
+from bench_common import NO_LATENCY
+
+from core.fake_driver import FakeDriver, synthetic_account
+from core.wechat import WeChatController
+
+
+def run(account, bulk_fetch, call_latency, member_groups):
+    """抓取群聊列表和几个群的成员，返回 (群聊列表, 成员, 驱动, 耗时)"""
+    driver = FakeDriver(account, dict(NO_LATENCY, call=call_latency))
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), tempfile.TemporaryDirectory() as cache_dir:
+        controller = WeChatController(driver=driver, cache_dir=cache_dir, bulk_fetch=bulk_fetch)
+        groups = controller.get_group_list(use_cache=False)
+        members = {title: set(controller.get_group_members(title)) for title in member_groups}
+        controller.store.close()
+    return groups, members, driver, time.perf_counter() - start
+
+
+def main(group_count=1000, member_group_count=5, call_latency=0.00005):
+    """
+    比较逐个读取控件和批量读取子树时的跨进程往返次数
+
+    Args:
+        group_count: 模拟的群聊数
+        member_group_count: 抓取成员的群数（选人数最多的群）
+        call_latency: 模拟每次跨进程往返的耗时（秒）
+    """
+    account = synthetic_account(group_count)
+    member_groups = sorted(account, key=lambda title: len(account[title]), reverse=True)[:member_group_count]
+    print(f"{group_count} 个群，抓取 {member_group_count} 个群的成员，每次往返 {call_latency * 1e6:.0f} 微秒")
+    results = {}
+    for bulk_fetch in (False, True):
+        groups, members, driver, elapsed = run(account, bulk_fetch, call_latency, member_groups)
+        results[bulk_fetch] = (groups, members)
+        top = "，".join(f"{name} {count}" for name, count in driver.calls.most_common(4))
+        print(f"{'批量读取' if bulk_fetch else '逐个读取'}: 驱动调用 {driver.call_count():7d} 次，"
+              f"耗时 {elapsed:6.2f} 秒（{top}）")
+    print(f"结果一致: {results[False] == results[True]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import os
+import json
+import random
+import shutil
+import tempfile
+
+from bench_common import timed
+
+from core.journal import JournalStore
+from core.store import MembershipStore
+
+
+def build_synthetic_groups(group_count=300, members_per_group=500, population=60000, seed=1):
+    """生成合成群数据：默认 300 个群、共 15 万条群成员关系"""
+    rng = random.Random(seed)
+    groups = {}
+    for i in range(group_count):
+        members = rng.sample(range(population), members_per_group)
+        groups[f"测试群{i}"] = [f"成员{m}" for m in members]
+    return groups
+
+
+def write_legacy_cache(path, groups):
+    """按旧版格式（indent=2，成员为字典）写出缓存文件"""
+    cache_data = {"last_update": "2024-01-01T00:00:00", "groups": {}}
+    for name, members in groups.items():
+        cache_data["groups"][name] = {
+            "member_count": str(len(members)),
+            "last_update": "2024-01-01T00:00:00",
+            "members": {member: {"group": name} for member in members}
+        }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(cache_data, f, ensure_ascii=False, indent=2)
+
+
+def main():
+    """对比旧版整体加载和索引优先加载的启动耗时"""
+    work_dir = tempfile.mkdtemp(prefix="wechat_cache_bench_")
+    try:
+        groups = build_synthetic_groups()
+        memberships = sum(len(m) for m in groups.values())
+        print(f"合成数据: {len(groups)} 个群, {memberships} 条群成员关系")
+
+        legacy_file = os.path.join(work_dir, "wechat_groups_cache.json")
+        write_legacy_cache(legacy_file, groups)
+
+        journal_dir = os.path.join(work_dir, "journal")
+        os.makedirs(journal_dir)
+        store = JournalStore(journal_dir)
+        store.migrate_legacy_json(legacy_file)
+        store.close()
+
+        db_store = MembershipStore(os.path.join(work_dir, "wechat_groups.db"))
+        db_store.migrate_legacy_json(legacy_file)
+        db_store.close()
+
+        def legacy_startup():
+            with open(legacy_file, 'r', encoding='utf-8') as f:
+                cache_data = json.load(f)
+            return [{"name": n, "member_count": g["member_count"]} for n, g in cache_data["groups"].items()]
+
+        def journal_startup():
+            s = JournalStore(journal_dir)
+            result = s.list_groups()
+            s.journal.close()
+            return result
+
+        def sqlite_startup():
+            s = MembershipStore(os.path.join(work_dir, "wechat_groups.db"))
+            result = s.list_groups()
+            s.close()
+            return result
+
+        print("\n启动耗时（读取群聊列表，取 5 次最短）:")
+        for label, func, path in [
+            ("旧版 JSON 整体加载", legacy_startup, legacy_file),
+            ("索引优先快照", journal_startup, store.snapshot_file),
+            ("SQLite", sqlite_startup, os.path.join(work_dir, "wechat_groups.db")),
+        ]:
+            result, elapsed = timed(func, repeat=5)
+            size = os.path.getsize(path) / 1024 / 1024
+            print(f"  {label:<14} {elapsed:9.2f} ms  {len(result)} 个群  文件 {size:.1f} MB")
+
+        lazy = JournalStore(journal_dir)
+        members, elapsed = timed(lambda: lazy.get_group_members("测试群150"))
+        print(f"\n按需读取单个群成员: {elapsed:.2f} ms ({len(members)} 人)")
+        lazy.journal.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""tools 中性能评估脚本共用的工具，导入本模块时把 src 目录加入 Python 路径"""
+import os
+import random
+import sys
+import time
+
+# 添加 src 目录到 Python 路径
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from core.fake_driver import DEFAULT_LATENCIES
+from core.membership import Membership
+
+# 模拟的微信界面上去掉所有界面变化的延迟，每次读取控件的耗时另行指定
+NO_LATENCY = {kind: 0.0 for kind in DEFAULT_LATENCIES if kind != "call"}
+
+
+def timed(func, repeat=1):
+    """运行 func repeat 次，返回 (最后一次的结果, 最短耗时毫秒)"""
+    result = None
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return result, best
+
+
+def random_membership(group_count, members_per_group, population, seed=1):
+    """每个群从 population 个成员中均匀随机抽取 members_per_group 人"""
+    rng = random.Random(seed)
+    membership = Membership()
+    for g in range(group_count):
+        membership.set_group(f"测试群{g}", rng.sample(range(population), members_per_group))
+    return membership
@@ -0,0 +1,60 @@
+import random
+import time
+
+import bench_common  # 添加 src 目录到 Python 路径
+
+from core.nickname import cluster_nicknames
+
+SURNAMES = "王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾肖田董袁潘于蒋蔡余杜叶程苏魏吕丁任沈"
+GIVEN = "伟芳娜秀英敏静丽强磊军洋勇艳杰娟涛明超秀霞平刚桂英华玉兰萍红玲芬丹凤燕梅琳雪飞鹏辉建国志"
+DECORATIONS = ["🌸", "✨", " ", "(家长)", "-销售", "【北京】", "~"]
+
+
+def make_variant(rng, name):
+    """模拟同一个人在不同群里的昵称：加表情、空格、备注，或转成全角"""
+    kind = rng.randrange(3)
+    if kind == 0:
+        return name + rng.choice(DECORATIONS)
+    if kind == 1:
+        return "".join(chr(ord(c) + 0xFEE0) if '!' <= c <= '~' else c for c in name) + " "
+    return rng.choice(["🌸", "✨", "【北京】", "  "]) + name
+
+
+def build_names(distinct, variant_ratio=0.3, seed=1):
+    rng = random.Random(seed)
+    people = set()
+    while len(people) < distinct:
+        if rng.random() < 0.2:
+            people.add(f"{rng.choice(['Alice', 'Bob', 'Lily', 'Tom', 'Ann'])}{rng.randrange(100000)}")
+        else:
+            people.add(rng.choice(SURNAMES) + "".join(rng.choice(GIVEN) for _ in range(rng.randint(1, 3))))
+    people = sorted(people)
+    names = list(people)
+    truth = list(range(len(people)))
+    for person, name in enumerate(people):
+        if rng.random() < variant_ratio:
+            names.append(make_variant(rng, name))
+            truth.append(person)
+    return names, truth
+
+
+def main(distinct=100000):
+    """在 10 万个不同昵称上测试模糊匹配的速度和合并效果"""
+    names, truth = build_names(distinct)
+    print(f"{len(names)} 个昵称（{distinct} 个不同的人，其余为同一个人的变体）")
+
+    start = time.perf_counter()
+    labels = cluster_nicknames(names)
+    elapsed = time.perf_counter() - start
+
+    # 变体是否归到了原昵称所在的类，以及不同的人是否被错误合并
+    variants = [(i, truth[i]) for i in range(distinct, len(names))]
+    matched = sum(labels[i] == labels[person] for i, person in variants)
+    merged_people = len(set(labels[:distinct]))
+    print(f"模糊匹配耗时 {elapsed:.2f} 秒")
+    print(f"变体归并正确 {matched}/{len(variants)}，{distinct} 个不同的人归为 {merged_people} 类"
+          f"（相似昵称被合并 {distinct - merged_people} 人）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import random
+import time
+
+import bench_common  # 添加 src 目录到 Python 路径
+
+from core.analyzer import build_group_graph
+from core.membership import Membership
+
+
+def build_membership(group_count, communities, members_per_group, population, seed=1):
+    """模拟若干个受众圈子：每个群大部分成员来自所属圈子，其余随机"""
+    rng = random.Random(seed)
+    pools = [rng.sample(range(population), members_per_group * 15) for _ in range(communities)]
+    membership = Membership()
+    truth = []
+    for g in range(group_count):
+        community = g % communities
+        local = int(members_per_group * 0.8)
+        members = rng.sample(pools[community], local) + rng.sample(range(population), members_per_group - local)
+        membership.set_group(f"测试群{g}", members)
+        truth.append(community)
+    return membership, truth
+
+
+def main(group_count=1000, communities=10, members_per_group=250, population=300000, repeat=3):
+    """群共同成员图的构建耗时，以及社区发现能否还原模拟的受众圈子"""
+    membership, truth = build_membership(group_count, communities, members_per_group, population)
+    print(f"{group_count} 个群 × {members_per_group} 人，{communities} 个受众圈子")
+
+    elapsed = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        graph = build_group_graph(membership)
+        elapsed = min(elapsed, (time.perf_counter() - start) * 1000)
+    print(f"构建图并计算连通分量和社区: {elapsed:.0f} ms，{graph.edge_count} 条边")
+
+    # 每个社区中占多数的圈子所含的群数之和，全部一致时等于群数
+    majority = 0
+    for community in set(graph.communities.tolist()):
+        labels = [truth[i] for i in range(group_count) if graph.communities[i] == community]
+        majority += max(labels.count(label) for label in set(labels))
+    print(f"连通分量 {len(set(graph.components.tolist()))} 个，社区 {len(set(graph.communities.tolist()))} 个，"
+          f"与模拟圈子一致的群 {majority}/{group_count}")
+
+
+if __name__ == "__main__":
+    main()
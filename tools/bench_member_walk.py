@@ -0,0 +1,72 @@
+import contextlib
+import io
+import tempfile
+import time
+
+from bench_common import NO_LATENCY
+
+from core.driver import BUTTON, TEXT
+from core.fake_driver import FakeDriver, synthetic_account
+from core.wechat import WeChatController
+
+
+def walk_window(controller, control, members, panel_left):
+    """原来的收集方式：遍历整个主窗口的所有控件，只按位置和名称过滤"""
+    driver = controller.driver
+    controller.visited_controls += 1
+    if driver.get_control_type(control) in (BUTTON, TEXT):
+        name = driver.get_name(control)
+        if name and controller.is_member_name(name) and driver.get_rect(control).left > panel_left:
+            members.add(name)
+    for child in driver.get_children(control):
+        walk_window(controller, child, members, panel_left)
+
+
+def measure(controller, collect):
+    """收集一次当前显示的成员，返回 (成员数, 访问的控件数, 耗时)
+
+    访问的控件数包括收集函数读取的控件和 find 在微信进程内检查的控件。
+    """
+    members = set()
+    driver = controller.driver
+    controller.visited_controls = 0
+    driver.find_visits = 0
+    start = time.perf_counter()
+    collect(members)
+    return len(members), controller.visited_controls + driver.find_visits, time.perf_counter() - start
+
+
+def main(history_sizes=(0, 200, 1000, 5000), call_latency=0.00005):
+    """
+    比较遍历整个主窗口和只遍历成员面板时访问的控件数
+
+    聊天记录越多，遍历整个窗口访问的控件越多；只遍历成员面板时访问的控件数
+    只与面板中显示的成员数有关。
+
+    Args:
+        history_sizes: 打开的群聊中显示的聊天记录条数
+        call_latency: 模拟每次跨进程读取控件的耗时（秒）
+    """
+    account = synthetic_account(50, min_members=400, max_members=401)
+    title = next(iter(account))
+    print(f"群 {title}，{len(account[title])} 人，每次读取控件 {call_latency * 1e6:.0f} 微秒")
+    for history in history_sizes:
+        driver = FakeDriver(account, dict(NO_LATENCY, call=call_latency), chat_messages=history)
+        with contextlib.redirect_stdout(io.StringIO()), tempfile.TemporaryDirectory() as cache_dir:
+            # 两种方式都逐个读取控件，只比较遍历的范围
+            controller = WeChatController(driver=driver, cache_dir=cache_dir, bulk_fetch=False)
+            controller.get_group_members(title)
+            controller.store.close()
+        # 成员面板保持打开，比较收集第一屏成员的两种方式
+        window = driver.main
+        panel_left = controller.member_panel_region(window).left
+        controller.is_running = True
+        old = measure(controller, lambda members: walk_window(controller, window, members, panel_left))
+        new = measure(controller, lambda members: controller.collect_member_panel(window, members))
+        print(f"聊天记录 {history:5d} 条: 整个窗口访问 {old[1]:6d} 个控件 {old[2] * 1000:7.1f} 毫秒，"
+              f"成员面板访问 {new[1]:4d} 个控件 {new[2] * 1000:6.1f} 毫秒，"
+              f"找到成员 {old[0]}/{new[0]}")
+
+
+if __name__ == "__main__":
+    main()
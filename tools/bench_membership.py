@@ -0,0 +1,62 @@
+import random
+import time
+import tracemalloc
+
+import bench_common  # 添加 src 目录到 Python 路径
+
+from core.analyzer import count_member_groups
+from core.membership import Membership
+
+
+def build_names(group_count, members_per_group, population, seed=1):
+    rng = random.Random(seed)
+    names = [f"成员{i}" for i in range(population)]
+    return {f"测试群{g}": [names[m] for m in rng.sample(range(population), members_per_group)]
+            for g in range(group_count)}
+
+
+def legacy_analyze(groups_data):
+    """旧版 MainWindow.analyze_common_members"""
+    member_groups = {}
+    for group_name, members in groups_data.items():
+        for member_name, member_info in members.items():
+            if member_name not in member_groups:
+                member_groups[member_name] = {"groups": set()}
+            member_groups[member_name]["groups"].add(group_name)
+    return {name: info for name, info in member_groups.items() if len(info["groups"]) >= 2}
+
+
+def measure(build):
+    """返回 (结果, 构建占用内存 MB)"""
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current / 1024 / 1024
+
+
+def main(group_count=1000, members_per_group=500, population=200000):
+    """对比旧版字典表示和驻留后的整数数组表示"""
+    names = build_names(group_count, members_per_group, population)
+    print(f"{group_count} 个群 × {members_per_group} 人，{population} 个不同昵称")
+
+    legacy, legacy_mb = measure(lambda: {
+        group: {name: {"group": group} for name in members} for group, members in names.items()
+    })
+    compact, compact_mb = measure(lambda: Membership.from_dict(names))
+    print(f"内存: 旧版字典 {legacy_mb:.1f} MB，整数数组 {compact_mb:.1f} MB（含昵称驻留表）")
+
+    start = time.perf_counter()
+    legacy_result = legacy_analyze(legacy)
+    legacy_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    compact_result = count_member_groups(compact, 2)
+    compact_ms = (time.perf_counter() - start) * 1000
+
+    assert len(legacy_result) == len(compact_result)
+    print(f"分析: 旧版 {legacy_ms:.0f} ms，整数数组 {compact_ms:.0f} ms，重复成员 {len(compact_result)} 个")
+
+
+if __name__ == "__main__":
+    main()
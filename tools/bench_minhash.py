@@ -0,0 +1,63 @@
+import random
+
+from bench_common import timed
+
+from core.analyzer import approximate_group_overlap, compute_group_overlap
+from core.membership import Membership
+from core.sketch import compute_minhash
+
+
+def build_membership(group_count, members_per_group, population, seed=1):
+    """模拟几千个群：每个群大部分成员来自一个小圈子，另有一部分群是彼此的近似副本"""
+    rng = random.Random(seed)
+    communities = [rng.sample(range(population), members_per_group * 2) for _ in range(group_count // 10)]
+    membership = Membership()
+    groups = []
+    for g in range(group_count):
+        if groups and rng.random() < 0.1:
+            # 近似副本：在某个已有群的基础上替换一部分成员
+            base = rng.choice(groups)
+            keep = int(len(base) * rng.uniform(0.3, 0.9))
+            members = rng.sample(base, keep) + rng.sample(range(population), members_per_group - keep)
+        else:
+            community = rng.choice(communities)
+            local = int(members_per_group * 0.8)
+            members = rng.sample(community, local) + rng.sample(range(population), members_per_group - local)
+        groups.append(members)
+        membership.set_group_names(f"测试群{g}", (f"成员{m}" for m in members))
+    return membership
+
+
+def main(group_count=3000, members_per_group=300, population=300000, top_k=100):
+    """对比精确计算全部群对和 MinHash 近似模式的速度与准确度"""
+    membership = build_membership(group_count, members_per_group, population)
+    print(f"{group_count} 个群 × {members_per_group} 人")
+
+    member_names = membership.members.strings
+    sketches, sketch_ms = timed(lambda: {
+        name: compute_minhash(member_names[m] for m in membership.members_of(name))
+        for name in membership.group_names()
+    })
+    print(f"计算签名（保存成员时完成，不计入查询）: {sketch_ms:.0f} ms，"
+          f"每个群 {sketches['测试群0'].nbytes} 字节")
+
+    overlap, exact_ms = timed(lambda: compute_group_overlap(membership))
+    exact_pairs, rank_ms = timed(lambda: overlap.top_pairs(limit=top_k))
+    exact_keys = {(pair["group_a"], pair["group_b"]) for pair in exact_pairs}
+    print(f"精确计算: 全部群对 {exact_ms:.0f} ms + 排序 {rank_ms:.0f} ms，"
+          f"第 {top_k} 名 Jaccard {exact_pairs[-1]['jaccard']:.3f}")
+
+    for bands in (8, 16, 32):
+        for candidates in (top_k, top_k * 2, top_k * 5):
+            pairs, approx_ms = timed(lambda: approximate_group_overlap(
+                sketches, membership.members_of, top_k=top_k, candidates=candidates, bands=bands
+            ))
+            keys = {tuple(sorted((pair["group_a"], pair["group_b"]), key=lambda n: int(n[3:]))) for pair in pairs}
+            recall = len(keys & exact_keys) / len(exact_keys)
+            error = sum(abs(pair["estimated_jaccard"] - pair["jaccard"]) for pair in pairs) / max(len(pairs), 1)
+            print(f"近似 bands={bands:2d} 精确计算 {candidates:3d} 对: {approx_ms:6.0f} ms，"
+                  f"前 {top_k} 对召回率 {recall:.0%}，Jaccard 估计平均误差 {error:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import os
+
+from bench_common import random_membership, timed
+
+from core.analyzer import find_common_members
+
+
+def main(group_count=2000, members_per_group=500, population=400000, min_groups=2, repeat=3):
+    """多进程分片引擎在不同进程数下的耗时，与单进程位压缩矩阵对比"""
+    membership = random_membership(group_count, members_per_group, population)
+    print(f"{group_count} 个群 × {members_per_group} 人（{group_count * members_per_group} 条成员关系），"
+          f"{population} 个不同成员，本机 {os.cpu_count()} 个 CPU 核")
+
+    matrix_ms = float("inf")
+    for _ in range(repeat):
+        expected, elapsed = timed(lambda: find_common_members(membership, min_groups, engine="matrix"))
+        matrix_ms = min(matrix_ms, elapsed)
+    print(f"位压缩矩阵（单进程）: {matrix_ms:.0f} ms，{len(expected)} 个成员")
+
+    baseline = None
+    for workers in (1, 2, 4, 8):
+        process_ms = float("inf")
+        for _ in range(repeat):
+            result, elapsed = timed(lambda: find_common_members(
+                membership, min_groups, engine="process", workers=workers
+            ))
+            process_ms = min(process_ms, elapsed)
+        assert result == expected
+        baseline = baseline or process_ms
+        print(f"多进程分片 workers={workers}: {process_ms:.0f} ms，相对 1 个进程加速 {baseline / process_ms:.2f} 倍")
+
+
+if __name__ == "__main__":
+    main()
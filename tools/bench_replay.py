@@ -0,0 +1,72 @@
+import sys
+import os
+import contextlib
+import glob
+import io
+import tempfile
+import time
+
+from bench_common import NO_LATENCY
+
+from core.fake_driver import FakeDriver, synthetic_account
+from core.recording import ReplayDriver, load_recording
+from core.wechat import WeChatController
+
+
+def record_corpus(directory, group_count=2000, member_groups=5):
+    """在模拟的微信界面上抓取并录制群聊列表和几个群的成员面板"""
+    account = synthetic_account(group_count)
+    with contextlib.redirect_stdout(io.StringIO()), tempfile.TemporaryDirectory() as cache_dir:
+        controller = WeChatController(driver=FakeDriver(account, NO_LATENCY), cache_dir=cache_dir)
+        controller.enable_debug_mode(directory)
+        groups = controller.get_group_list(use_cache=False)
+        largest = sorted(groups, key=lambda group: int(group["member_count"]), reverse=True)
+        for group in largest[:member_groups]:
+            controller.get_group_members(group["name"])
+        controller.store.close()
+
+
+def replay(path, controller):
+    """把录制的每一帧交给对应的收集函数，返回 (找到的项数, 耗时)"""
+    recording = load_recording(path)
+    start = time.perf_counter()
+    if recording.kind == "group_list":
+        found = {}
+        for frame in recording.frames:
+            controller.collect_group_items(frame, found)
+    else:
+        found = set()
+        for frame in recording.frames:
+            controller.collect_member_panel(frame, found)
+    return recording, len(found), time.perf_counter() - start
+
+
+def main(paths=None):
+    """
+    回放录制的界面树，评估收集函数的速度
+
+    Args:
+        paths: 录制文件或目录，默认先在模拟的微信界面上录制一组
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        if not paths:
+            print("没有指定录制文件，在模拟的微信界面上录制...")
+            record_corpus(directory)
+            paths = [directory]
+        files = []
+        for path in paths:
+            files += sorted(glob.glob(os.path.join(path, "*.json.gz"))) if os.path.isdir(path) else [path]
+
+        with contextlib.redirect_stdout(io.StringIO()), tempfile.TemporaryDirectory() as cache_dir:
+            controller = WeChatController(driver=ReplayDriver(), cache_dir=cache_dir)
+
+        for path in files:
+            recording, found, elapsed = replay(path, controller)
+            nodes = sum(recording.node_counts)
+            print(f"{os.path.basename(path)}: {recording.kind} {recording.label}，"
+                  f"{len(recording.frames)} 帧 {nodes} 个节点，文件 {os.path.getsize(path) / 1024:.1f} KB，"
+                  f"收集到 {found} 项，耗时 {elapsed * 1000:.1f} 毫秒（每个节点 {elapsed / nodes * 1e6:.1f} 微秒）")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,60 @@
+import contextlib
+import io
+import random
+import tempfile
+import time
+
+import bench_common  # 添加 src 目录到 Python 路径
+
+from core.fake_driver import DEFAULT_LATENCIES, FakeDriver, synthetic_account
+from core.wechat import WeChatController
+
+
+def main(group_count=3000, sample=20, latency_scale=1.0):
+    """
+    在模拟的微信界面上端到端地测试抓取：群聊列表和部分群的成员
+
+    Args:
+        group_count: 模拟账号的群数
+        sample: 抓取成员的群数
+        latency_scale: 界面延迟相对于 DEFAULT_LATENCIES 的倍数，0 表示界面立即响应
+    """
+    account = synthetic_account(group_count)
+    latencies = {kind: delay * latency_scale for kind, delay in DEFAULT_LATENCIES.items()}
+    driver = FakeDriver(account, latencies)
+    sizes = [len(members) for members in account.values()]
+    print(f"{group_count} 个群，平均 {sum(sizes) / len(sizes):.0f} 人，最大 {max(sizes)} 人，"
+          f"界面延迟 x{latency_scale}")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # 抓取过程的日志很多，只输出汇总
+        with contextlib.redirect_stdout(io.StringIO()):
+            controller = WeChatController(driver=driver, cache_dir=cache_dir)
+            start = time.perf_counter()
+            groups = controller.get_group_list(use_cache=False)
+            list_elapsed = time.perf_counter() - start
+
+        found = sorted((group["title"], int(group["member_count"])) for group in groups or [])
+        expected = sorted((title, len(members)) for title, members in account.items())
+        print(f"群聊列表: {len(found)}/{group_count} 个群，{'正确' if found == expected else '不一致'}，"
+              f"耗时 {list_elapsed:.2f} 秒")
+
+        chosen = random.Random(0).sample(groups or [], min(sample, len(groups or [])))
+        correct = 0
+        member_total = 0
+        start = time.perf_counter()
+        for group in chosen:
+            with contextlib.redirect_stdout(io.StringIO()):
+                member_ids = controller.get_group_members(group["name"])
+            names = set(controller.member_table.lookup(member_ids)) if member_ids else set()
+            correct += names == set(account[group["title"]])
+            member_total += len(names)
+        members_elapsed = time.perf_counter() - start
+        print(f"群成员: {correct}/{len(chosen)} 个群完全正确，共 {member_total} 人，"
+              f"耗时 {members_elapsed:.2f} 秒（每个群 {members_elapsed / max(len(chosen), 1):.2f} 秒）")
+        controller.store.close()
+
+
+if __name__ == "__main__":
+    main(latency_scale=0.0)
+    main(latency_scale=1.0)
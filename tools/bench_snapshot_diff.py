@@ -0,0 +1,56 @@
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import bench_common  # 添加 src 目录到 Python 路径
+
+from core.analyzer import diff_snapshots
+from core.store import MembershipStore
+
+
+def main(group_count=300, members_per_group=500, population=60000, changed_ratio=0.1, seed=1):
+    """对比两个 15 万条群成员关系的快照"""
+    rng = random.Random(seed)
+    work_dir = tempfile.mkdtemp(prefix="wechat_snapshot_bench_")
+    try:
+        store = MembershipStore(os.path.join(work_dir, "wechat_groups.db"))
+        groups = {f"测试群{i}": rng.sample(range(population), members_per_group) for i in range(group_count)}
+        for name, members in groups.items():
+            store.save_group_members(name, store.member_table.intern_many(f"成员{m}" for m in members))
+        first = store.create_snapshot("第一次")
+
+        # 一部分群有人进出
+        changed = rng.sample(sorted(groups), int(group_count * changed_ratio))
+        for name in changed:
+            members = groups[name][20:] + rng.sample(range(population), 20)
+            store.save_group_members(name, store.member_table.intern_many(f"成员{m}" for m in members))
+        second = store.create_snapshot("第二次")
+
+        start = time.perf_counter()
+        old_groups = store.get_snapshot_groups(first)
+        new_groups = store.get_snapshot_groups(second)
+        changes = diff_snapshots(old_groups, new_groups, store.get_member_set)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{group_count} 个群 / {group_count * members_per_group} 条关系，{len(changed)} 个群有变化")
+        print(f"快照对比（含读取）: {elapsed:.2f} ms，发现 {len(changes)} 个群有变化")
+
+        # 最坏情况：所有群的成员集合都不同
+        old_sets = {name: i for i, name in enumerate(groups)}
+        new_sets = {name: i + group_count for i, name in enumerate(groups)}
+        arrays = {}
+        for name, i in old_sets.items():
+            arrays[i] = sorted(groups[name])
+            arrays[new_sets[name]] = sorted(groups[name][10:] + [population + i])
+        start = time.perf_counter()
+        changes = diff_snapshots(old_sets, new_sets, arrays.__getitem__)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"所有群都有变化（内存中）: {elapsed:.2f} ms，{len(changes)} 个群")
+        store.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()